@@ -0,0 +1,322 @@
+"""
+Batch Stitching
+===============
+Offline entry point for stitching many capture sweeps at once.  Each input
+is a directory of frames (or a glob pattern); every directory that holds
+image files is one sequence, its frames ordered by natural sort
+(``frame_2.png`` before ``frame_10.png``).
+
+Sequences are stitched with :class:`frequency_stitch.IncrementalStitcher`,
+which reads the frames from disk one at a time, on ``--jobs`` worker
+processes (default: every core).  For each sequence the panorama and a
+JSON sidecar with every frame's offset, PSR and position are written below
+``--out``, mirroring the input directory layout.  A sequence whose sidecar
+is newer than all its frames and was written with the same frame list and
+settings is skipped, so an interrupted or repeated run only redoes what
+changed.  The sidecar is written last and both files are moved into place
+atomically, so a killed run never leaves an output that looks complete.
+
+Run with:  python batch_stitch.py SWEEPS_DIR --out panoramas [--jobs N]
+           python batch_stitch.py "captures/2026-*/sweep_*" --out panoramas --format npy
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from frequency_stitch import BLEND_MODES, FFT_MODES, IncrementalStitcher
+
+FRAME_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+OUTPUT_FORMATS = ("png", "npy")
+
+Sequence = namedtuple("Sequence", ["name", "directory", "frames"])
+Sequence.__doc__ = """
+One sweep to stitch.
+
+name      : output name, the directory relative to the common input root.
+directory : directory holding the frames.
+frames    : frame paths in stitching order.
+"""
+
+SequenceResult = namedtuple("SequenceResult", ["name", "status", "frames", "shape", "min_psr", "seconds", "error"])
+SequenceResult.__doc__ = """
+Outcome of one sequence.
+
+status  : ``"stitched"``, ``"up to date"`` or ``"failed"``.
+frames  : frames used (identical consecutive frames are dropped).
+shape   : panorama shape, or None.
+min_psr : weakest pairwise alignment, or None for single-frame sequences.
+seconds : wall-clock time spent stitching.
+error   : failure message, or None.
+"""
+
+
+# ---------------------------------------------------------------------------
+# Sequence discovery
+# ---------------------------------------------------------------------------
+
+def _natural_key(path: str) -> list:
+    """Sort key comparing digit runs numerically."""
+    return [int(part) if part.isdigit() else part.lower() for part in re.split(r"(\d+)", path)]
+
+
+def _is_frame(path: str) -> bool:
+    return path.lower().endswith(FRAME_EXTENSIONS) and os.path.isfile(path)
+
+
+def find_sequences(inputs: list[str], exclude: str | None = None) -> list[Sequence]:
+    """
+    Sequences below *inputs* (directories or glob patterns).
+
+    A directory is searched recursively and every directory in it that
+    directly holds frames becomes a sequence; frame files matched by a
+    pattern are grouped by their directory.  Names are relative to the
+    common root of all sequences, so the output tree mirrors the inputs.
+    Nothing below *exclude* (the output directory) is picked up.
+    """
+    exclude = os.path.abspath(exclude) if exclude is not None else None
+
+    def excluded(path: str) -> bool:
+        return exclude is not None and os.path.commonpath([path, exclude]) == exclude
+
+    frames: dict[str, set[str]] = {}
+    for spec in inputs:
+        matches = sorted(glob.glob(spec, recursive=True)) if glob.has_magic(spec) else [spec]
+        if not matches:
+            raise FileNotFoundError(f"No input matches {spec!r}.")
+        for path in matches:
+            path = os.path.abspath(path)
+            if excluded(path):
+                continue
+            if os.path.isdir(path):
+                for directory, subdirs, files in os.walk(path):
+                    subdirs[:] = [d for d in subdirs if not excluded(os.path.join(directory, d))]
+                    found = [os.path.join(directory, f) for f in files]
+                    frames.setdefault(directory, set()).update(f for f in found if _is_frame(f))
+            elif _is_frame(path):
+                frames.setdefault(os.path.dirname(path), set()).add(path)
+            else:
+                raise FileNotFoundError(f"{path!r} is neither a directory nor a frame image.")
+
+    directories = sorted((d for d, f in frames.items() if f), key=_natural_key)
+    if not directories:
+        return []
+    root = os.path.commonpath(directories)
+    if root in directories:
+        root = os.path.dirname(root)
+    return [
+        Sequence(os.path.relpath(d, root), d, sorted(frames[d], key=_natural_key))
+        for d in directories
+    ]
+
+
+# ---------------------------------------------------------------------------
+# Stitching one sequence
+# ---------------------------------------------------------------------------
+
+def _output_paths(sequence: Sequence, out_dir: str, fmt: str) -> tuple[str, str]:
+    base = os.path.join(out_dir, sequence.name)
+    return f"{base}.{fmt}", f"{base}.json"
+
+
+def is_up_to_date(sequence: Sequence, out_dir: str, settings: dict) -> bool:
+    """
+    True if the outputs of *sequence* exist, the sidecar is newer than
+    every frame and it records the same frames and *settings*.
+    """
+    image_path, sidecar_path = _output_paths(sequence, out_dir, settings["format"])
+    try:
+        sidecar_mtime = os.stat(sidecar_path).st_mtime
+        if not os.path.exists(image_path):
+            return False
+        if any(os.stat(f).st_mtime > sidecar_mtime for f in sequence.frames):
+            return False
+        with open(sidecar_path, encoding="utf-8") as fh:
+            recorded = json.load(fh)
+    except (OSError, ValueError):
+        return False
+    frame_names = [os.path.relpath(f, sequence.directory) for f in sequence.frames]
+    return recorded.get("settings") == settings and recorded.get("frames") == frame_names
+
+
+def stitch_sequence(sequence: Sequence, out_dir: str, settings: dict) -> SequenceResult:
+    """
+    Stitch *sequence* into ``<out_dir>/<name>.<format>`` plus the
+    ``<name>.json`` sidecar.
+
+    Frames are pushed as paths and read one at a time; with the ``npy``
+    format finished columns are spilled to a temporary directory and the
+    panorama is assembled in a memory-mapped file, so no sweep is ever
+    fully resident.  Errors are returned as a ``"failed"`` result.
+    """
+    t0 = time.perf_counter()
+    image_path, sidecar_path = _output_paths(sequence, out_dir, settings["format"])
+    os.makedirs(os.path.dirname(image_path), exist_ok=True)
+    npy = settings["format"] == "npy"
+    try:
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(image_path)) as tmp:
+            records = []
+            with IncrementalStitcher(
+                overlap_hint=settings["overlap_hint"],
+                blend_width=settings["blend_width"],
+                fft_mode=settings["fft_mode"],
+                blend_mode=settings["blend_mode"],
+                spill_dir=tmp if npy else None,
+                background=False,
+            ) as builder:
+                for path in sequence.frames:
+                    count = builder.frame_count
+                    builder.push(path)
+                    record = {"frame": os.path.relpath(path, sequence.directory)}
+                    if builder.frame_count == count:
+                        record["duplicate"] = True
+                    else:
+                        record["position"] = [float(v) for v in builder.positions[-1]]
+                        if count:
+                            align = builder.alignments[-1]
+                            record.update(
+                                offset=[float(v) for v in align.offset],
+                                psr=float(align.psr),
+                                overlap=int(align.overlap),
+                            )
+                    records.append(record)
+
+                tmp_image = os.path.join(tmp, "panorama." + settings["format"])
+                if npy:
+                    panorama = builder.result(out_path=tmp_image)
+                else:
+                    panorama = builder.result()
+                    if not cv2.imwrite(tmp_image, panorama):
+                        raise OSError(f"Could not write {image_path!r}.")
+                shape = tuple(panorama.shape)
+                del panorama
+                os.replace(tmp_image, image_path)
+
+        psrs = [r["psr"] for r in records if "psr" in r]
+        sidecar = {
+            "settings": settings,
+            "frames": [r["frame"] for r in records],
+            "shape": list(shape),
+            "min_psr": min(psrs) if psrs else None,
+            "alignments": records,
+        }
+        tmp_sidecar = sidecar_path + ".tmp"
+        with open(tmp_sidecar, "w", encoding="utf-8") as fh:
+            json.dump(sidecar, fh, indent=1)
+        os.replace(tmp_sidecar, sidecar_path)
+    except Exception as e:
+        return SequenceResult(sequence.name, "failed", 0, None, None, time.perf_counter() - t0, f"{type(e).__name__}: {e}")
+    used = sum(1 for r in records if not r.get("duplicate"))
+    return SequenceResult(sequence.name, "stitched", used, shape, sidecar["min_psr"], time.perf_counter() - t0, None)
+
+
+# ---------------------------------------------------------------------------
+# Batch driver
+# ---------------------------------------------------------------------------
+
+def _init_worker() -> None:
+    # One sequence per process: keep OpenCV from oversubscribing the cores
+    cv2.setNumThreads(1)
+
+
+def run_batch(
+    sequences: list[Sequence],
+    out_dir: str,
+    settings: dict,
+    jobs: int = 0,
+    force: bool = False,
+    progress=print,
+) -> list[SequenceResult]:
+    """
+    Stitch every sequence that is not up to date on *jobs* processes
+    (0 = every core, 1 = in this process), reporting each finished
+    sequence through *progress*.  Returns the results in completion order.
+    """
+    total = len(sequences)
+    results: list[SequenceResult] = []
+
+    def report(result: SequenceResult) -> None:
+        results.append(result)
+        progress(_progress_line(len(results), total, result))
+
+    todo = []
+    for sequence in sequences:
+        if not force and is_up_to_date(sequence, out_dir, settings):
+            report(SequenceResult(sequence.name, "up to date", len(sequence.frames), None, None, 0.0, None))
+        else:
+            todo.append(sequence)
+
+    jobs = min(jobs if jobs > 0 else (os.cpu_count() or 1), len(todo))
+    if jobs <= 1:
+        for sequence in todo:
+            report(stitch_sequence(sequence, out_dir, settings))
+        return results
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = [pool.submit(stitch_sequence, s, out_dir, settings) for s in todo]
+        for future in as_completed(futures):
+            report(future.result())
+    return results
+
+
+def _progress_line(done: int, total: int, result: SequenceResult) -> str:
+    head = f"[{done}/{total}] {result.name}: "
+    if result.status == "failed":
+        return head + f"FAILED ({result.error})"
+    if result.status == "up to date":
+        return head + "up to date"
+    h, w = result.shape[:2]
+    psr = "" if result.min_psr is None else f", min PSR {result.min_psr:.1f}"
+    return head + f"{result.frames} frames -> {w}x{h} in {result.seconds:.1f} s{psr}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("inputs", nargs="+", metavar="INPUT",
+                        help="directory of frame sequences, or a glob pattern (quote it)")
+    parser.add_argument("--out", required=True, metavar="DIR",
+                        help="output directory for panoramas and JSON sidecars")
+    parser.add_argument("--jobs", "-j", type=int, default=0,
+                        help="sequences stitched in parallel (default 0 = every core)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="png",
+                        help="panorama format; npy is memory-mapped and never fully resident (default png)")
+    parser.add_argument("--overlap", type=int, default=None,
+                        help="expected overlap between frames in pixels (default half a frame)")
+    parser.add_argument("--blend-width", type=int, default=64,
+                        help="blend transition width in pixels (default 64)")
+    parser.add_argument("--blend-mode", choices=BLEND_MODES, default="linear")
+    parser.add_argument("--fft-mode", choices=FFT_MODES, default="real32")
+    parser.add_argument("--force", action="store_true",
+                        help="restitch sequences whose outputs are up to date")
+    args = parser.parse_args()
+
+    sequences = find_sequences(args.inputs, exclude=args.out)
+    if not sequences:
+        print("no frame sequences found")
+        sys.exit(1)
+    settings = {
+        "format": args.format,
+        "overlap_hint": args.overlap,
+        "blend_width": args.blend_width,
+        "blend_mode": args.blend_mode,
+        "fft_mode": args.fft_mode,
+    }
+    t0 = time.perf_counter()
+    results = run_batch(sequences, args.out, settings, jobs=args.jobs, force=args.force)
+    counts = {status: sum(r.status == status for r in results) for status in ("stitched", "up to date", "failed")}
+    print(f"{counts['stitched']} stitched, {counts['up to date']} up to date, "
+          f"{counts['failed']} failed in {time.perf_counter() - t0:.1f} s")
+    if counts["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,426 @@
+"""
+Benchmarks for the frequency_stitch module and the matching hot path.
+
+Run with:  python benchmark.py [--repeat N]
+           python benchmark.py --suite [--json out.json] [--baseline base.json]
+
+Each section prints a small table; timings are the median of *repeat* runs.
+
+``--suite`` runs the regression suite instead: fixed cases covering template
+matching on real ``gameplay/`` templates, multi-frame stitching and the
+``match_and_handle`` loop, each reported with latency percentiles and peak
+traced memory.  ``--json`` writes the results machine-readably; a results
+file written on the same machine can be passed back as ``--baseline``, and
+the run exits with status 1 if any case got slower or bigger than the
+baseline by more than ``--tolerance``.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from frequency_stitch import (
+    FFT_MODES,
+    PARALLEL_MODES,
+    FourierMellinAligner,
+    FrequencyDomainStitcher,
+    get_fft_backend,
+    phase_correlate_match,
+    stitch_images_frequency,
+    stitch_with_rotation,
+)
+from matching import TemplateMatcher
+from prescreen import PreScreen
+from synthetic import blob_screen, sweep_frames, synthetic_pair
+from template_registry import TemplateRegistry
+
+# Grayscale capture of SCREEN_CROP = (0, 0, 622, 1080) in minfar.py
+SCREEN_SHAPE = (1080, 622)
+
+
+def _median_time(fn, repeat: int) -> float:
+    """Median wall-clock seconds of *repeat* calls to *fn* (after a warm-up)."""
+    fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return float(np.median(samples))
+
+
+# ---------------------------------------------------------------------------
+# FFT modes: accuracy parity and speed
+# ---------------------------------------------------------------------------
+
+def bench_fft_modes(repeat: int) -> None:
+    """Compare every FFT mode against the float64 ``complex128`` path."""
+    cases = [
+        dict(h=h, w=w, shift_y=sy, overlap=ov, noise_std=noise)
+        for h, w in ((64, 128), (128, 256))
+        for sy in (0, -3, -7)
+        for ov in (40, 60)
+        for noise in (0.0, 15.0)
+    ]
+
+    print("FFT mode parity on synthetic pairs "
+          f"({len(cases)} cases, overlap strips as in stitch_images_frequency)")
+    print(f"{'mode':<12}{'max |d offset|':>16}{'min PSR':>12}")
+    reference = {}
+    for mode in FFT_MODES:
+        worst_off = 0.0
+        min_psr = float("inf")
+        for i, case in enumerate(cases):
+            img_l, img_r = synthetic_pair(**case)
+            ov = case["overlap"]
+            ref_crop = img_l[:, img_l.shape[1] - ov:]
+            tmpl_crop = img_r[:, :ov]
+            (dy, dx), psr = phase_correlate_match(ref_crop, tmpl_crop, fft_mode=mode)
+            min_psr = min(min_psr, psr)
+            if mode == "complex128":
+                reference[i] = (dy, dx)
+                continue
+            ry, rx = reference[i]
+            worst_off = max(worst_off, abs(dy - ry), abs(dx - rx))
+        print(f"{mode:<12}{worst_off:>16.2e}{min_psr:>12.1f}")
+
+    rng = np.random.default_rng(0)
+    screen = (rng.random(SCREEN_SHAPE) * 255).astype(np.uint8)
+    template = screen[400:460, 200:280].copy()
+    print(f"\nphase_correlate_match on a {SCREEN_SHAPE[1]}x{SCREEN_SHAPE[0]} screen")
+    print(f"{'mode':<12}{'median ms':>12}{'speed-up':>10}")
+    base = None
+    for mode in FFT_MODES:
+        t = _median_time(
+            lambda: phase_correlate_match(screen, template, fft_mode=mode), repeat
+        )
+        base = base or t
+        print(f"{mode:<12}{t * 1e3:>12.2f}{base / t:>9.2f}x")
+
+
+# ---------------------------------------------------------------------------
+# FFT backends
+# ---------------------------------------------------------------------------
+
+def bench_fft_backends(repeat: int) -> None:
+    """Time phase_correlate_match for every available FFT backend."""
+    rng = np.random.default_rng(1)
+    screen = (rng.random(SCREEN_SHAPE) * 255).astype(np.uint8)
+    template = screen[400:460, 200:280].copy()
+
+    print(f"\nFFT backends on a {SCREEN_SHAPE[1]}x{SCREEN_SHAPE[0]} screen (median ms)")
+    print(f"{'backend':<10}" + "".join(f"{m:>12}" for m in FFT_MODES))
+    for name in ("numpy", "scipy", "opencv", "pyfftw"):
+        backend = get_fft_backend(name)
+        if backend.name != name:
+            print(f"{name:<10}{'unavailable':>12}")
+            continue
+        row = [
+            _median_time(
+                lambda: phase_correlate_match(
+                    screen, template, fft_mode=mode, backend=backend
+                ),
+                repeat,
+            )
+            for mode in FFT_MODES
+        ]
+        print(f"{name:<10}" + "".join(f"{t * 1e3:>12.2f}" for t in row))
+
+
+# ---------------------------------------------------------------------------
+# Coarse-to-fine pyramid matching
+# ---------------------------------------------------------------------------
+
+def bench_pyramid(repeat: int) -> None:
+    """Full-resolution vs. coarse-to-fine phase_correlate_match."""
+    screen = blob_screen(SCREEN_SHAPE)
+    positions = [(400, 200), (10, 500), (1000, 30), (700, 300)]
+
+    print(f"\npyramid phase_correlate_match, 60x80 template on a "
+          f"{SCREEN_SHAPE[1]}x{SCREEN_SHAPE[0]} screen")
+    print(f"{'levels':<8}{'mode':<12}{'median ms':>12}{'speed-up':>10}{'max err px':>12}")
+    for mode in ("complex128", "real32"):
+        base = None
+        for levels in (0, 1, 2):
+            worst = 0.0
+            for y, x in positions:
+                tmpl = screen[y: y + 60, x: x + 80].copy()
+                (dy, dx), _ = phase_correlate_match(
+                    screen, tmpl, fft_mode=mode, pyramid_levels=levels
+                )
+                worst = max(worst, abs(dy % SCREEN_SHAPE[0] - y), abs(dx % SCREEN_SHAPE[1] - x))
+            tmpl = screen[400:460, 200:280].copy()
+            t = _median_time(
+                lambda: phase_correlate_match(
+                    screen, tmpl, fft_mode=mode, pyramid_levels=levels
+                ),
+                repeat,
+            )
+            base = base or t
+            print(f"{levels:<8}{mode:<12}{t * 1e3:>12.2f}{base / t:>9.1f}x{worst:>12.3f}")
+
+
+# ---------------------------------------------------------------------------
+# Parallel pairwise offset estimation
+# ---------------------------------------------------------------------------
+
+def bench_parallel_offsets(repeat: int, frames: int = 24) -> None:
+    """Scaling of FrequencyDomainStitcher.estimate_offsets with worker count."""
+    h, w = SCREEN_SHAPE
+    _, images, _ = sweep_frames(frames, h=h, w=w, step=w - 200, jitter=(0, 2, -1))
+    cores = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, 8, cores} & set(range(1, max(cores, 2) + 1)))
+
+    print(f"\nestimate_offsets over {frames} frames of {w}x{h}, overlap 200 "
+          f"({cores} core(s) available; median ms)")
+    print(f"{'workers':<10}" + "".join(f"{m:>18}" for m in PARALLEL_MODES))
+    base = None
+    for n in counts:
+        row = []
+        for mode in PARALLEL_MODES:
+            stitcher = FrequencyDomainStitcher(overlap_hint=200, workers=n, parallel=mode)
+            t = _median_time(lambda: stitcher.estimate_offsets(images), repeat)
+            base = base or t
+            row.append(f"{t * 1e3:>10.1f} ({base / t:.2f}x)")
+        print(f"{n:<10}" + "".join(f"{c:>18}" for c in row))
+
+
+
+# ---------------------------------------------------------------------------
+# Regression suite
+# ---------------------------------------------------------------------------
+
+GAMEPLAY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "gameplay")
+STITCH_FRAME_COUNTS = (2, 10, 50)
+# A case regresses when p50 latency or peak memory grows by more than this fraction
+DEFAULT_TOLERANCE = 0.25
+# Peak-memory growth below this many KiB is never reported (allocator noise)
+MEMORY_SLACK_KIB = 64
+
+
+def _measure(fn, repeat: int, setup=None) -> dict:
+    """
+    Latency percentiles (ms) of *repeat* calls to *fn* after a warm-up, and
+    the peak traced memory (KiB) of one further call.  *setup*, if given,
+    runs untimed before every call.
+
+    Peak memory is what ``tracemalloc`` sees: Python objects and NumPy/OpenCV
+    arrays, not FFT library workspaces allocated outside NumPy.
+    """
+    if setup is not None:
+        setup()
+    fn()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    ms = np.array(samples) * 1e3
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return {
+        "repeat": repeat,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p90_ms": float(np.percentile(ms, 90)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "min_ms": float(ms.min()),
+        "max_ms": float(ms.max()),
+        "peak_kib": peak / 1024,
+    }
+
+
+def _gameplay_scene() -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    A synthetic SCREEN_SHAPE capture with every gameplay/ template pasted at
+    a fixed position, and the templates by name.
+    """
+    registry = TemplateRegistry(GAMEPLAY_DIR)
+    templates = {name: registry[name] for name in sorted(registry)}
+    screen = blob_screen(SCREEN_SHAPE, seed=3)
+    x, y, row_h = 8, 8, 0
+    for tmpl in templates.values():
+        h, w = tmpl.shape
+        if x + w > SCREEN_SHAPE[1] - 8:
+            x, y, row_h = 8, y + row_h + 8, 0
+        screen[y: y + h, x: x + w] = tmpl
+        x, row_h = x + w + 8, max(row_h, h)
+    return screen, templates
+
+
+def _suite_cases() -> tuple[dict, dict, dict]:
+    """
+    Benchmark callables by case name, untimed setup callables run before
+    each call of some cases, and cases skipped with the reason.
+    """
+    cases, setups, skipped = {}, {}, {}
+    screen, templates = _gameplay_scene()
+    tmpl_list = list(templates.values())
+    stitcher = FrequencyDomainStitcher()
+
+    cases["match/cv2.matchTemplate"] = lambda: [
+        cv2.matchTemplate(screen, t, cv2.TM_CCOEFF_NORMED) for t in tmpl_list
+    ]
+    cases["match/phase_correlate_match"] = lambda: [
+        phase_correlate_match(screen, t) for t in tmpl_list
+    ]
+    cases["match/FrequencyDomainStitcher.match_template"] = lambda: [
+        stitcher.match_template(screen, t, key=name) for name, t in templates.items()
+    ]
+
+    h, w = SCREEN_SHAPE
+    for n in STITCH_FRAME_COUNTS:
+        _, frames, _ = sweep_frames(n, h=h, w=w, step=w - 200, jitter=(0, 2, -1))
+
+        def pairwise(frames=frames):
+            panorama = frames[0]
+            for frame in frames[1:]:
+                panorama, _, _ = stitch_images_frequency(panorama, frame, overlap_hint=200)
+            return panorama
+
+        cases[f"stitch/stitch_images_frequency/{n}"] = pairwise
+        cases[f"stitch/FrequencyDomainStitcher.stitch/{n}"] = (
+            lambda frames=frames: FrequencyDomainStitcher(overlap_hint=200).stitch(frames)
+        )
+
+    aligner = FourierMellinAligner()
+    _, frames, _ = sweep_frames(2, h=h, w=w, step=w - 200, jitter=(0, 2, -1))
+    cases["stitch/stitch_with_rotation/2"] = lambda: stitch_with_rotation(
+        frames[0], frames[1], overlap_hint=200, aligner=aligner
+    )
+
+    # A fresh matcher per repetition, so learned windows, change-detector results and scales from
+    # one run do not speed up the next; the pre-screen's per-template calibration is a one-off
+    # startup cost in minfar, so it is shared (warmed by _measure's first call)
+    prescreen = PreScreen()
+    state = {}
+    names = sorted(templates)
+
+    def fresh_matcher():
+        state["matcher"] = TemplateMatcher(prescreen=prescreen)
+
+    fresh_matcher()
+    cases["match_and_handle"] = lambda: [
+        state["matcher"].match_and_handle(screen, templates[name], 0.8, lambda x, y: None, name=name)
+        for name in names
+    ]
+    setups["match_and_handle"] = fresh_matcher
+    return cases, setups, skipped
+
+
+def run_suite(repeat: int, only: str | None = None) -> dict:
+    """
+    Run the regression suite and return the JSON-serializable report.
+
+    Parameters
+    ----------
+    repeat : int
+        Timed repetitions per case.
+    only : str | None
+        Run only cases whose name starts with this prefix (e.g. ``"match/"``).
+    """
+    cases, setups, skipped = _suite_cases()
+    results = {}
+    print(f"{'case':<48}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'peak KiB':>12}")
+    for name, fn in cases.items():
+        if only is not None and not name.startswith(only):
+            continue
+        r = results[name] = _measure(fn, repeat, setups.get(name))
+        print(f"{name:<48}{r['p50_ms']:>10.2f}{r['p90_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['peak_kib']:>12.0f}")
+    for name, reason in skipped.items():
+        if only is not None and not name.startswith(only):
+            continue
+        print(f"{name:<48}skipped ({reason})")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+            "screen_shape": list(SCREEN_SHAPE),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list[str]:
+    """
+    Cases of *report* whose p50 latency or peak memory exceeds *baseline* by
+    more than *tolerance* (a fraction); returns one message per regression.
+    Cases missing from either side are ignored.
+    """
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        cur = report["results"].get(name)
+        if cur is None:
+            continue
+        if cur["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {cur['p50_ms']:.2f} ms vs baseline {base['p50_ms']:.2f} ms "
+                f"(+{cur['p50_ms'] / base['p50_ms'] - 1:.0%})"
+            )
+        if cur["peak_kib"] > base["peak_kib"] * (1 + tolerance) + MEMORY_SLACK_KIB:
+            regressions.append(
+                f"{name}: peak {cur['peak_kib']:.0f} KiB vs baseline {base['peak_kib']:.0f} KiB"
+            )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10,
+                        help="timed repetitions per measurement (default 10)")
+    parser.add_argument("--suite", action="store_true",
+                        help="run the regression suite instead of the exploratory tables")
+    parser.add_argument("--only", metavar="PREFIX",
+                        help="suite: run only cases whose name starts with PREFIX")
+    parser.add_argument("--json", metavar="PATH",
+                        help="suite: write the results as JSON to PATH")
+    parser.add_argument("--baseline", metavar="PATH",
+                        help="suite: compare against a results file, exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"suite: allowed slowdown/growth vs. the baseline (default {DEFAULT_TOLERANCE})")
+    args = parser.parse_args()
+
+    if args.suite:
+        report = run_suite(args.repeat, args.only)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as fh:
+                regressions = compare_to_baseline(report, json.load(fh), args.tolerance)
+            for message in regressions:
+                print(f"REGRESSION {message}")
+            if regressions:
+                sys.exit(1)
+            print(f"no regressions against {args.baseline} (tolerance {args.tolerance:.0%})")
+        return
+
+    bench_fft_modes(args.repeat)
+    bench_fft_backends(args.repeat)
+    bench_pyramid(args.repeat)
+    bench_parallel_offsets(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+"""
+Screen Capture Backends
+=======================
+``grab_screen_gray`` used ``pyautogui.screenshot()``: a full-desktop PIL
+image that is then cropped, copied to NumPy and converted to grayscale
+(another copy).  The backends here grab only the target region and convert
+it to grayscale straight into a caller-supplied (or freshly allocated)
+uint8 array.
+
+  mss       : ``mss`` grabs the region into a BGRA buffer that is viewed
+              (not copied) as NumPy; fastest on Windows and Linux/X11.
+  pyautogui : ``pyautogui.screenshot(region=...)`` - region only, no crop.
+  replay    : plays back recorded frames or image files (tests, offline
+              tuning of thresholds).
+
+Every backend records capture latency; see :meth:`CaptureBackend.stats`.
+
+Usage
+-----
+capture = get_capture_backend(region=(0, 0, 622, 1080))
+gray = capture.grab()                 # new array
+capture.grab(out=ring_slot)           # or into a preallocated buffer
+print(capture.summary())
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Iterable
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CAPTURE_BACKEND_ENV = "MINFAR_CAPTURE_BACKEND"
+
+CaptureStats = namedtuple("CaptureStats", ["frames", "mean_ms", "max_ms", "last_ms"])
+CaptureStats.__doc__ = """
+Capture latency counters.
+
+frames  : number of grabs.
+mean_ms : mean grab latency (capture + grayscale conversion).
+max_ms  : slowest grab.
+last_ms : latency of the most recent grab.
+"""
+
+
+class CaptureBackend:
+    """
+    Base class: subclasses implement :meth:`_grab_into`, which writes the
+    grayscale capture of ``region`` into a (height × width) uint8 array.
+    """
+
+    name = "base"
+
+    def __init__(self, region: tuple[int, int, int, int]) -> None:
+        """
+        Parameters
+        ----------
+        region : tuple[int, int, int, int]
+            (left, top, right, bottom) screen box, as ``SCREEN_CROP``.
+        """
+        left, top, right, bottom = region
+        if right <= left or bottom <= top:
+            raise ValueError(f"Empty capture region {region!r}.")
+        self.region = (int(left), int(top), int(right), int(bottom))
+        self.shape = (self.region[3] - self.region[1], self.region[2] - self.region[0])
+        self._frames = 0
+        self._total = 0.0
+        self._max = 0.0
+        self._last = 0.0
+        self._lock = threading.Lock()
+
+    def grab(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Capture the region as grayscale.
+
+        Parameters
+        ----------
+        out : np.ndarray | None
+            Preallocated (height × width) uint8 destination.  When None a new
+            array is returned, so earlier frames stay valid.
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=np.uint8)
+        elif out.shape != self.shape or out.dtype != np.uint8:
+            raise ValueError(
+                f"out must be a uint8 array of shape {self.shape}, got {out.dtype} {out.shape}."
+            )
+        t0 = time.perf_counter()
+        self._grab_into(out)
+        elapsed = time.perf_counter() - t0
+        with self._lock:
+            self._frames += 1
+            self._total += elapsed
+            self._max = max(self._max, elapsed)
+            self._last = elapsed
+        return out
+
+    def _grab_into(self, out: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> CaptureStats:
+        """Latency counters since the backend was created."""
+        with self._lock:
+            mean = self._total / self._frames if self._frames else 0.0
+            return CaptureStats(self._frames, mean * 1e3, self._max * 1e3, self._last * 1e3)
+
+    def summary(self) -> str:
+        """One-line latency report, e.g. for the log."""
+        s = self.stats()
+        return (
+            f"capture ({self.name}): {s.frames} frames, mean {s.mean_ms:.1f} ms, "
+            f"max {s.max_ms:.1f} ms"
+        )
+
+    def close(self) -> None:
+        """Release backend resources."""
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(region={self.region})"
+
+
+class MSSCaptureBackend(CaptureBackend):
+    """Region grabs with ``mss``; the BGRA buffer is converted without copying."""
+
+    name = "mss"
+
+    def __init__(self, region: tuple[int, int, int, int]) -> None:
+        import mss
+
+        super().__init__(region)
+        self._mss = mss
+        self._local = threading.local()      # mss handles are per-thread
+        left, top, _, _ = self.region
+        self._monitor = {"left": left, "top": top, "width": self.shape[1], "height": self.shape[0]}
+
+    def _grab_into(self, out: np.ndarray) -> None:
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = self._local.sct = self._mss.mss()
+        shot = sct.grab(self._monitor)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2GRAY, dst=out)
+
+    def close(self) -> None:
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+
+
+class PyAutoGUICaptureBackend(CaptureBackend):
+    """``pyautogui.screenshot(region=...)``: captures the region only."""
+
+    name = "pyautogui"
+
+    def __init__(self, region: tuple[int, int, int, int]) -> None:
+        import pyautogui
+
+        super().__init__(region)
+        self._pyautogui = pyautogui
+
+    def _grab_into(self, out: np.ndarray) -> None:
+        left, top, _, _ = self.region
+        shot = self._pyautogui.screenshot(region=(left, top, self.shape[1], self.shape[0]))
+        rgb = np.asarray(shot)
+        cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY, dst=out)
+
+
+class ReplayCaptureBackend(CaptureBackend):
+    """
+    Play back frames (arrays or image paths) in order, e.g. a recorded
+    session.  Color frames are converted to grayscale like a live grab.
+    """
+
+    name = "replay"
+
+    def __init__(
+        self,
+        frames: Iterable[np.ndarray | str],
+        region: tuple[int, int, int, int] | None = None,
+        loop: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        frames : Iterable[np.ndarray | str]
+            Frames or image file paths, each of the region's size.
+        region : tuple | None
+            Capture box; defaults to (0, 0, width, height) of the first frame.
+        loop : bool
+            Restart from the first frame when exhausted; otherwise raise
+            ``EOFError``.
+        """
+        self._frames_src = list(frames)
+        if not self._frames_src:
+            raise ValueError("ReplayCaptureBackend needs at least one frame.")
+        if region is None:
+            h, w = self._load(0).shape[:2]
+            region = (0, 0, w, h)
+        super().__init__(region)
+        self.loop = loop
+        self._pos = 0
+
+    def _load(self, i: int) -> np.ndarray:
+        frame = self._frames_src[i]
+        if isinstance(frame, np.ndarray):
+            return frame
+        img = cv2.imread(os.fspath(frame), cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise FileNotFoundError(f"Could not read replay frame {os.fspath(frame)!r}.")
+        return img
+
+    def _grab_into(self, out: np.ndarray) -> None:
+        if self._pos >= len(self._frames_src):
+            if not self.loop:
+                raise EOFError("Replay exhausted.")
+            self._pos = 0
+        frame = self._load(self._pos)
+        self._pos += 1
+        if frame.shape[:2] != self.shape:
+            raise ValueError(f"Replay frame shape {frame.shape[:2]} != region {self.shape}.")
+        if frame.ndim == 2:
+            np.copyto(out, frame)
+        else:
+            code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+            cv2.cvtColor(frame, code, dst=out)
+
+
+_CAPTURE_BACKENDS = {
+    "mss": MSSCaptureBackend,
+    "pyautogui": PyAutoGUICaptureBackend,
+}
+
+
+def get_capture_backend(
+    name: str | None = None,
+    region: tuple[int, int, int, int] = (0, 0, 622, 1080),
+) -> CaptureBackend:
+    """
+    Create a live capture backend for *region*.
+
+    Parameters
+    ----------
+    name : str | None
+        ``"mss"`` or ``"pyautogui"``.  When None the ``MINFAR_CAPTURE_BACKEND``
+        environment variable is used, defaulting to mss.
+    region : tuple
+        (left, top, right, bottom) screen box.
+
+    A backend whose package is not installed falls back to the other one
+    with a warning; ImportError is raised only if neither is available.
+    """
+    if name is None:
+        name = os.environ.get(CAPTURE_BACKEND_ENV, "mss") or "mss"
+    name = name.lower()
+    if name not in _CAPTURE_BACKENDS:
+        raise ValueError(
+            f"Unknown capture backend {name!r}; expected one of {sorted(_CAPTURE_BACKENDS)}."
+        )
+    order = [name] + [n for n in _CAPTURE_BACKENDS if n != name]
+    errors = []
+    for candidate in order:
+        try:
+            backend = _CAPTURE_BACKENDS[candidate](region)
+        except ImportError as exc:
+            errors.append(f"{candidate}: {exc}")
+            continue
+        if candidate != name:
+            logger.warning(
+                f"Capture backend {name!r} unavailable ({errors[0]}); using {candidate!r}."
+            )
+        return backend
+    raise ImportError("No capture backend available (" + "; ".join(errors) + ").")
@@ -0,0 +1,282 @@
+"""
+Asynchronous Capture Pipeline
+=============================
+``monitor_marchqueue`` captures, matches and clicks strictly in sequence and
+pads every step with a fixed ``time.sleep`` so the UI can settle.
+:class:`CapturePipeline` moves capture to a background thread that keeps a
+small ring buffer of timestamped grayscale frames filled, so a frame is
+ready the moment the matching stage asks for one.
+
+Instead of sleeping a fixed amount after an action, the caller asks for
+
+  - :meth:`CapturePipeline.next_frame` - the first frame whose capture
+    started after time T (so it cannot predate the action), or
+  - :meth:`CapturePipeline.settled_frame` - the first frame after T once the
+    screen has changed and then stopped changing for ``stable_for`` seconds.
+    If no change is seen it waits the full ``timeout`` (the old fixed
+    sleep), so a slow-starting transition is never mistaken for a settled
+    screen; the same bound caps animations that never settle.
+
+Timestamps are ``time.monotonic()`` seconds.
+
+Usage
+-----
+pipeline = CapturePipeline(get_capture_backend(region=SCREEN_CROP))
+pipeline.start()
+t = time.monotonic()
+pyautogui.click(x, y)
+frame = pipeline.settled_frame(after=t, timeout=3.0)
+match(frame.image)
+print(pipeline.summary())
+"""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+import cv2
+import numpy as np
+
+from capture import CaptureBackend
+
+logger = logging.getLogger(__name__)
+
+Frame = namedtuple("Frame", ["image", "seq", "timestamp", "stable_since"])
+Frame.__doc__ = """
+One captured frame.
+
+image        : grayscale uint8 array (never reused by the pipeline).
+seq          : capture sequence number, starting at 1.
+timestamp    : monotonic time the capture started.
+stable_since : timestamp of the first frame of the current run of
+               unchanged frames (== timestamp if this frame changed).
+"""
+
+PipelineStats = namedtuple(
+    "PipelineStats", ["captured", "served", "mean_wait_ms", "max_wait_ms"]
+)
+PipelineStats.__doc__ = """
+Pipeline counters.
+
+captured     : frames captured by the background thread.
+served       : frames returned by latest/next_frame/settled_frame.
+mean_wait_ms : mean time callers blocked waiting for a frame.
+max_wait_ms  : longest such wait.
+"""
+
+
+class CapturePipeline:
+    """Background capture thread feeding a ring buffer of recent frames."""
+
+    def __init__(
+        self,
+        backend: CaptureBackend,
+        size: int = 4,
+        interval: float = 0.05,
+        diff_level: int = 8,
+        stable_threshold: float = 0.005,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        backend : CaptureBackend
+            Source of grayscale frames (see :mod:`capture`).
+        size : int
+            Number of recent frames kept.
+        interval : float
+            Minimum seconds between capture starts (0 = capture back to back).
+        diff_level : int
+            Per-pixel absolute difference above which a pixel counts as changed.
+        stable_threshold : float
+            Largest fraction of changed pixels for which two consecutive
+            frames still count as "unchanged" (ignores cursor blinks and
+            small animations).
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1.")
+        self.backend = backend
+        self.interval = interval
+        self.diff_level = diff_level
+        self.stable_threshold = stable_threshold
+        self._frames: deque[Frame] = deque(maxlen=size)
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._seq = 0
+        self._last_error: Exception | None = None
+        self._served = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    # -- lifecycle ---------------------------------------------------------
+
+    def start(self) -> "CapturePipeline":
+        """Start the capture thread (no-op if it is already running)."""
+        if self.running:
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="capture-pipeline", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = 1.0) -> None:
+        """Stop the capture thread and wake up any waiting caller."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def __enter__(self) -> "CapturePipeline":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -- producer ----------------------------------------------------------
+
+    def _run(self) -> None:
+        prev = None
+        stable_since = 0.0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                image = self.backend.grab()
+            except Exception as e:                       # keep capturing; report on timeout
+                if self._last_error is None or type(e) is not type(self._last_error):
+                    logger.warning(f"Capture failed: {e}")
+                self._last_error = e
+                self._stop.wait(max(self.interval, 0.1))
+                continue
+            if prev is None or self._changed(prev, image):
+                stable_since = started
+            prev = image
+            with self._cond:
+                self._seq += 1
+                self._frames.append(Frame(image, self._seq, started, stable_since))
+                self._cond.notify_all()
+            remaining = self.interval - (time.monotonic() - started)
+            if remaining > 0:
+                self._stop.wait(remaining)
+
+    def _changed(self, a: np.ndarray, b: np.ndarray) -> bool:
+        if a.shape != b.shape:
+            return True
+        diff = cv2.absdiff(a, b)
+        changed = cv2.countNonZero(cv2.threshold(diff, self.diff_level, 255, cv2.THRESH_BINARY)[1])
+        return changed > self.stable_threshold * diff.size
+
+    # -- consumers ---------------------------------------------------------
+
+    def latest(self) -> Frame | None:
+        """Freshest frame in the buffer, or None before the first capture."""
+        with self._cond:
+            if not self._frames:
+                return None
+            self._served += 1
+            return self._frames[-1]
+
+    def next_frame(self, after: float | None = None, timeout: float = 2.0) -> Frame:
+        """
+        Return the earliest buffered frame whose capture started at or after
+        *after* (default: now), waiting for one if necessary.
+
+        Raises
+        ------
+        TimeoutError
+            No such frame arrived within *timeout* seconds.
+        """
+        if after is None:
+            after = time.monotonic()
+        return self._wait(lambda f: f.timestamp >= after, after, timeout, raise_on_timeout=True)
+
+    def settled_frame(
+        self,
+        after: float | None = None,
+        stable_for: float = 0.5,
+        timeout: float = 3.0,
+    ) -> Frame:
+        """
+        Return the first frame captured after *after* (default: now) once the
+        screen has changed after *after* and then been unchanged for
+        *stable_for* seconds.  A screen that merely stayed the same is not
+        "settled": the action may not have taken effect yet.  After *timeout*
+        seconds the newest frame captured after *after* is returned instead,
+        so a screen that never changes, or never stops animating, costs no
+        more than the fixed sleep it replaces.
+
+        Raises
+        ------
+        TimeoutError
+            Not a single frame arrived after *after* within *timeout* (plus
+            one capture interval).
+        """
+        if after is None:
+            after = time.monotonic()
+
+        def settled(f: Frame) -> bool:
+            return f.stable_since > after and f.timestamp - f.stable_since >= stable_for
+
+        t0 = time.monotonic()
+        frame = self._wait(settled, after, timeout, raise_on_timeout=False)
+        if frame is not None:
+            return frame
+        return self._wait(
+            lambda f: f.timestamp >= after, after, self.interval + 1.0,
+            raise_on_timeout=True, newest=True, started=t0,
+        )
+
+    def _wait(
+        self,
+        accept,
+        after: float,
+        timeout: float,
+        raise_on_timeout: bool,
+        newest: bool = False,
+        started: float | None = None,
+    ) -> Frame | None:
+        now = time.monotonic()
+        t0 = now if started is None else started
+        deadline = now + timeout
+        with self._cond:
+            while True:
+                frames = reversed(self._frames) if newest else self._frames
+                frame = next((f for f in frames if accept(f)), None)
+                if frame is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    if not raise_on_timeout:
+                        return None
+                    reason = f" (last capture error: {self._last_error})" if self._last_error else ""
+                    if not self.running:
+                        reason += " (pipeline not running)"
+                    raise TimeoutError(f"No frame captured after t={after:.3f} within {timeout:.2f} s{reason}.")
+                self._cond.wait(remaining)
+            waited = time.monotonic() - t0
+            self._served += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+        return frame
+
+    # -- reporting ---------------------------------------------------------
+
+    def stats(self) -> PipelineStats:
+        """Counters since the pipeline was created."""
+        with self._cond:
+            mean = self._wait_total / self._served if self._served else 0.0
+            return PipelineStats(self._seq, self._served, mean * 1e3, self._wait_max * 1e3)
+
+    def summary(self) -> str:
+        """One-line report, e.g. for the log."""
+        s = self.stats()
+        return (
+            f"capture pipeline: {s.captured} frames captured, {s.served} served, "
+            f"mean wait {s.mean_wait_ms:.0f} ms, max {s.max_wait_ms:.0f} ms"
+        )
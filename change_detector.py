@@ -0,0 +1,192 @@
+"""
+Frame-Change Detection
+======================
+The main loop captures the same few scenes (world page, town page, ...) of
+each client window every cycle and re-runs every template match even when
+the capture is pixel-identical to the previous one.
+
+:class:`FrameChangeDetector` keeps the previous frame per (window, scene)
+key and compares each new capture tile by tile.  Match results are cached
+per query together with the frame they were computed on; a query whose
+search region only covers tiles that have not changed since then reuses
+the cached result instead of re-correlating.
+
+Usage
+-----
+detector = FrameChangeDetector(tile=64)
+screen = grab()
+detector.observe(("wosmin", "town"), screen)
+pt = detector.reuse(("wosmin", "town"), screen, ("help", 0.8), region, lambda: find(screen))
+"""
+
+import threading
+from collections import namedtuple
+from typing import Callable, Hashable
+
+import numpy as np
+
+ChangeStats = namedtuple(
+    "ChangeStats", ["frames", "tiles", "changed_tiles", "hits", "misses"]
+)
+ChangeStats.__doc__ = """
+Detector counters.
+
+frames        : frames observed.
+tiles         : tiles compared over all observed frames.
+changed_tiles : tiles that differed from the previous frame of their key.
+hits          : queries answered from the cache.
+misses        : queries that had to be recomputed.
+"""
+
+
+class _SceneState:
+    """Last frame of one (window, scene) key and per-tile change times."""
+
+    __slots__ = ("frame", "frame_no", "changed_at", "results")
+
+    def __init__(self, frame: np.ndarray, frame_no: int, grid: tuple[int, int]) -> None:
+        self.frame = frame
+        self.frame_no = frame_no
+        self.changed_at = np.full(grid, frame_no, dtype=np.int64)
+        self.results: dict[Hashable, tuple[int, object]] = {}
+
+
+class FrameChangeDetector:
+    """Tile-based change detector with a per-scene match-result cache."""
+
+    def __init__(self, tile: int = 64, tolerance: int = 0) -> None:
+        """
+        Parameters
+        ----------
+        tile : int
+            Tile edge length in pixels.
+        tolerance : int
+            Largest absolute per-pixel difference still treated as
+            "unchanged" (0 = pixel-identical).
+        """
+        if tile < 1:
+            raise ValueError("tile must be at least 1.")
+        self.tile = tile
+        self.tolerance = tolerance
+        self._scenes: dict[Hashable, _SceneState] = {}
+        self._frame_no = 0
+        self._counts = [0, 0, 0, 0, 0]
+        self._lock = threading.Lock()
+
+    def _grid(self, shape: tuple[int, ...]) -> tuple[int, int]:
+        return (-(-shape[0] // self.tile), -(-shape[1] // self.tile))
+
+    def observe(self, key: Hashable, frame: np.ndarray) -> np.ndarray:
+        """
+        Register *frame* as the latest capture of *key* and return the
+        boolean mask of tiles that changed since the previous capture.
+        The frame is kept by reference; do not modify it afterwards.
+        """
+        with self._lock:
+            self._frame_no += 1
+            frame_no = self._frame_no
+            grid = self._grid(frame.shape)
+            state = self._scenes.get(key)
+            self._counts[0] += 1
+            self._counts[1] += grid[0] * grid[1]
+            if state is None or state.frame.shape != frame.shape:
+                self._scenes[key] = _SceneState(frame, frame_no, grid)
+                self._counts[2] += grid[0] * grid[1]
+                return np.ones(grid, dtype=bool)
+            prev = state.frame
+
+        if self.tolerance:
+            diff = np.abs(frame.astype(np.int16) - prev) > self.tolerance
+        else:
+            diff = frame != prev
+        if diff.ndim == 3:
+            diff = diff.any(axis=2)
+        ys = np.arange(0, frame.shape[0], self.tile)
+        xs = np.arange(0, frame.shape[1], self.tile)
+        changed = np.logical_or.reduceat(np.logical_or.reduceat(diff, ys, axis=0), xs, axis=1)
+
+        with self._lock:
+            state.frame = frame
+            state.frame_no = frame_no
+            state.changed_at[changed] = frame_no
+            self._counts[2] += int(changed.sum())
+        return changed
+
+    def reuse(
+        self,
+        key: Hashable | None,
+        frame: np.ndarray,
+        query: Hashable,
+        region: tuple[int, int, int, int] | None,
+        compute: Callable[[], object],
+    ) -> object:
+        """
+        Return the cached result of *query* on *frame* if no tile in
+        *region* changed since it was computed, else ``compute()`` (and
+        cache it).  A frame that is not the latest one observed under *key*
+        is always recomputed.
+
+        Parameters
+        ----------
+        key : Hashable | None
+            Scene key *frame* was passed to :meth:`observe` under; None =
+            not observed.
+        frame : np.ndarray
+            The capture being matched (identity-checked against that scene's latest frame).
+        query : Hashable
+            What is being computed, e.g. (template name, threshold).
+        region : tuple | None
+            (x1, y1, x2, y2) the result depends on; None = the whole frame.
+        compute : Callable
+            Produces the result when the cache cannot be used.
+        """
+        rows, cols = self._tile_span(frame.shape, region)
+        cache_key = (query, region)
+        with self._lock:
+            state = self._scenes.get(key) if key is not None else None
+            observed = state is not None and state.frame is frame
+            if observed:
+                entry = state.results.get(cache_key)
+                if entry is not None and state.changed_at[rows, cols].max() <= entry[0]:
+                    self._counts[3] += 1
+                    return entry[1]
+                self._counts[4] += 1
+                frame_no = state.frame_no
+        if not observed:
+            return compute()
+
+        result = compute()
+        with self._lock:
+            state.results[cache_key] = (frame_no, result)
+        return result
+
+    def _tile_span(
+        self,
+        shape: tuple[int, ...],
+        region: tuple[int, int, int, int] | None,
+    ) -> tuple[slice, slice]:
+        if region is None:
+            return slice(None), slice(None)
+        x1, y1, x2, y2 = region
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(shape[1], x2), min(shape[0], y2)
+        if x2 <= x1 or y2 <= y1:
+            return slice(None), slice(None)
+        t = self.tile
+        return slice(y1 // t, -(-y2 // t)), slice(x1 // t, -(-x2 // t))
+
+    def stats(self) -> ChangeStats:
+        """Counters since the detector was created."""
+        with self._lock:
+            return ChangeStats(*self._counts)
+
+    def summary(self) -> str:
+        """One-line report, e.g. for the log."""
+        s = self.stats()
+        queries = s.hits + s.misses
+        changed = 100.0 * s.changed_tiles / s.tiles if s.tiles else 0.0
+        reused = 100.0 * s.hits / queries if queries else 0.0
+        return (
+            f"frame changes: {changed:.0f}% of tiles changed over {s.frames} frames, "
+            f"{reused:.0f}% of matches reused ({s.hits}/{queries})"
+        )
@@ -0,0 +1,222 @@
+"""
+Template Matching Hot Path
+==========================
+``match_and_handle`` and the helpers it is built from, bundled with the
+caches they consult: the pre-screen (:mod:`prescreen`), learned search
+windows (:mod:`roi_index`), per-scene change detection
+(:mod:`change_detector`), per-window template scales (:mod:`scales`) and
+timing spans (:mod:`telemetry`).
+
+:class:`TemplateMatcher` holds no other state and imports nothing with
+side effects, so ``benchmark.py`` and tests can build one without a desktop
+session; ``minfar`` keeps a single instance wired to its window context.
+
+Usage
+-----
+matcher = TemplateMatcher(context=lambda: current_window_title())
+matcher.match_and_handle(screen, template, 0.8, lambda x, y: print(x, y), name="help")
+"""
+
+from typing import Callable, Hashable
+
+import cv2
+import numpy as np
+
+from change_detector import FrameChangeDetector
+from peaks import Hit, best_peak, find_peaks
+from prescreen import PreScreen
+from roi_index import ROIIndex
+from scales import TemplateScales
+from telemetry import Telemetry
+
+
+class TemplateMatcher:
+    """``cv2.matchTemplate`` behind the pre-screen, learned windows, change detection and scales."""
+
+    def __init__(
+        self,
+        prescreen: PreScreen | None = None,
+        roi_index: ROIIndex | None = None,
+        change_detector: FrameChangeDetector | None = None,
+        scales: TemplateScales | None = None,
+        telemetry: Telemetry | None = None,
+        context: Callable[[], str | None] | None = None,
+        method: int = cv2.TM_CCOEFF_NORMED,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        prescreen, roi_index, change_detector, scales, telemetry
+            Shared caches; None = a fresh, unpersisted instance (telemetry
+            disabled).
+        context : Callable | None
+            Returns the window being matched (keys learned windows and
+            scales); None = a single anonymous window.
+        method : int
+            Normalized ``cv2.TM_*`` correlation method.
+        """
+        self.prescreen = PreScreen() if prescreen is None else prescreen
+        self.roi_index = ROIIndex() if roi_index is None else roi_index
+        self.change_detector = FrameChangeDetector(tile=64) if change_detector is None else change_detector
+        self.scales = TemplateScales() if scales is None else scales
+        self.telemetry = Telemetry() if telemetry is None else telemetry
+        self.context = context
+        self.method = method
+
+    def match_scores(
+        self,
+        screen_gray: np.ndarray,
+        template: np.ndarray,
+        threshold: float,
+        region: tuple[int, int, int, int] | None = None,
+        name: str | None = None,
+    ) -> tuple[np.ndarray, int, int] | None:
+        """
+        Return (result, x_offset, y_offset): the score map of *template*
+        over *region* of *screen_gray* and the offset of its origin in
+        *screen_gray*, or None if the pre-screen ruled it out.  If *name* is
+        given, the cheap pre-screen runs first and can skip the full match.
+
+        region: Optional (x1, y1, x2, y2), inclusive-exclusive bounds in
+        *screen_gray*; clipped to the image, and ignored if empty.
+        """
+        x_offset = 0
+        y_offset = 0
+        search_area = screen_gray
+        if region is not None:
+            x1, y1, x2, y2 = region
+            # Ensure bounds are within the image dimensions
+            x1 = max(0, x1)
+            y1 = max(0, y1)
+            x2 = min(screen_gray.shape[1], x2)
+            y2 = min(screen_gray.shape[0], y2)
+            if x2 > x1 and y2 > y1:
+                search_area = screen_gray[y1:y2, x1:x2]
+                x_offset = x1
+                y_offset = y1
+
+        if name is not None:
+            clipped = (x_offset, y_offset, x_offset + search_area.shape[1], y_offset + search_area.shape[0])
+            if not self.prescreen.may_contain(screen_gray, template, threshold, clipped, name):
+                return None
+
+        with self.telemetry.span("matchTemplate", template=name):
+            result = cv2.matchTemplate(search_area, template, self.method)
+        return result, x_offset, y_offset
+
+    def find_template(
+        self,
+        screen_gray: np.ndarray,
+        template: np.ndarray,
+        threshold: float,
+        region: tuple[int, int, int, int] | None = None,
+        name: str | None = None,
+    ) -> tuple[int, int] | None:
+        """
+        Top-left (x, y) of the best match of *template* above *threshold*,
+        or None.  Same arguments as :meth:`match_scores`.
+        """
+        scores = self.match_scores(screen_gray, template, threshold, region, name)
+        if scores is None:
+            return None
+        result, x_offset, y_offset = scores
+        hit = best_peak(result, threshold)
+        if hit is None:
+            return None
+        return x_offset + hit.x, y_offset + hit.y
+
+    def find_templates(
+        self,
+        screen_gray: np.ndarray,
+        template: np.ndarray,
+        threshold: float,
+        region: tuple[int, int, int, int] | None = None,
+        name: str | None = None,
+        max_hits: int | None = None,
+    ) -> list[Hit]:
+        """
+        Up to *max_hits* (None = all) matches above *threshold* as
+        :class:`peaks.Hit` tuples, best first, with top-left corners in
+        *screen_gray* coordinates.  Overlapping detections of one instance
+        are merged (see :func:`peaks.find_peaks`).
+        """
+        scores = self.match_scores(screen_gray, template, threshold, region, name)
+        if scores is None:
+            return []
+        result, x_offset, y_offset = scores
+        hits = find_peaks(result, threshold, template.shape, max_hits)
+        return [Hit(x_offset + hit.x, y_offset + hit.y, hit.score) for hit in hits]
+
+    def match_and_handle(
+        self,
+        screen_gray: np.ndarray,
+        template: np.ndarray,
+        threshold: float,
+        on_match: Callable[[int, int], object],
+        region: tuple[int, int, int, int] | None = None,
+        name: str | None = None,
+        max_hits: int | None = 1,
+        scene: Hashable | None = None,
+    ) -> int:
+        """
+        Call ``on_match(x, y)`` with the centre of each match of *template*
+        above *threshold*, best first, for at most *max_hits* matches (None =
+        every instance), so one capture can drive several clicks.  Returns
+        the number of matches handled.
+
+        Named matches go through the caches: the template is matched at the
+        window's calibrated scale, the pre-screen can rule it out, a
+        single-match search without *region* tries the learned window first
+        (falling back to the full screen on a miss), and a screen registered
+        with ``change_detector.observe`` under the key *scene* reuses the
+        previous result when none of the tiles searched changed since.
+        Multi-match searches always cover *region* or the full screen.
+        """
+        context = self.context() if self.context is not None else None
+        if name is not None:
+            name, template = self.scales.resolve(name, template, context)
+        with self.telemetry.span("match", template=name, region=region or "learned"):
+            if max_hits != 1:
+                if name is None:
+                    points = self.find_templates(screen_gray, template, threshold, region, max_hits=max_hits)
+                else:
+                    points = self.change_detector.reuse(
+                        scene,
+                        screen_gray,
+                        (name, threshold, max_hits),
+                        region,
+                        lambda: self.find_templates(screen_gray, template, threshold, region, name, max_hits),
+                    )
+            elif name is None:
+                pt = self.find_template(screen_gray, template, threshold, region)
+                points = [pt] if pt is not None else []
+            elif region is None:
+                # locate() falls back to the full screen on a miss, so its result depends on the whole
+                # frame, not just the learned window: a cached miss must not outlive a change elsewhere.
+                pt = self.change_detector.reuse(
+                    scene,
+                    screen_gray,
+                    (name, threshold),
+                    None,
+                    lambda: self.roi_index.locate(
+                        name,
+                        template.shape,
+                        lambda r: self.find_template(screen_gray, template, threshold, r, name),
+                        context=context,
+                    ),
+                )
+                points = [pt] if pt is not None else []
+            else:
+                pt = self.change_detector.reuse(
+                    scene,
+                    screen_gray,
+                    (name, threshold),
+                    region,
+                    lambda: self.find_template(screen_gray, template, threshold, region, name),
+                )
+                points = [pt] if pt is not None else []
+        for pt in points:
+            x = pt[0] + template.shape[1] // 2
+            y = pt[1] + template.shape[0] // 2
+            on_match(x, y)
+        return len(points)
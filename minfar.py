@@ -1,5 +1,4 @@
 import cv2
-import numpy as np
 import pyautogui
 import threading
 import time
@@ -8,24 +7,26 @@ import os
 import logging
 import pygetwindow as gw
 
+from capture import get_capture_backend
+from capture_pipeline import CapturePipeline
+from change_detector import FrameChangeDetector
+from matching import TemplateMatcher
+from prescreen import PreScreen
+from roi_index import ROIIndex
+from routine import RESTART, STOP, RoutineDriver, load_routine
+from scales import TemplateScales
+from scheduler import WindowScheduler, WindowState, tile_capacity, unique_windows
+from telemetry import Telemetry
+from template_registry import TemplateRegistry
+from waits import Waiter
+
 # Global variables
 killswitch_activated = False
-Rally_activated = False
-Rally_activated2 = False
-Farm_activated = True
-window_index = 0
 
 class WindowTitleFilter(logging.Filter):
     def filter(self, record):
-        global windows, window_index
         try:
-            if 'windows' in globals() and windows:
-                if 0 <= window_index < len(windows):
-                    record.window_title = windows[window_index].title
-                else:
-                    record.window_title = "Unknown"
-            else:
-                record.window_title = "No Window"
+            record.window_title = current_window_title() or "No Window"
         except Exception:
             record.window_title = "Error"
         return True
@@ -34,123 +35,235 @@ class WindowTitleFilter(logging.Filter):
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(window_title)s - %(levelname)s - %(message)s')
 logging.getLogger().addFilter(WindowTitleFilter())
 
-windows = gw.getWindowsWithTitle('wosmin') + gw.getWindowsWithTitle('WOSMIN')
+# Runs one task queue per window in parallel; input injection is serialized (see scheduler.py).
+# Created before anything logs: WindowTitleFilter asks it for the window of the current thread.
+scheduler = WindowScheduler()
+
+# Constants
+SCREEN_CROP = (0, 0, 622, 1080)
+TM_METHOD = cv2.TM_CCOEFF_NORMED
+# Windows are tiled side by side this far apart so each can be captured without focus
+WINDOW_STRIDE = 640
+
+# Title lookup is case-insensitive, so both queries return the same windows; keep each once
+windows = unique_windows(gw.getWindowsWithTitle('wosmin') + gw.getWindowsWithTitle('WOSMIN'))
+# Every window's capture region must lie on screen, or its captures come back black and its clicks miss
+SCREEN_WIDTH = pyautogui.size()[0]
+max_windows = tile_capacity(SCREEN_WIDTH, WINDOW_STRIDE, SCREEN_CROP[2])
+if len(windows) > max_windows:
+    logging.error(
+        f"{len(windows)} game windows found but only {max_windows} fit side by side on a {SCREEN_WIDTH} px screen; "
+        f"ignoring {', '.join(repr(w.title) for w in windows[max_windows:])}"
+    )
+    windows = windows[:max_windows]
 if windows:
-    for win in windows:
+    for i, win in enumerate(windows):
         try:
-            win.moveTo(1, 1)
-            logging.info(f"Window '{win.title}' moved to (0, 0)")
+            win.moveTo(1 + i * WINDOW_STRIDE, 1)
+            logging.info(f"Window '{win.title}' moved to ({i * WINDOW_STRIDE}, 0)")
         except Exception as e:
             logging.error(f"Failed to move window '{win.title}': {e}")
 
-# Move console window
+# Move console window next to the last game window
 console_windows = gw.getWindowsWithTitle('KingShotAutoConsole')
-if console_windows:
+console_x = max(1, len(windows)) * WINDOW_STRIDE + 10
+if console_windows and console_x >= SCREEN_WIDTH:
+    logging.warning("No room for the console window right of the game windows; leaving it in place")
+elif console_windows:
     try:
-        console_windows[0].moveTo(650, 0)
-        logging.info("Console window moved to (650, 0)")
+        console_windows[0].moveTo(console_x, 0)
+        logging.info(f"Console window moved to ({console_x}, 0)")
     except Exception as e:
         logging.error(f"Failed to move console window: {e}")
 
-# Constants
-SCREEN_CROP = (0, 0, 622, 1080)
-TM_METHOD = cv2.TM_CCOEFF_NORMED
-
-def match_and_handle(screen_gray, template, threshold, on_match, region=None):
+# Learned search windows for templates matched without an explicit region
+roi_index = ROIIndex(os.path.join(os.path.dirname(__file__), 'roi_index.json'))
+# Per-window template scale, calibrated once so windows rendering at a different size still match
+template_scales = TemplateScales(os.path.join(os.path.dirname(__file__), 'scales.json'))
+# Coarse-correlation reject stage run before every named full-resolution match
+prescreen = PreScreen()
+# Per (window, scene) tile diff of consecutive captures; unchanged regions reuse match results
+change_detector = FrameChangeDetector(tile=64)
+# Seconds the screen must stay unchanged for grab_screen_gray(settle=...) to return early
+SETTLE_STABLE_FOR = 0.5
+# Polls UI conditions with backoff; the fixed sleeps they replace are the timeouts
+waiter = Waiter(poll_interval=0.1, max_interval=0.8)
+# Timing spans per window (capture, matches, keys, input, waits); off unless MINFAR_TELEMETRY
+# (JSONL path) or MINFAR_TELEMETRY_PORT (Prometheus text endpoint) is set, see telemetry.py
+telemetry = Telemetry.from_env(context=lambda: current_window_title())
+# match_and_handle and its helpers over the caches above, keyed by the current window
+matcher = TemplateMatcher(
+    prescreen=prescreen,
+    roi_index=roi_index,
+    change_detector=change_detector,
+    scales=template_scales,
+    telemetry=telemetry,
+    context=lambda: current_window_title(),
+    method=TM_METHOD,
+)
+# Seconds until a routine task's next pass after it acted on something / after an idle pass,
+# for tasks in routine.json that do not set their own retry / interval
+CYCLE_RETRY_DELAY = 3
+CYCLE_INTERVAL = 13
+# Account attributes routine checks may be enabled_by (validated when routine.json is loaded)
+ACCOUNT_TOGGLES = ("rally", "rally2", "farm")
+
+class Account(WindowState):
+    """Per-window state: its screen tile, capture pipeline and feature toggles."""
+
+    def __init__(self, index, win):
+        super().__init__(index, title=win.title, activate=win.activate, is_active=lambda: win.isActive)
+        self.win = win
+        self.left = index * WINDOW_STRIDE
+        x1, y1, x2, y2 = SCREEN_CROP
+        # Region-only grayscale capture (mss if installed, else pyautogui; see MINFAR_CAPTURE_BACKEND)
+        self.capture = get_capture_backend(region=(x1 + self.left, y1, x2 + self.left, y2))
+        # Background capture thread; grabs wait for a fresh (or settled) frame instead of sleeping
+        self.pipeline = CapturePipeline(self.capture, size=4, interval=0.1)
+        self.rally = False
+        self.rally2 = False
+        self.farm = True
+        # Change-detector key of the last grab_screen_gray(scene=...) capture; match_and_handle reuses
+        # results only for that exact frame, so a later capture without a scene just recomputes
+        self.scene = None
+
+accounts = [scheduler.add_window(Account(i, win)) for i, win in enumerate(windows)]
+
+def current_account():
+    """Account whose cycle is running on this thread, or None outside scheduled tasks."""
+    return scheduler.current()
+
+def current_window_title():
+    """Title of the window being automated, or None if there is none."""
+    account = current_account()
+    return account.title if account is not None else None
+
+def match_scores(screen_gray, template, threshold, region=None, name=None):
+    """Score map of template over region of screen_gray, or None; see matching.TemplateMatcher.match_scores."""
+    return matcher.match_scores(screen_gray, template, threshold, region, name)
+
+def find_template(screen_gray, template, threshold, region=None, name=None):
+    """Top-left (x, y) of the best match, or None; see matching.TemplateMatcher.find_template."""
+    return matcher.find_template(screen_gray, template, threshold, region, name)
+
+def find_templates(screen_gray, template, threshold, region=None, name=None, max_hits=None):
+    """Up to max_hits matches as peaks.Hit tuples, best first; see matching.TemplateMatcher.find_templates."""
+    return matcher.find_templates(screen_gray, template, threshold, region, name, max_hits)
+
+def match_and_handle(screen_gray, template, threshold, on_match, region=None, name=None, max_hits=1):
     """
-    Find matches of template in screen_gray above threshold, call on_match(x, y) for each match.
+    Find matches of template in screen_gray above threshold and call on_match(x, y) with the centre
+    of each, best match first, for at most max_hits matches (None = every instance on screen), so one
+    capture can drive several clicks. Returns the number of matches handled.
     If region is provided, limit the search to that rectangle within screen_gray.
+    If name is given, a cheap pre-screen (see prescreen.PreScreen) can rule the template out first.
+    Without a region, a named single-match search (max_hits=1) tries the window learned from earlier
+    matches of that template first (see roi_index.ROIIndex) and falls back to the full screen on a miss;
+    multi-match searches always cover the full screen.
+
+    Named matches on a screen captured with grab_screen_gray(scene=...) reuse the previous result
+    when none of the tiles they search changed since (see change_detector.FrameChangeDetector).
+    Named templates are matched at the window's calibrated scale (see scales.TemplateScales).
+    The matching itself lives in matching.TemplateMatcher, which has no import-time side effects.
 
     region: Optional tuple (x1, y1, x2, y2) specifying inclusive-exclusive bounds in the cropped screen coordinates.
     """
-    # Apply region of interest if provided
-    x_offset = 0
-    y_offset = 0
-    search_area = screen_gray
-    if region is not None:
-        x1, y1, x2, y2 = region
-        # Ensure bounds are within the image dimensions
-        x1 = max(0, x1)
-        y1 = max(0, y1)
-        x2 = min(screen_gray.shape[1], x2)
-        y2 = min(screen_gray.shape[0], y2)
-        if x2 > x1 and y2 > y1:
-            search_area = screen_gray[y1:y2, x1:x2]
-            x_offset = x1
-            y_offset = y1
-        else:
-            # Invalid region; fallback to full image
-            search_area = screen_gray
-            x_offset = 0
-            y_offset = 0
-
-    result = cv2.matchTemplate(search_area, template, TM_METHOD)
-    loc = np.where(result >= threshold)
-    if loc[0].size > 0:
-        for pt in zip(*loc[::-1]):
-            x = x_offset + pt[0] + template.shape[1] // 2
-            y = y_offset + pt[1] + template.shape[0] // 2
-            on_match(x, y)
-            break
-        return True
-    return False
+    account = current_account()
+    scene = account.scene if account is not None else None
+    return matcher.match_and_handle(screen_gray, template, threshold, on_match, region, name, max_hits, scene)
 
 def load_templates():
-    """Load and return all templates used by the script as a dict of grayscale images."""
+    """
+    Return the template registry for gameplay/ (a name -> grayscale image mapping).
+    Images are decoded lazily; their matching artifacts are cached in gameplay/.template_cache.npz.
+    """
     base_dir = os.path.join(os.path.dirname(__file__), 'gameplay')
-    return {
-        "marchqueue": cv2.imread(os.path.join(base_dir, "marchqueue.png"), cv2.IMREAD_GRAYSCALE),
-        "online": cv2.imread(os.path.join(base_dir, "online.png"), cv2.IMREAD_GRAYSCALE),
-        "completed": cv2.imread(os.path.join(base_dir, "completed.png"), cv2.IMREAD_GRAYSCALE),
-        "heroadvance": cv2.imread(os.path.join(base_dir, "heroadvance.png"), cv2.IMREAD_GRAYSCALE),
-        "contribution": cv2.imread(os.path.join(base_dir, "contribution.png"), cv2.IMREAD_GRAYSCALE),
-        "good": cv2.imread(os.path.join(base_dir, "good.png"), cv2.IMREAD_GRAYSCALE),
-        "free": cv2.imread(os.path.join(base_dir, "free.png"), cv2.IMREAD_GRAYSCALE),
-        "idle": cv2.imread(os.path.join(base_dir, "idle.png"), cv2.IMREAD_GRAYSCALE),
-        "world": cv2.imread(os.path.join(base_dir, "world.png"), cv2.IMREAD_GRAYSCALE),
-        "conquest": cv2.imread(os.path.join(base_dir, "conquest.png"), cv2.IMREAD_GRAYSCALE),
-        "conquest1": cv2.imread(os.path.join(base_dir, "conquest1.png"), cv2.IMREAD_GRAYSCALE),
-        "conquest2": cv2.imread(os.path.join(base_dir, "conquest2.png"), cv2.IMREAD_GRAYSCALE),
-        "help": cv2.imread(os.path.join(base_dir, "help.png"), cv2.IMREAD_GRAYSCALE),
-        "back": cv2.imread(os.path.join(base_dir, "back.png"), cv2.IMREAD_GRAYSCALE),
-        "fountain": cv2.imread(os.path.join(base_dir, "fountain.png"), cv2.IMREAD_GRAYSCALE),
-        "rally": cv2.imread(os.path.join(base_dir, "rally.png"), cv2.IMREAD_GRAYSCALE),
-        "rally2": cv2.imread(os.path.join(base_dir, "rally2.png"), cv2.IMREAD_GRAYSCALE),
-    }
-
-def grab_screen_gray():
-    """Capture the screen, crop to the app region, and return a grayscale numpy array."""
-    screenshot = pyautogui.screenshot()
-    screenshot = screenshot.crop(SCREEN_CROP)
-    screen_np = np.array(screenshot)
-    return cv2.cvtColor(screen_np, cv2.COLOR_RGB2GRAY)
+    return TemplateRegistry(base_dir, cache_path=os.path.join(base_dir, '.template_cache.npz'))
+
+# Screens, checks and actions of the game routine (see routine.py for the format)
+ROUTINE_PATH = os.path.join(os.path.dirname(__file__), 'routine.json')
+
+def load_game_routine(templates):
+    """
+    Compile routine.json once at startup.
+    Raises routine.RoutineError if it is invalid, references a template missing from gameplay/
+    or enables a check by a toggle Account does not have.
+    """
+    return load_routine(ROUTINE_PATH, templates, toggles=ACCOUNT_TOGGLES)
+
+def grab_screen_gray(scene=None, settle=None):
+    """
+    Return a grayscale numpy array of the app region captured after this call was made.
+    If scene is given (e.g. "world", "town"), the capture is registered with the change detector
+    under (window title, scene) so unchanged regions can reuse earlier match results.
+    If settle is given, wait for the screen to change and then stop changing, at most that many
+    seconds (the full time if nothing changes); this replaces a fixed time.sleep(settle) before the capture.
+    """
+    account = current_account()
+    pipeline = account.pipeline
+    with telemetry.span("capture", scene=scene, settle=bool(settle)):
+        if settle:
+            frame = pipeline.settled_frame(stable_for=SETTLE_STABLE_FOR, timeout=settle)
+        else:
+            frame = pipeline.next_frame()
+    screen_gray = frame.image
+    if scene is not None:
+        account.scene = (account.title, scene)
+        change_detector.observe(account.scene, screen_gray)
+    return screen_gray
+
+def wait_for(template, threshold, timeout, region=None, name=None, poll_interval=None):
+    """
+    Poll fresh captures until template matches above threshold, for at most timeout seconds.
+    Returns the centre (x, y) of the match as passed to match_and_handle's on_match, or None on timeout.
+    """
+    def seen():
+        found = []
+        match_and_handle(grab_screen_gray(), template, threshold, lambda x, y: found.append((x, y)), region=region, name=name)
+        return found[0] if found else None
+    with telemetry.span("wait", label=name):
+        return waiter.until(seen, timeout, label=name, poll_interval=poll_interval)
+
+def wait_until_gone(template, threshold, timeout, region=None, name=None, poll_interval=None):
+    """
+    Poll fresh captures until template no longer matches, for at most timeout seconds.
+    Returns True once it is gone, False on timeout.
+    """
+    def gone():
+        return not match_and_handle(grab_screen_gray(), template, threshold, lambda x, y: None, region=region, name=name)
+    label = None if name is None else f"{name} gone"
+    with telemetry.span("wait", label=label):
+        return bool(waiter.until(gone, timeout, label=label, poll_interval=poll_interval))
+
+def ui_settled(since):
+    """
+    SpecialClick expectation: the screen changed after time since (time.monotonic) and has
+    been unchanged for SETTLE_STABLE_FOR seconds since.
+    """
+    frame = current_account().pipeline.latest()
+    return (
+        frame is not None
+        and frame.stable_since > since
+        and frame.timestamp - frame.stable_since >= SETTLE_STABLE_FOR
+    )
 
 
 def safe_press(key):
     """
-    Safely press a key, ensuring the target window is active and within bounds.
-    Wraps pyautogui.press with error handling and logging.
+    Safely press a key, ensuring the target window is active.
+    Wraps pyautogui.press with error handling and logging; the keypress is serialized with the
+    input of all other windows (see scheduler.WindowScheduler.input).
     Returns False if the keypress was skipped, True if successful.
     """
-    global windows, window_index
     try:
-        # Verify window is still available and active
-        if not windows:
-            logging.warning(f"No windows available. Skipping keypress for key '{key}'.")
-            return False
-        
-        if not (0 <= window_index < len(windows)):
-            logging.warning(f"window_index {window_index} is out of bounds (0-{len(windows)-1}). Skipping keypress for key '{key}'.")
+        # Verify this thread is running a window's cycle
+        if current_account() is None:
+            logging.warning(f"No window to send the keypress to. Skipping keypress for key '{key}'.")
             return False
-        
-        try:
-            windows[window_index].activate()
-        except Exception as e:
-            logging.warning(f"Could not activate window before keypress: {e}. Skipping keypress for key '{key}'.")
-            return False
-        
-        # Perform the keypress
-        pyautogui.press(key)
+
+        # Perform the keypress with the window in front
+        with telemetry.span("input", kind="press"), scheduler.input():
+            pyautogui.press(key)
         return True
     except pyautogui.FailSafeException:
         logging.error("PyAutoGUI failsafe triggered (mouse moved to a corner). Aborting keypress.")
@@ -159,13 +272,26 @@ def safe_press(key):
         logging.exception(f"safe_press failed for key '{key}': {e}")
         return False
 
+def click(x, y):
+    """Click (x, y) in the current window's cropped screen coordinates, serialized with all other input."""
+    with telemetry.span("input", kind="click"), scheduler.input() as account:
+        pyautogui.click(account.left + x, y)
+
+def move_to(x, y):
+    """Move the mouse to (x, y) in the current window's cropped screen coordinates."""
+    with telemetry.span("input", kind="move"), scheduler.input() as account:
+        pyautogui.moveTo(account.left + x, y)
+
+def drag(start, end, duration=1):
+    """Drag from start to end (x, y) in the current window's coordinates, as one uninterrupted input step."""
+    with telemetry.span("input", kind="drag"), scheduler.input() as account:
+        pyautogui.moveTo(account.left + start[0], start[1])
+        pyautogui.dragTo(account.left + end[0], end[1], duration=duration)
+
 
 # Function to monitor the killswitch key
 def monitor_killswitch(killswitch_key):
     global killswitch_activated
-    global Rally_activated
-    global Rally_activated2
-    global Farm_activated
     while True:
         if keyboard.is_pressed(killswitch_key) or keyboard.is_pressed('Ctrl+C'):
             logging.info("Killswitch activated (Key or End). Exiting...")
@@ -174,278 +300,148 @@ def monitor_killswitch(killswitch_key):
             os._exit(0)
         if keyboard.is_pressed('r'):
             logging.info("Rally activated.")
-            Rally_activated = not Rally_activated
+            for account in accounts:
+                account.rally = not account.rally
         if keyboard.is_pressed('t'):
             logging.info("Rally 2 activated.")
-            Rally_activated2 = not Rally_activated2
+            for account in accounts:
+                account.rally2 = not account.rally2
         if keyboard.is_pressed('f'):
             logging.info("Farm activated.")
-            Farm_activated = not Farm_activated
+            for account in accounts:
+                account.farm = not account.farm
         time.sleep(0.1)
 
+# Housekeeping interval of monitor_marchqueue in seconds
+HOUSEKEEPING_INTERVAL = 15
+
 # Function to monitor the marchqueue empty
 def monitor_marchqueue(click_delay):
-    global killswitch_activated
-    global Rally_activated
-    global Rally_activated2
-    global Farm_activated
-    global windows
-    global window_index
-    method = TM_METHOD
+    """
+    Run every window's cycle on the scheduler and do the housekeeping: persist template artifacts,
+    learned search windows and template scales, export telemetry (if enabled), and log statistics every 20 rounds.
+    """
     templates = load_templates()
-
-    window_index = 0    
-    while True:
-        if windows:
-            try:
-                windows[window_index].activate()
-            except Exception:
-                print("Ok")
-
-        # Check if killswitch is activated after processing each image
-        if killswitch_activated:
-            break
-
-        time.sleep(3)
-
-        #open wilderness
-        delay = [1,3]
-        key=["S","1"]
-        SpecialClick(key,delay)        
-        screen_gray = grab_screen_gray()
-
-        #always click on world
-        def on_world(x, y):
-            pyautogui.click(x, y)
-            time.sleep(3)
-            pyautogui.moveTo(10,10)
-            logging.info(f"Clicked on world ({x}, {y})")
-        if match_and_handle(screen_gray, templates["world"], 0.9, on_world):
-            continue
-
-        #always click on help
-        def on_help(x, y):
-            pyautogui.click(x, y)
-            time.sleep(3)
-            pyautogui.moveTo(10,10)
-            logging.info(f"Clicked on help ({x}, {y})")
-        if match_and_handle(screen_gray, templates["help"], 0.8, on_help):
-            continue    
-
-        #always click on back
-        def on_back(x, y):
-            pyautogui.click(x, y)
-            time.sleep(3)
-            pyautogui.moveTo(10,10)
-            logging.info(f"Clicked on back ({x}, {y})")
-        if match_and_handle(screen_gray, templates["back"], 0.7, on_back, region=(0, 0, 105, 117)):
-            continue    
-
-        # Perform template matching for marchqueue
-        def on_marchqueue(x, y):
-            time.sleep(3)
-            # additonal bread gathering
-            #delay = [1.5,1.5,1.5,1.5,1.5,2.5,1.5,1.5]
-            #key = ["I","left","left","O","F","G","6","E"]
-            #SpecialClick(key,delay)
-
-            # bread gathering
-            SpecialClick(['I','I'], [1.5,1.5])
-            pyautogui.moveTo(522,768)
-            pyautogui.dragTo(70,768,duration = 1)
-            SpecialClick(['B','F','G','1','2','E'], [1.5,1.5,2.5,1.5,1.5,1.5])
-            
-            # wood gathering
-            SpecialClick(['I','I'], [1.5,1.5])
-            pyautogui.moveTo(522,768)
-            pyautogui.dragTo(70,768,duration = 1)
-            SpecialClick(["O","F","G","1","2","E"], [1.5,1.5,2.5,1.5,1.5,1.5])
-            
-            # stone gathering
-            SpecialClick(['I','I'], [1.5,1.5])
-            pyautogui.moveTo(522,768)
-            pyautogui.dragTo(70,768,duration = 1)
-            SpecialClick(["N","F","G","1","2","E"], [1.5,1.5,2.5,1.5,1.5,1.5])
-            
-            # iron gathering
-            SpecialClick(['I','I'], [1.5,1.5])
-            pyautogui.moveTo(522,768)
-            pyautogui.dragTo(70,768,duration = 1)
-            SpecialClick(["L","F","G","1","2","E","s"], [1.5,1.5,2.5,1.5,1.5,1.5,1.5])
-            
-            # SpecialClick(['I','I'], [1.5,1.5])
-            # pyautogui.moveTo(522,768)
-            # pyautogui.dragTo(70,768,duration = 1)
-            # SpecialClick(["N","F","G","6","E","s"], [1.5,1.5,2.5,1.5,1.5,3])
-
-            SpecialClick(['I','I'], [1.5,1.5])
-            pyautogui.moveTo(522,768)
-            pyautogui.dragTo(10,768,duration = 1)
-            SpecialClick(["L","F","G","6","E","s"], [1.5,1.5,2.5,1.5,1.5,3])
-
-            logging.info(f"finished sending army")
-        if Farm_activated:
-            match_and_handle(screen_gray, templates["marchqueue"], 0.9, on_marchqueue)
-        
-        # start to do rally
-        if Rally_activated:
-            def on_rally(x, y):
-                time.sleep(1)
-                pyautogui.moveTo(x, y)
-                time.sleep(1)
-                pyautogui.moveTo(10,10)
-                SpecialClick(['I','I'], [1.5,1.5])
-                pyautogui.moveTo(70,768)
-                pyautogui.dragTo(522,768,duration = 1)
-                SpecialClick(["o","f","9","u","7","e"], [1.5,2.5,1.5,1.5,1.5,1.5])
-                logging.info(f"Clicked on rally ({x}, {y})")
-            match_and_handle(screen_gray, templates["rally"], 0.7, on_rally,region=(108, 543, 280, 638))
-
-        # start to do rally 2
-        if Rally_activated2:
-            def on_rally2(x, y):
-                time.sleep(1)
-                pyautogui.moveTo(x, y)
-                time.sleep(1)
-                pyautogui.moveTo(10,10)
-                SpecialClick(['I','I'], [1.5,1.5])
-                pyautogui.moveTo(70,768)
-                pyautogui.dragTo(522,768,duration = 1)
-                SpecialClick(["o","f","9","u","8","e"], [1.5,2.5,1.5,1.5,1.5,1.5])
-                logging.info(f"Clicked on rally2 ({x}, {y})")
-            match_and_handle(screen_gray, templates["rally2"], 0.8, on_rally2,region=(108, 581, 280, 639))
-        #Go to town page
-        delay = [0.5,2]
-        key =["S","5"]
-        SpecialClick(key,delay) 
-        time.sleep(2)
-
-        screen_gray = grab_screen_gray()
-
-        # Perform template online for cavalry inf archer
-        def on_completed(x, y):
-            logging.info(f"Clicked on completed ({x}, {y})")
-            time.sleep(3)
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            time.sleep(3)
-            if windows[window_index].title == "wosmin" or windows[window_index].title == "WOSMIN":
-                SpecialClick(["9","g","p","9","9","t","esc","s"], [3,1.5,1.5,1.5,1.5,1.5,1.5,3])
-            else:
-                SpecialClick(["9","g","a","9","9","t","esc","s"], [3,1.5,1.5,1.5,1.5,1.5,1.5,3])
-
-        if match_and_handle(screen_gray, templates["completed"], 0.8, on_completed):
-            continue
-
-        # peform template matching for idle
-        def on_idle(x, y):
-            logging.info(f"Clicked on idle ({x}, {y})")
-            time.sleep(3)
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            time.sleep(3)
-            SpecialClick(["9","g","a","9","9","t","esc","s"], [3,1.5,1.5,1.5,1.5,1.5,1.5,3])
-        if match_and_handle(screen_gray, templates["idle"], 0.8, on_idle, region=(129, 300, 294, 468) if windows[window_index].title == "wosmin" else (67, 459, 351, 646)):
-            continue
-
-        # check for conquest here
-        def on_conquest(x, y):
-            time.sleep(3)
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            time.sleep(3)
-            # click on conquest 1
-            screen_gray2 = grab_screen_gray()
-            if match_and_handle(screen_gray2, templates["conquest1"], 0.9, lambda x2, y2: (pyautogui.click(x2, y2), pyautogui.moveTo(10,10), logging.info(f"Clicked on conquest1 ({x2}, {y2})"), time.sleep(3))):
-                screen_gray2 = grab_screen_gray()
-                match_and_handle(screen_gray2, templates["conquest2"], 0.9, lambda x2, y2: (pyautogui.click(x2, y2), pyautogui.moveTo(10,10), logging.info(f"Clicked on conquest2 ({x2}, {y2})"), time.sleep(3)))
-                SpecialClick(["s","esc"], [1,1])
-                time.sleep(3)
-            logging.info(f"Clicked on conquest ({x}, {y})")
-        # Limit conquest match to rectangle (58,990)-(104,1030)
-        if match_and_handle(screen_gray, templates["conquest"], 0.8, on_conquest, region=(68, 946, 90, 966)):
-            continue
-
-        #check for online gift here
-        delay = [0.5,2]
-        key =["S","5"]
-        SpecialClick(key,delay) 
-        time.sleep(2)
-
-        pyautogui.moveTo(201,694)
-        pyautogui.dragTo(201,60,duration = 1)
-
-        time.sleep(2)
-
-        screen_gray = grab_screen_gray()
-
-        # Perform template online for online
-        def on_online(x, y):
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            SpecialClick(["s","s"], [1,1])
-            logging.info(f"Clicked on online ({x}, {y})")
-        if match_and_handle(screen_gray, templates["online"], 0.85, on_online):
-            continue
-
-        # Perform template fountain for online
-        def on_fountain(x, y):
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            SpecialClick(["9","L","home"], [1,1,1])
-            logging.info(f"Clicked on fountain ({x}, {y})")
-        if match_and_handle(screen_gray, templates["fountain"], 0.85, on_fountain):
-            continue
-
-        # Perform template matching for heroadvance            
-        def on_heroadvance(x, y):
-            pyautogui.click(x, y)
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            logging.info(f"Clicked on advance hero ({x}, {y})")
-            time.sleep(3)
-            # recruit hero
-            screen_gray2 = grab_screen_gray()
-            def on_free(x2, y2):
-                pyautogui.click(x2, y2)
-                pyautogui.moveTo(10,10)
-                time.sleep(3)
-                SpecialClick(["s","esc","esc","s"], [3,3,3,3])
-                logging.info(f"free recruit ({x2}, {y2})")
-                time.sleep(3)
-            match_and_handle(screen_gray2, templates["free"], 0.85, on_free)
-        if match_and_handle(screen_gray, templates["heroadvance"], 0.75, on_heroadvance, region=(62, 296, 300, 532)):
-            continue
- 
-        # Perform template matching for contribution
-        def on_contribution(x, y):
-            time.sleep(3)
-            pyautogui.click(x, y)
-            pyautogui.moveTo(10,10)
-            logging.info(f"contribution  ({x}, {y})")
-            time.sleep(3)
-            SpecialClick(["e","n","esc","n"], [3,3,3,3])
-            screen_gray2 = grab_screen_gray()
-            def on_good(x2, y2):
-                pyautogui.click(x2, y2)
-                pyautogui.moveTo(10,10)
-                time.sleep(3)
-                SpecialClick(["h"]*24 + ["esc"]*3 + ["s"], [1]*24 + [3]*4)
-                logging.info(f"Clicked on good ({x2}, {y2}) 25 time")
-                time.sleep(3)
-            match_and_handle(screen_gray2, templates["good"], 0.8, on_good)
-        if match_and_handle(screen_gray, templates["contribution"], 0.85, on_contribution):
-            continue
-
-        # Check if killswitch is activated after processing each image
-        if killswitch_activated:
-            break
-
-        if (window_index == 0):
-            window_index = 1
-        else:
-            window_index = 0
-        time.sleep(10)        
+    prescreen.pyramids = templates.pyramid
+    routine = load_game_routine(templates)
+    for account in accounts:
+        account.pipeline.start()
+        # Each routine task (rally, march queue, town) is its own scheduler task with its own deadline,
+        # so an open rally is checked every few seconds and wins the input lock over a due town pass
+        for task in routine.tasks.values():
+            scheduler.schedule(
+                account,
+                task.name,
+                lambda account, task=task: run_task(account, routine, templates, task),
+                priority=task.priority,
+            )
+    scheduler.start()
+
+    cycle = 0
+    while not killswitch_activated:
+        time.sleep(HOUSEKEEPING_INTERVAL)
+        templates.save()
+        roi_index.save()
+        template_scales.save()
+        if telemetry.jsonl_path:
+            telemetry.export_jsonl()
+        cycle += 1
+        if cycle % 20 == 0:
+            logging.info(prescreen.summary())
+            logging.info(change_detector.summary())
+            logging.info(template_scales.summary())
+            for account in accounts:
+                logging.info(f"{account.title}: {account.capture.summary()}")
+                logging.info(f"{account.title}: {account.pipeline.summary()}")
+            logging.info(waiter.summary())
+            logging.info(routine.summary())
+            logging.info(scheduler.summary())
+            logging.info(telemetry.summary())
+    scheduler.stop()
+    telemetry.close()
+
+class MinfarDriver(RoutineDriver):
+    """Routine primitives (capture, match, input) for one account, used from its scheduler task."""
+
+    def __init__(self, account, templates):
+        self.account = account
+        self.templates = templates
+        self.title = account.title
+
+    def stopped(self):
+        return killswitch_activated
+
+    def flag(self, name):
+        return getattr(self.account, name)
+
+    def capture(self, scene, settle):
+        return grab_screen_gray(scene=scene, settle=settle)
+
+    def find(self, screen, check):
+        found = []
+        match_and_handle(screen, self.templates[check.template], check.threshold, lambda x, y: found.append((x, y)), region=check.region, name=check.name)
+        return found[0] if found else None
+
+    def find_all(self, screen, check):
+        found = []
+        match_and_handle(screen, self.templates[check.template], check.threshold, lambda x, y: found.append((x, y)), region=check.region, name=check.name, max_hits=check.max_hits)
+        return found
+
+    def wait_for(self, checks, timeout):
+        def seen():
+            screen = grab_screen_gray()
+            for i, check in enumerate(checks):
+                pt = self.find(screen, check)
+                if pt is not None:
+                    return i, pt
+            return None
+        label = "/".join(c.name for c in checks)
+        with telemetry.span("wait", label=label):
+            return waiter.until(seen, timeout, label=label)
+
+    def wait_gone(self, check, timeout):
+        return wait_until_gone(self.templates[check.template], check.threshold, timeout, region=check.region, name=check.name)
+
+    def click(self, x, y, count=1):
+        for _ in range(count):
+            click(x, y)
+
+    def move(self, x, y):
+        move_to(x, y)
+
+    def drag(self, start, end, duration):
+        drag(start, end, duration=duration)
+
+    def keys(self, keys, delays, settle):
+        SpecialClick(keys, delays, expect=ui_settled if settle else None)
+
+    def sleep(self, seconds):
+        with telemetry.span("sleep", reason="routine"):
+            time.sleep(seconds)
+
+    def log(self, message):
+        logging.info(message)
+
+def run_task(account, routine, templates, task):
+    """
+    One pass of a routine task (see routine.Task) over account's window, e.g. the rally check on
+    the world page. The window's template scale is calibrated on its first pass (retried while
+    nothing matches). Runs as a scheduler task on its own thread; returns the seconds until the
+    task's next pass.
+    """
+    driver = MinfarDriver(account, templates)
+    if not routine.enabled(task.name, driver):
+        return task.interval or CYCLE_INTERVAL
+    with telemetry.span("cycle", task=task.name):
+        if template_scales.needs_calibration(account.title):
+            with telemetry.span("calibrate"):
+                template_scales.calibrate(account.title, grab_screen_gray(), {name: templates[name] for name in routine.templates})
+        outcome = routine.run(driver, task.name)
+    if outcome == STOP:
+        return None
+    if outcome == RESTART:
+        return task.retry or CYCLE_RETRY_DELAY
+    return task.interval or CYCLE_INTERVAL
 
 # Function to search for images on the screen and click on them if found
 def search_and_click(images, threshold=0.95, click_delay=6, killswitch_key='q'):
@@ -461,17 +457,33 @@ def search_and_click(images, threshold=0.95, click_delay=6, killswitch_key='q'):
     farm_thread.start()
 
 
-def SpecialClick(keypress, delay):
+def SpecialClick(keypress, delay, expect=None):
     """
     Press a sequence of keys with specified delays, with boundary/safety checks.
     Uses safe_press to ensure window activation and proper error handling.
+
+    expect: optional expected-state check per key (a list, or one check for every key). A check is
+    called as check(since) with the time.monotonic() of the previous keypress and returns True once
+    the UI is ready for the next key, e.g. ui_settled. The key is then pressed right away; its delay
+    is only the upper bound. None entries keep the fixed delay.
     """
-    # Wait before starting keypresses to allow for window focus
-    time.sleep(1)
-  
-    for key, delayclick in zip(keypress, delay):
-        time.sleep(delayclick)
-        safe_press(key)
+    with telemetry.span("special_click", keys=len(keypress)):
+        # Wait before starting keypresses to allow for window focus
+        with telemetry.span("sleep", reason="focus"):
+            time.sleep(1)
+        if expect is None or callable(expect):
+            expect = [expect] * len(keypress)
+
+        since = time.monotonic()
+        for key, delayclick, check in zip(keypress, delay, expect):
+            if check is None:
+                with telemetry.span("sleep", reason="keypress"):
+                    time.sleep(delayclick)
+            else:
+                with telemetry.span("wait", label="keypress"):
+                    waiter.until(lambda: check(since), delayclick, label="keypress")
+            safe_press(key)
+            since = time.monotonic()
 
 # Main function to execute the script
 def main():
@@ -0,0 +1,107 @@
+"""
+Match Peaks
+===========
+``find_template`` used to run ``np.where(result >= threshold)`` on the
+``cv2.matchTemplate`` score map, which materializes two index arrays with
+one entry for every pixel above the threshold (hundreds around each real
+match), and then took the first one in scan order: not the best match, and
+only ever one.
+
+  - :func:`best_peak` - the single best score via ``cv2.minMaxLoc`` (one
+    pass, no allocation).
+  - :func:`find_peaks` - up to *max_hits* scored hits: local maxima found
+    by comparing the map with its grey dilation, so only the handful of
+    peak pixels are ever turned into coordinates, then greedy
+    non-maximum suppression so overlapping detections of the same instance
+    collapse into one.
+
+Score maps are "higher is better" (``TM_CCOEFF_NORMED``, ``TM_CCORR_NORMED``).
+
+Usage
+-----
+result = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+hit = best_peak(result, 0.8)                       # Hit(x, y, score) or None
+hits = find_peaks(result, 0.8, template.shape)     # all instances, best first
+"""
+
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+Hit = namedtuple("Hit", ["x", "y", "score"])
+Hit.__doc__ = """
+One template match.
+
+x, y  : top-left corner of the match in score-map (search area) coordinates.
+score : matching score at that position.
+"""
+
+
+def best_peak(result: np.ndarray, threshold: float) -> Hit | None:
+    """Highest-scoring position of *result* if it reaches *threshold*, else None."""
+    _, score, _, (x, y) = cv2.minMaxLoc(result)
+    if score < threshold:
+        return None
+    return Hit(int(x), int(y), float(score))
+
+
+def find_peaks(
+    result: np.ndarray,
+    threshold: float,
+    size: tuple[int, int],
+    max_hits: int | None = None,
+    overlap: float = 0.3,
+) -> list[Hit]:
+    """
+    Scored, deduplicated matches in *result*, best first.
+
+    Parameters
+    ----------
+    result : np.ndarray
+        float32 score map from ``cv2.matchTemplate``.
+    threshold : float
+        Minimum score of a hit.
+    size : tuple[int, int]
+        Template (h, w); sets the peak neighbourhood and the NMS boxes.
+    max_hits : int | None
+        Return at most this many hits (None = all).  ``max_hits=1`` is
+        :func:`best_peak`.
+    overlap : float
+        Largest intersection-over-union two template-sized boxes may have
+        and still both be kept.
+    """
+    if max_hits is not None and max_hits < 1:
+        raise ValueError("max_hits must be at least 1.")
+    if max_hits == 1:
+        hit = best_peak(result, threshold)
+        return [] if hit is None else [hit]
+    if cv2.minMaxLoc(result)[1] < threshold:
+        return []
+
+    h, w = size
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(w // 2, 1) | 1, max(h // 2, 1) | 1))
+    peaks = (result >= cv2.dilate(result, kernel)) & (result >= threshold)
+    points = cv2.findNonZero(peaks.view(np.uint8))
+    if points is None:
+        return []
+    points = points.reshape(-1, 2)
+    xs, ys = points[:, 0], points[:, 1]
+    scores = result[ys, xs]
+
+    kept: list[Hit] = []
+    area = float(h * w)
+    for i in np.argsort(-scores, kind="stable"):
+        x, y = int(xs[i]), int(ys[i])
+        if any(_iou(x - k.x, y - k.y, w, h, area) > overlap for k in kept):
+            continue
+        kept.append(Hit(x, y, float(scores[i])))
+        if max_hits is not None and len(kept) >= max_hits:
+            break
+    return kept
+
+
+def _iou(dx: int, dy: int, w: int, h: int, area: float) -> float:
+    """Intersection-over-union of two w x h boxes offset by (dx, dy)."""
+    inter = max(0, w - abs(dx)) * max(0, h - abs(dy))
+    return inter / (2 * area - inter)
@@ -0,0 +1,245 @@
+"""
+Fast-Reject Pre-Screen
+======================
+Most ``match_and_handle`` calls find nothing, yet each pays for a full
+``cv2.matchTemplate`` over its search area.  :class:`PreScreen` is a cheap
+cascade stage run first: the same ``TM_CCOEFF_NORMED`` correlation on
+``cv2.pyrDown`` levels of the screen and template (up to 2 levels, i.e.
+~256x fewer multiply-adds).  Only when the coarse score could still reach
+the caller's threshold does the full-resolution match run.
+
+Two details keep the coarse score a reliable bound:
+
+  - Only the *interior* of the coarse template is correlated.  Its border
+    pixels mix in whatever surrounds the template on screen, which made
+    coarse scores of true matches drop to ~0.3 on some backgrounds.
+  - The coarse threshold is calibrated per template: the worst coarse
+    self-score over all sub-sampling phases, less the headroom the caller
+    already allows (``1 - threshold``) and a small ``slack``.
+
+Every ``audit_interval``-th rejection is double-checked at full resolution,
+so the reported false-reject count shows whether the calibration holds.
+
+Usage
+-----
+prescreen = PreScreen()
+if prescreen.may_contain(screen, template, 0.8, region, name="help"):
+    result = cv2.matchTemplate(...)
+print(prescreen.summary())
+"""
+
+import threading
+from collections import namedtuple
+from typing import Callable
+
+import cv2
+import numpy as np
+
+PreScreenStats = namedtuple(
+    "PreScreenStats", ["checks", "rejects", "audits", "false_rejects"]
+)
+PreScreenStats.__doc__ = """
+Counters for one template.
+
+checks        : pre-screen evaluations.
+rejects       : evaluations that ruled the template out.
+audits        : rejections re-checked at full resolution.
+false_rejects : audited rejections where the full match did succeed.
+"""
+
+_Coarse = namedtuple("_Coarse", ["level", "interior", "self_score"])
+
+
+def _pyr_down(img: np.ndarray, levels: int) -> np.ndarray:
+    for _ in range(levels):
+        img = cv2.pyrDown(img)
+    return img
+
+
+class PreScreen:
+    """Coarse-correlation reject stage in front of ``cv2.matchTemplate``."""
+
+    def __init__(
+        self,
+        levels: int = 2,
+        slack: float = 0.05,
+        audit_interval: int = 50,
+        method: int = cv2.TM_CCOEFF_NORMED,
+        pyramids: Callable[[str], tuple[np.ndarray, ...] | None] | None = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        levels : int
+            Maximum number of ``pyrDown`` levels; fewer are used for small
+            templates (the coarse template keeps at least 8 px per side).
+        slack : float
+            Extra margin subtracted from the calibrated coarse threshold.
+        audit_interval : int
+            Re-check every N-th rejection at full resolution (0 disables).
+        method : int
+            Correlation method; must be a normalized ``cv2.TM_*`` score.
+        pyramids : Callable | None
+            Returns the precomputed ``pyrDown`` levels of a template by name
+            (finest first), or None; e.g. ``TemplateRegistry.pyramid``.
+            Templates without them are downsampled here.
+        """
+        self.levels = levels
+        self.slack = slack
+        self.audit_interval = audit_interval
+        self.method = method
+        self.pyramids = pyramids
+        self._coarse: dict[str, _Coarse | None] = {}
+        self._stats: dict[str, list[int]] = {}
+        # Per thread, so windows matched in parallel do not evict each other's pyramid
+        self._local = threading.local()
+        # Guards _coarse and _stats, which windows matched in parallel share
+        self._lock = threading.Lock()
+
+    def may_contain(
+        self,
+        screen: np.ndarray,
+        template: np.ndarray,
+        threshold: float,
+        region: tuple[int, int, int, int] | None = None,
+        name: str | None = None,
+    ) -> bool:
+        """
+        Return False only if *template* cannot match *screen* within
+        *region* at *threshold*; True means "run the full match".
+
+        Parameters
+        ----------
+        screen : np.ndarray
+            Full grayscale capture.  Its pyramid is cached (per thread) until
+            a different array is passed, so several templates share the
+            downsampling.
+        template : np.ndarray
+            Grayscale template.
+        threshold : float
+            Threshold the full-resolution match will use.
+        region : tuple | None
+            Clipped search rectangle (x1, y1, x2, y2) in *screen*.
+        name : str | None
+            Template name for calibration caching and statistics.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0, 0, 0])
+            stats[0] += 1
+        coarse = self._coarse_template(template, name)
+        if coarse is None:
+            return True         # too small to downsample
+        area = self._coarse_area(screen, coarse.level, region)
+        ih, iw = coarse.interior.shape
+        if area.shape[0] < ih or area.shape[1] < iw:
+            return True
+
+        score = float(cv2.matchTemplate(area, coarse.interior, self.method).max())
+        if score >= coarse.self_score - (1.0 - threshold) - self.slack:
+            return True
+        with self._lock:
+            stats[1] += 1
+            audit = bool(self.audit_interval) and stats[1] % self.audit_interval == 0
+            if audit:
+                stats[2] += 1
+
+        if audit and self._full_match(screen, template, threshold, region):
+            with self._lock:
+                stats[3] += 1
+            return True
+        return False
+
+    def stats(self) -> dict[str | None, PreScreenStats]:
+        """Counters per template name."""
+        with self._lock:
+            return {name: PreScreenStats(*s) for name, s in self._stats.items()}
+
+    def summary(self) -> str:
+        """One-line reject-rate report, e.g. for the log."""
+        parts = []
+        for name, s in sorted(self.stats().items(), key=lambda kv: str(kv[0])):
+            rate = 100.0 * s.rejects / s.checks if s.checks else 0.0
+            part = f"{name} {rate:.0f}% ({s.rejects}/{s.checks})"
+            if s.false_rejects:
+                part += f" {s.false_rejects} false"
+            parts.append(part)
+        return "pre-screen rejects: " + (", ".join(parts) if parts else "none yet")
+
+    # -- internals ---------------------------------------------------------
+
+    def _coarse_template(self, template: np.ndarray, name: str | None) -> _Coarse | None:
+        if name is not None:
+            with self._lock:
+                if name in self._coarse:
+                    return self._coarse[name]
+        level = 0
+        while level < self.levels and min(template.shape[:2]) >> (level + 1) >= 8:
+            level += 1
+        entry = None
+        if level:
+            # pyrDown's 5-tap kernel reaches ~1 coarse pixel per level into
+            # the surroundings; drop that border so the background is ignored.
+            interior = self._template_level(template, level, name)[level:-level, level:-level]
+            entry = _Coarse(level, interior, self._calibrate(template, level, interior))
+        if name is not None:
+            # Calibration runs unlocked; if two threads raced, keep the first result
+            with self._lock:
+                entry = self._coarse.setdefault(name, entry)
+        return entry
+
+    def _template_level(self, template: np.ndarray, level: int, name: str | None) -> np.ndarray:
+        """*template* downsampled *level* times, from ``pyramids`` when it has that level."""
+        if self.pyramids is not None and name is not None:
+            pyramid = self.pyramids(name)
+            if pyramid is not None and len(pyramid) >= level:
+                return pyramid[level - 1]
+        return _pyr_down(template, level)
+
+    def _calibrate(self, template: np.ndarray, level: int, interior: np.ndarray) -> float:
+        """Worst coarse self-score over all 2**level sub-sampling phases."""
+        step = 1 << level
+        worst = 1.0
+        for dy in range(step):
+            for dx in range(step):
+                padded = cv2.copyMakeBorder(
+                    template, step + dy, 2 * step - dy, step + dx, 2 * step - dx,
+                    cv2.BORDER_REPLICATE,
+                )
+                coarse = _pyr_down(padded, level)
+                score = float(cv2.matchTemplate(coarse, interior, self.method).max())
+                worst = min(worst, score)
+        return worst
+
+    def _coarse_area(
+        self,
+        screen: np.ndarray,
+        level: int,
+        region: tuple[int, int, int, int] | None,
+    ) -> np.ndarray:
+        local = self._local
+        if getattr(local, "screen", None) is not screen:
+            local.screen = screen
+            local.pyramid = [screen]
+        pyramid = local.pyramid
+        while len(pyramid) <= level:
+            pyramid.append(cv2.pyrDown(pyramid[-1]))
+        coarse = pyramid[level]
+        if region is None:
+            return coarse
+        x1, y1, x2, y2 = region
+        step = 1 << level
+        return coarse[y1 // step: -(-y2 // step), x1 // step: -(-x2 // step)]
+
+    def _full_match(
+        self,
+        screen: np.ndarray,
+        template: np.ndarray,
+        threshold: float,
+        region: tuple[int, int, int, int] | None,
+    ) -> bool:
+        if region is not None:
+            x1, y1, x2, y2 = region
+            screen = screen[y1:y2, x1:x2]
+        if screen.shape[0] < template.shape[0] or screen.shape[1] < template.shape[1]:
+            return False
+        return float(cv2.matchTemplate(screen, template, self.method).max()) >= threshold
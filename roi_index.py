@@ -0,0 +1,214 @@
+"""
+Learned Region-of-Interest Index
+================================
+Most templates in ``minfar.py`` are UI elements that always appear in the
+same place (``clicker.log`` shows e.g. *world* at (441-443, 859-861) every
+time), yet they are searched over the whole 622 × 1080 capture.
+
+:class:`ROIIndex` records where each template's matches land and derives a
+tight search window (bounding box of all match positions plus a margin).
+Once a template has been seen ``min_hits`` times, :meth:`ROIIndex.locate`
+searches that window first and only falls back to the full screen on a
+miss.  Hits, the common case for elements that are on screen, then cost a
+window-sized match; a miss costs the window plus one full-screen match, so
+an element that moved (``clicker.log`` shows *good*, *free* and *help* at
+widely varying positions) is found on the very next lookup.  Callers that
+can tolerate finding moved elements late may throttle the fallback to every
+``fallback_interval``-th consecutive miss.
+
+Learned regions are persisted as JSON and survive restarts.
+
+Usage
+-----
+index = ROIIndex("roi_index.json")
+pt = index.locate("world", template.shape, find, context=window_title)
+index.save()
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from typing import Callable
+
+logger = logging.getLogger(__name__)
+
+Region = tuple[int, int, int, int]
+Point = tuple[int, int]
+
+ROIStats = namedtuple(
+    "ROIStats", ["roi_hits", "roi_misses", "full_scans", "full_hits"]
+)
+ROIStats.__doc__ = """
+Search counters for one template.
+
+roi_hits   : matches found inside the learned window.
+roi_misses : learned-window searches that found nothing.
+full_scans : full-screen searches (no window yet, or fallback after a miss).
+full_hits  : full-screen searches that found the template.
+"""
+
+
+class ROIIndex:
+    """
+    Per-template learned search windows, keyed by template name and an
+    optional context (e.g. the window title, since layouts differ between
+    client windows).
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        margin: int = 8,
+        min_hits: int = 3,
+        fallback_interval: int = 1,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : str | None
+            JSON file the learned regions are loaded from and saved to;
+            None keeps them in memory only.
+        margin : int
+            Pixels added on every side of the observed match bounding box.
+        min_hits : int
+            Matches required before a learned window is used.
+        fallback_interval : int
+            After a miss inside the learned window, scan the full screen on
+            every N-th consecutive miss (default 1 = after every miss).
+        """
+        if min_hits < 1 or fallback_interval < 1:
+            raise ValueError("min_hits and fallback_interval must be at least 1.")
+        self.path = path
+        self.margin = margin
+        self.min_hits = min_hits
+        self.fallback_interval = fallback_interval
+        self._boxes: dict[str, dict] = {}
+        self._stats: dict[str, list[int]] = {}
+        self._miss_streak: dict[str, int] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    self._boxes = json.load(fh)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable ROI index {path}: {e}")
+
+    @staticmethod
+    def _key(name: str, context: str | None) -> str:
+        return name if context is None else f"{context}/{name}"
+
+    def record(
+        self,
+        name: str,
+        point: Point,
+        shape: tuple[int, int],
+        context: str | None = None,
+    ) -> None:
+        """Record a match of *name* with top-left *point* = (x, y) and template *shape* (h, w)."""
+        x, y = int(point[0]), int(point[1])
+        h, w = int(shape[0]), int(shape[1])
+        key = self._key(name, context)
+        with self._lock:
+            box = self._boxes.get(key)
+            if box is None or (box["h"], box["w"]) != (h, w):
+                self._boxes[key] = {"x0": x, "y0": y, "x1": x, "y1": y, "h": h, "w": w, "count": 1}
+                self._dirty = True
+                return
+            grown = (min(box["x0"], x), min(box["y0"], y), max(box["x1"], x), max(box["y1"], y))
+            box["count"] += 1
+            # Only geometry changes and reaching min_hits need to be persisted
+            if grown != (box["x0"], box["y0"], box["x1"], box["y1"]) or box["count"] <= self.min_hits:
+                box["x0"], box["y0"], box["x1"], box["y1"] = grown
+                self._dirty = True
+
+    def region(self, name: str, context: str | None = None) -> Region | None:
+        """
+        Learned search window (x1, y1, x2, y2) for *name*, in the
+        ``match_and_handle`` region convention, or None while fewer than
+        ``min_hits`` matches have been recorded.
+        """
+        box = self._boxes.get(self._key(name, context))
+        if box is None or box["count"] < self.min_hits:
+            return None
+        m = self.margin
+        return (
+            max(0, box["x0"] - m),
+            max(0, box["y0"] - m),
+            box["x1"] + box["w"] + m,
+            box["y1"] + box["h"] + m,
+        )
+
+    def locate(
+        self,
+        name: str,
+        shape: tuple[int, int],
+        find: Callable[[Region | None], Point | None],
+        context: str | None = None,
+    ) -> Point | None:
+        """
+        Search for *name* using the learned window first.
+
+        Parameters
+        ----------
+        name : str
+            Template name.
+        shape : tuple[int, int]
+            Template (h, w).
+        find : Callable
+            ``find(region)`` returns the top-left (x, y) of a match inside
+            *region* (None = full screen), or None.
+        context : str | None
+            Layout context, e.g. the window title.
+
+        Returns
+        -------
+        (x, y) of the match, or None.
+        """
+        key = self._key(name, context)
+        stats = self._stats.setdefault(key, [0, 0, 0, 0])
+        window = self.region(name, context)
+        if window is not None:
+            point = find(window)
+            if point is not None:
+                stats[0] += 1
+                self._miss_streak[key] = 0
+                self.record(name, point, shape, context)
+                return point
+            stats[1] += 1
+            streak = self._miss_streak.get(key, 0) + 1
+            self._miss_streak[key] = streak
+            if streak % self.fallback_interval:
+                return None
+
+        stats[2] += 1
+        point = find(None)
+        if point is not None:
+            stats[3] += 1
+            self._miss_streak[key] = 0
+            self.record(name, point, shape, context)
+        return point
+
+    def stats(self) -> dict[str, ROIStats]:
+        """Search counters per template key since this index was created."""
+        return {key: ROIStats(*s) for key, s in self._stats.items()}
+
+    def forget(self, name: str, context: str | None = None) -> None:
+        """Drop the learned window of *name* (e.g. after a UI change)."""
+        with self._lock:
+            if self._boxes.pop(self._key(name, context), None) is not None:
+                self._dirty = True
+
+    def save(self) -> bool:
+        """Write the learned regions to ``path``; False when nothing changed."""
+        if self.path is None or not self._dirty:
+            return False
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(self._boxes, fh, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        return True
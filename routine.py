@@ -0,0 +1,631 @@
+"""
+Declarative Routine Engine
+==========================
+The game logic used to live in ``monitor_marchqueue`` as a chain of
+closures (``on_world``, ``on_help``, ``on_completed``, ...) that were
+recreated every cycle, with key sequences and delays hard-coded in the
+calls to ``SpecialClick``.
+
+Here the routine is data.  A JSON file (``routine.json``) declares screens
+and transitions; :func:`load_routine` validates it and compiles it once into
+a graph of :class:`Screen` / :class:`Check` / :class:`Action` tuples, and
+:meth:`Routine.run` walks that graph.  Only the checks of the screen the
+engine is on are matched, never the whole template set.
+
+Config layout
+-------------
+{
+  "tasks": {                             # scheduled separately per window
+    "rally": {"cycle": ["world", "rally"],   # screens visited in order every pass
+              "interval": 5,             # seconds to the next pass after an idle one
+              "retry": 3,                # ... and after a "restart"
+              "priority": 2,             # tie-break among tasks due together
+              "enabled_by": ["rally"]},  # skipped unless one of these toggles is on
+    "town":  {"cycle": ["town"]}
+  },
+  "variables": {                         # per window title; "*" = defaults
+    "*":      {"troop": "a"},
+    "wosmin": {"troop": "p"}
+  },
+  "screens": {
+    "world": {
+      "enter":  [<action>, ...],         # how to get there (keys, drags, ...)
+      "scene":  "world",                 # change-detector scene (default: name)
+      "settle": 2,                       # wait up to N s for the screen to settle
+      "wait":   3,                       # OR: poll up to N s for any check to match
+      "checks": [
+        {"template": "world", "threshold": 0.9, "region": [x1, y1, x2, y2],
+         "enabled_by": "farm",           # account toggle that must be on
+         "max_hits": 1,                  # instances to act on per capture ("all" = every one)
+         "actions": [<action>, ...],
+         "then": "restart"}              # "restart" | "next" | "done" | <screen>
+      ],
+      "otherwise": [<action>, ...],      # run when no check matched
+      "otherwise_then": "next"
+    }
+  }
+}
+
+Actions are one-key objects:
+
+  {"click": true}  / {"click": 2}        click the match centre (n times)
+  {"hover": true}                        move the mouse to the match centre
+  {"move": [x, y]}                       move the mouse
+  {"drag": {"from": [x, y], "to": [x, y], "duration": 1}}
+  {"keys": {"keys": [...], "delays": [...], "settle": true}}
+  {"sleep": seconds}
+  {"wait_gone": seconds}                 wait for the matched template to vanish
+  {"log": "Clicked on {name} ({x}, {y})"}
+
+With ``max_hits`` above 1 the actions run once per instance found on the
+same capture, best match first (``{x}``/``{y}`` are that instance), and the
+transition follows after the last one.
+
+Any value of the form ``"$name"`` (a region, a key, ...) is looked up in the
+window's variables when the routine runs.
+
+Instead of ``tasks``, a routine can give a single ``"cycle": [...]``; it runs
+as one task named ``cycle``.  Task fields other than ``cycle`` are optional
+(the caller's defaults apply).
+
+Transitions: ``restart`` ends the pass and asks for a quick re-run (the old
+``continue``), ``next`` carries on with the screen's next check, ``done``
+leaves the screen, and a screen name enters that screen; when it finishes
+without restarting, the current screen carries on with its next check.
+"""
+
+import json
+import logging
+import threading
+from collections import namedtuple
+from typing import Collection, Mapping
+
+logger = logging.getLogger(__name__)
+
+RESTART = "restart"
+NEXT = "next"
+DONE = "done"
+STOP = "stop"
+
+Action = namedtuple("Action", ["kind", "args"])
+Action.__doc__ = "One compiled action: kind (e.g. ``keys``) and its validated arguments."
+
+Check = namedtuple(
+    "Check",
+    ["name", "template", "threshold", "region", "enabled_by", "max_hits", "actions", "then"],
+)
+Check.__doc__ = """
+One template check of a screen.
+
+name       : label used in logs and statistics (defaults to the template).
+template   : template name in the registry.
+threshold  : match threshold.
+region     : (x1, y1, x2, y2), a "$variable", or None for the whole screen.
+enabled_by : account toggle that must be on, or None.
+max_hits   : instances the actions run for per capture (None = all).
+actions    : tuple of :class:`Action` run when the template matches.
+then       : transition after the actions.
+"""
+
+Screen = namedtuple(
+    "Screen",
+    ["name", "scene", "enter", "settle", "wait", "checks", "otherwise", "otherwise_then"],
+)
+Screen.__doc__ = """
+One screen of the routine graph; see the module docstring for the fields.
+"""
+
+Task = namedtuple("Task", ["name", "cycle", "interval", "retry", "priority", "enabled_by"])
+Task.__doc__ = """
+One separately scheduled pass over some screens.
+
+name       : task name (``"cycle"`` for a routine without ``tasks``).
+cycle      : tuple of screen names visited in order.
+interval   : seconds until the next pass after an idle one, or None.
+retry      : seconds until the next pass after a ``restart``, or None.
+priority   : scheduler tie-break among tasks due at the same time.
+enabled_by : tuple of account toggles, one of which must be on (empty = always).
+"""
+
+ScreenStats = namedtuple("ScreenStats", ["visits", "checks", "matches"])
+ScreenStats.__doc__ = """
+Counters for one screen.
+
+visits  : times the screen was entered.
+checks  : template checks evaluated on it.
+matches : checks that matched.
+"""
+
+_TRANSITIONS = (RESTART, NEXT, DONE)
+_MAX_DEPTH = 16
+
+
+class RoutineError(ValueError):
+    """Invalid routine configuration; the message names the offending entry."""
+
+
+class RoutineDriver:
+    """
+    What the engine needs from the automation script.  ``minfar.py``
+    implements it on top of its capture, matching and input helpers.
+    """
+
+    title: str | None = None
+
+    def stopped(self) -> bool:
+        """True to abandon the pass (killswitch)."""
+        return False
+
+    def flag(self, name: str) -> bool:
+        """State of an account toggle such as ``farm`` or ``rally``."""
+        raise NotImplementedError
+
+    def capture(self, scene: str, settle: float | None):
+        """Grab the screen (registered under *scene*), optionally after it settles."""
+        raise NotImplementedError
+
+    def find(self, screen, check: Check) -> tuple[int, int] | None:
+        """Centre of *check*'s template on *screen*, or None."""
+        raise NotImplementedError
+
+    def find_all(self, screen, check: Check) -> list[tuple[int, int]]:
+        """Centres of up to ``check.max_hits`` instances on *screen*, best first."""
+        point = self.find(screen, check)
+        return [] if point is None else [point]
+
+    def wait_for(self, checks: list[Check], timeout: float) -> tuple[int, tuple[int, int]] | None:
+        """Poll fresh captures until one of *checks* matches: (index, centre), or None."""
+        raise NotImplementedError
+
+    def wait_gone(self, check: Check, timeout: float) -> bool:
+        raise NotImplementedError
+
+    def click(self, x: int, y: int, count: int = 1) -> None:
+        raise NotImplementedError
+
+    def move(self, x: int, y: int) -> None:
+        raise NotImplementedError
+
+    def drag(self, start: tuple[int, int], end: tuple[int, int], duration: float) -> None:
+        raise NotImplementedError
+
+    def keys(self, keys: list[str], delays: list[float], settle: bool) -> None:
+        raise NotImplementedError
+
+    def sleep(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def log(self, message: str) -> None:
+        logger.info(message)
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+def load_routine(
+    path: str,
+    templates: Mapping | None = None,
+    toggles: Collection[str] | None = None,
+) -> "Routine":
+    """
+    Read and compile the routine at *path*.
+
+    Parameters
+    ----------
+    path : str
+        JSON routine file.
+    templates : Mapping | None
+        Template registry (anything supporting ``in``); when given, every
+        referenced template must exist in it.
+    toggles : Collection[str] | None
+        Account toggles the driver's ``flag`` knows; when given, every
+        ``enabled_by`` must name one of them.
+
+    Raises
+    ------
+    RoutineError
+        The file is not valid JSON or does not describe a valid routine.
+    """
+    try:
+        with open(path, encoding="utf-8") as fh:
+            config = json.load(fh)
+    except json.JSONDecodeError as e:
+        raise RoutineError(f"{path}: invalid JSON: {e}") from e
+    return compile_routine(config, templates, toggles)
+
+
+def compile_routine(
+    config: dict,
+    templates: Mapping | None = None,
+    toggles: Collection[str] | None = None,
+) -> "Routine":
+    """Validate a parsed routine config and compile it; see :func:`load_routine`."""
+    _expect(isinstance(config, dict), "routine", "must be an object")
+    variables = config.get("variables", {})
+    _expect(isinstance(variables, dict), "variables", "must be an object")
+    for title, values in variables.items():
+        _expect(isinstance(values, dict), f"variables.{title}", "must be an object")
+    defaults = variables.get("*", {})
+
+    raw_screens = config.get("screens")
+    _expect(isinstance(raw_screens, dict) and raw_screens, "screens", "must be a non-empty object")
+    screens = {
+        name: _compile_screen(f"screens.{name}", name, raw, defaults, toggles)
+        for name, raw in raw_screens.items()
+    }
+
+    raw_tasks = config.get("tasks")
+    if raw_tasks is None:
+        tasks = {"cycle": _compile_task("", "cycle", {"cycle": config.get("cycle")}, screens, toggles)}
+    else:
+        _expect("cycle" not in config, "routine", "use either cycle or tasks, not both")
+        _expect(isinstance(raw_tasks, dict) and raw_tasks, "tasks", "must be a non-empty object")
+        tasks = {
+            name: _compile_task(f"tasks.{name}", name, raw, screens, toggles)
+            for name, raw in raw_tasks.items()
+        }
+    for screen in screens.values():
+        targets = [(f"screens.{screen.name}.checks[{i}].then", c.then) for i, c in enumerate(screen.checks)]
+        targets.append((f"screens.{screen.name}.otherwise_then", screen.otherwise_then))
+        for where, target in targets:
+            _expect(target in _TRANSITIONS or target in screens, where, f"unknown screen {target!r}")
+
+    routine = Routine(screens, tasks, variables)
+    if templates is not None:
+        missing = sorted(t for t in routine.templates if t not in templates)
+        _expect(not missing, "screens", f"unknown templates: {', '.join(missing)}")
+    return routine
+
+
+def _expect(ok: bool, where: str, message: str) -> None:
+    if not ok:
+        raise RoutineError(f"{where}: {message}")
+
+
+def _is_var(value) -> bool:
+    return isinstance(value, str) and value.startswith("$")
+
+
+def _check_var(value, where: str, defaults: dict) -> None:
+    if _is_var(value):
+        _expect(value[1:] in defaults, where, f"variable {value} has no default in variables.*")
+
+
+def _number(value, where: str, minimum: float = 0.0) -> float:
+    _expect(
+        isinstance(value, (int, float)) and not isinstance(value, bool) and value >= minimum,
+        where, f"must be a number >= {minimum:g}",
+    )
+    return float(value)
+
+
+def _point(value, where: str) -> tuple[int, int]:
+    _expect(
+        isinstance(value, list) and len(value) == 2 and all(isinstance(v, int) for v in value),
+        where, "must be [x, y]",
+    )
+    return tuple(value)
+
+
+def _compile_screen(
+    where: str, name: str, raw: dict, defaults: dict, toggles: Collection[str] | None
+) -> Screen:
+    _expect(isinstance(raw, dict), where, "must be an object")
+    unknown = set(raw) - {"enter", "scene", "settle", "wait", "checks", "otherwise", "otherwise_then"}
+    _expect(not unknown, where, f"unknown keys: {', '.join(sorted(unknown))}")
+    settle = raw.get("settle")
+    wait = raw.get("wait")
+    if settle is not None:
+        settle = _number(settle, f"{where}.settle")
+    if wait is not None:
+        wait = _number(wait, f"{where}.wait")
+    _expect(settle is None or wait is None, where, "use either settle or wait, not both")
+    checks = raw.get("checks", [])
+    _expect(isinstance(checks, list), f"{where}.checks", "must be a list")
+    scene = raw.get("scene", name)
+    _expect(isinstance(scene, str) and scene, f"{where}.scene", "must be a non-empty string")
+    otherwise_then = raw.get("otherwise_then", NEXT)
+    _expect(isinstance(otherwise_then, str), f"{where}.otherwise_then", "must be a string")
+    return Screen(
+        name=name,
+        scene=scene,
+        enter=_compile_actions(f"{where}.enter", raw.get("enter", []), defaults, in_check=False),
+        settle=settle,
+        wait=wait,
+        checks=tuple(
+            _compile_check(f"{where}.checks[{i}]", c, defaults, toggles) for i, c in enumerate(checks)
+        ),
+        otherwise=_compile_actions(f"{where}.otherwise", raw.get("otherwise", []), defaults, in_check=False),
+        otherwise_then=otherwise_then,
+    )
+
+
+def _compile_task(
+    where: str, name: str, raw: dict, screens: dict[str, Screen], toggles: Collection[str] | None
+) -> Task:
+    _expect(isinstance(raw, dict), where, "must be an object")
+    unknown = set(raw) - {"cycle", "interval", "retry", "priority", "enabled_by"}
+    _expect(not unknown, where, f"unknown keys: {', '.join(sorted(unknown))}")
+    prefix = f"{where}." if where else ""
+    cycle = raw.get("cycle")
+    _expect(isinstance(cycle, list) and cycle, f"{prefix}cycle", "must be a non-empty list of screens")
+    for i, screen in enumerate(cycle):
+        _expect(screen in screens, f"{prefix}cycle[{i}]", f"unknown screen {screen!r}")
+    interval, retry = raw.get("interval"), raw.get("retry")
+    if interval is not None:
+        interval = _number(interval, f"{prefix}interval", minimum=1.0)
+    if retry is not None:
+        retry = _number(retry, f"{prefix}retry", minimum=1.0)
+    priority = raw.get("priority", 0)
+    _expect(isinstance(priority, int) and not isinstance(priority, bool), f"{prefix}priority", "must be an integer")
+    enabled_by = raw.get("enabled_by", [])
+    if isinstance(enabled_by, str):
+        enabled_by = [enabled_by]
+    _expect(isinstance(enabled_by, list), f"{prefix}enabled_by", "must be a toggle name or a list of them")
+    for i, toggle in enumerate(enabled_by):
+        _check_toggle(toggle, f"{prefix}enabled_by[{i}]", toggles)
+    return Task(name, tuple(cycle), interval, retry, priority, tuple(enabled_by))
+
+
+def _check_toggle(value, where: str, toggles: Collection[str] | None) -> None:
+    _expect(isinstance(value, str) and value, where, "must be a toggle name")
+    if toggles is not None:
+        _expect(value in toggles, where, f"unknown toggle {value!r} (known: {', '.join(sorted(toggles))})")
+
+
+def _compile_check(where: str, raw: dict, defaults: dict, toggles: Collection[str] | None) -> Check:
+    _expect(isinstance(raw, dict), where, "must be an object")
+    unknown = set(raw) - {"name", "template", "threshold", "region", "enabled_by", "max_hits", "actions", "then"}
+    _expect(not unknown, where, f"unknown keys: {', '.join(sorted(unknown))}")
+    template = raw.get("template")
+    _expect(isinstance(template, str) and template, f"{where}.template", "is required")
+    threshold = raw.get("threshold", 0.8)
+    _expect(
+        isinstance(threshold, (int, float)) and 0.0 < threshold <= 1.0,
+        f"{where}.threshold", "must be in (0, 1]",
+    )
+    region = raw.get("region")
+    if _is_var(region):
+        _check_var(region, f"{where}.region", defaults)
+    elif region is not None:
+        _expect(
+            isinstance(region, list) and len(region) == 4 and all(isinstance(v, int) for v in region),
+            f"{where}.region", "must be [x1, y1, x2, y2] or a $variable",
+        )
+        region = tuple(region)
+    max_hits = raw.get("max_hits", 1)
+    _expect(
+        max_hits == "all" or (isinstance(max_hits, int) and not isinstance(max_hits, bool) and max_hits >= 1),
+        f"{where}.max_hits", 'must be a count >= 1 or "all"',
+    )
+    enabled_by = raw.get("enabled_by")
+    if enabled_by is not None:
+        _check_toggle(enabled_by, f"{where}.enabled_by", toggles)
+    then = raw.get("then", NEXT)
+    _expect(isinstance(then, str), f"{where}.then", "must be a string")
+    return Check(
+        name=raw.get("name", template),
+        template=template,
+        threshold=float(threshold),
+        region=region,
+        enabled_by=enabled_by,
+        max_hits=None if max_hits == "all" else max_hits,
+        actions=_compile_actions(f"{where}.actions", raw.get("actions", []), defaults, in_check=True),
+        then=then,
+    )
+
+
+def _compile_actions(where: str, raw: list, defaults: dict, in_check: bool) -> tuple[Action, ...]:
+    _expect(isinstance(raw, list), where, "must be a list of actions")
+    return tuple(_compile_action(f"{where}[{i}]", a, defaults, in_check) for i, a in enumerate(raw))
+
+
+def _compile_action(where: str, raw: dict, defaults: dict, in_check: bool) -> Action:
+    _expect(isinstance(raw, dict) and len(raw) == 1, where, "must be an object with exactly one action")
+    (kind, args), = raw.items()
+    if kind in ("click", "hover", "wait_gone"):
+        _expect(in_check, where, f"{kind} needs a matched template (only allowed in checks)")
+    if kind == "click":
+        count = 1 if args is True else args
+        _expect(isinstance(count, int) and not isinstance(count, bool) and count >= 1, where, "click takes true or a count")
+        return Action(kind, count)
+    if kind == "hover":
+        _expect(args is True, where, "hover takes true")
+        return Action(kind, None)
+    if kind == "wait_gone":
+        return Action(kind, _number(args, where))
+    if kind == "sleep":
+        return Action(kind, _number(args, where))
+    if kind == "move":
+        return Action(kind, _point(args, where))
+    if kind == "drag":
+        _expect(isinstance(args, dict) and {"from", "to"} <= set(args), where, "drag needs from and to")
+        return Action(kind, (
+            _point(args["from"], f"{where}.from"),
+            _point(args["to"], f"{where}.to"),
+            _number(args.get("duration", 1), f"{where}.duration"),
+        ))
+    if kind == "keys":
+        _expect(isinstance(args, dict) and "keys" in args, where, "keys needs keys (and delays)")
+        keys = args["keys"]
+        delays = args.get("delays", [1.5] * len(keys) if isinstance(keys, list) else None)
+        _expect(isinstance(keys, list) and all(isinstance(k, str) for k in keys), f"{where}.keys", "must be a list of key names")
+        _expect(isinstance(delays, list) and len(delays) == len(keys), f"{where}.delays", "must match keys in length")
+        for i, key in enumerate(keys):
+            _check_var(key, f"{where}.keys[{i}]", defaults)
+        return Action(kind, (
+            tuple(keys),
+            tuple(_number(d, f"{where}.delays[{i}]") for i, d in enumerate(delays)),
+            bool(args.get("settle", False)),
+        ))
+    if kind == "log":
+        _expect(isinstance(args, str), where, "log takes a message")
+        return Action(kind, args)
+    raise RoutineError(f"{where}: unknown action {kind!r}")
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class Routine:
+    """A compiled routine graph; run one pass of a task with :meth:`run`."""
+
+    def __init__(self, screens: dict[str, Screen], tasks: dict[str, Task], variables: dict[str, dict]) -> None:
+        self.screens = screens
+        self.tasks = tasks
+        self.variables = variables
+        self._stats: dict[str, list[int]] = {name: [0, 0, 0] for name in screens}
+        self._lock = threading.Lock()
+
+    @property
+    def templates(self) -> set[str]:
+        """Every template the routine can match."""
+        return {c.template for s in self.screens.values() for c in s.checks}
+
+    def variables_for(self, title: str | None) -> dict:
+        """Defaults (``"*"``) overlaid with the variables of window *title*."""
+        merged = dict(self.variables.get("*", {}))
+        merged.update(self.variables.get(title, {}) if title is not None else {})
+        return merged
+
+    def enabled(self, task: str, driver: RoutineDriver) -> bool:
+        """True if *task* has no ``enabled_by`` toggles or one of them is on."""
+        toggles = self.tasks[task].enabled_by
+        return not toggles or any(driver.flag(t) for t in toggles)
+
+    def run(self, driver: RoutineDriver, task: str | None = None) -> str:
+        """
+        One pass over the screens of *task*, or of every task in order if
+        None.  Disabled tasks (see :meth:`enabled`) visit no screens.
+
+        Returns
+        -------
+        ``"restart"`` if a check asked for a quick re-run, ``"stop"`` if the
+        driver reported the killswitch, else ``"done"``.
+        """
+        variables = self.variables_for(driver.title)
+        names = list(self.tasks) if task is None else [task]
+        cycle = [s for name in names if self.enabled(name, driver) for s in self.tasks[name].cycle]
+        for name in cycle:
+            if driver.stopped():
+                return STOP
+            outcome = self._visit(self.screens[name], driver, variables, 0)
+            if outcome in (RESTART, STOP):
+                return outcome
+        return DONE
+
+    def _visit(self, screen: Screen, driver: RoutineDriver, variables: dict, depth: int) -> str:
+        if depth > _MAX_DEPTH:
+            raise RuntimeError(f"Routine transitions nested deeper than {_MAX_DEPTH} screens at {screen.name!r}.")
+        self._count(screen.name, 0)
+        for action in screen.enter:
+            self._act(action, None, None, driver, variables)
+
+        checks = [
+            c._replace(region=self._resolve(c.region, variables))
+            for c in screen.checks
+            if c.enabled_by is None or driver.flag(c.enabled_by)
+        ]
+        if screen.wait is not None:
+            found = driver.wait_for(checks, screen.wait) if checks else None
+            self._count(screen.name, 1, len(checks))
+            if found is not None:
+                self._count(screen.name, 2)
+                index, point = found
+                return self._fire(screen, checks[index], [point], checks[index + 1:], driver, variables, depth)
+            return self._otherwise(screen, driver, variables, depth)
+
+        frame = driver.capture(screen.scene, screen.settle) if checks else None
+        for i, check in enumerate(checks):
+            self._count(screen.name, 1)
+            points = self._find(driver, frame, check)
+            if not points:
+                continue
+            self._count(screen.name, 2)
+            return self._fire(screen, check, points, checks[i + 1:], driver, variables, depth, frame)
+        return self._otherwise(screen, driver, variables, depth)
+
+    def _fire(self, screen, check, points, rest, driver, variables, depth, frame=None) -> str:
+        for point in points:
+            for action in check.actions:
+                if driver.stopped():
+                    return STOP
+                self._act(action, check, point, driver, variables)
+        outcome = self._transition(check.then, driver, variables, depth)
+        if outcome != NEXT:
+            return outcome
+        # Carry on with the remaining checks on the same capture
+        for i, other in enumerate(rest):
+            self._count(screen.name, 1)
+            hits = self._find(driver, frame, other) if frame is not None else []
+            if hits:
+                self._count(screen.name, 2)
+                return self._fire(screen, other, hits, rest[i + 1:], driver, variables, depth, frame)
+        return DONE
+
+    @staticmethod
+    def _find(driver: RoutineDriver, frame, check: Check) -> list:
+        if check.max_hits == 1:
+            point = driver.find(frame, check)
+            return [] if point is None else [point]
+        return driver.find_all(frame, check)
+
+    def _otherwise(self, screen: Screen, driver: RoutineDriver, variables: dict, depth: int) -> str:
+        for action in screen.otherwise:
+            self._act(action, None, None, driver, variables)
+        outcome = self._transition(screen.otherwise_then, driver, variables, depth)
+        return DONE if outcome == NEXT else outcome
+
+    def _transition(self, then: str, driver: RoutineDriver, variables: dict, depth: int) -> str:
+        if then in _TRANSITIONS:
+            return then
+        outcome = self._visit(self.screens[then], driver, variables, depth + 1)
+        return outcome if outcome in (RESTART, STOP) else NEXT
+
+    def _act(self, action: Action, check: Check | None, point, driver: RoutineDriver, variables: dict) -> None:
+        kind, args = action
+        if kind == "click":
+            driver.click(point[0], point[1], args)
+        elif kind == "hover":
+            driver.move(point[0], point[1])
+        elif kind == "move":
+            driver.move(*args)
+        elif kind == "drag":
+            driver.drag(*args)
+        elif kind == "keys":
+            keys, delays, settle = args
+            driver.keys([self._resolve(k, variables) for k in keys], list(delays), settle)
+        elif kind == "sleep":
+            driver.sleep(args)
+        elif kind == "wait_gone":
+            driver.wait_gone(check, args)
+        elif kind == "log":
+            x, y = point if point is not None else (None, None)
+            name = check.name if check is not None else None
+            driver.log(args.format(name=name, x=x, y=y))
+
+    @staticmethod
+    def _resolve(value, variables: dict):
+        if _is_var(value):
+            value = variables[value[1:]]
+            return tuple(value) if isinstance(value, list) else value
+        return value
+
+    def _count(self, screen: str, field: int, n: int = 1) -> None:
+        with self._lock:
+            self._stats[screen][field] += n
+
+    def stats(self) -> dict[str, ScreenStats]:
+        """Counters per screen."""
+        with self._lock:
+            return {name: ScreenStats(*s) for name, s in self._stats.items()}
+
+    def summary(self) -> str:
+        """One-line report of checks evaluated per screen visit."""
+        parts = []
+        for name, s in self.stats().items():
+            if s.visits:
+                parts.append(f"{name} {s.checks / s.visits:.1f} checks/visit, {s.matches} matches")
+        return "routine: " + (", ".join(parts) if parts else "not run yet")
@@ -0,0 +1,223 @@
+"""
+Per-Window Template Scale Calibration
+=====================================
+The templates in ``gameplay/`` were cut from one emulator window at one
+size, and ``cv2.matchTemplate`` only finds them at exactly that pixel
+scale.  A window that renders slightly larger or smaller (a resized
+emulator, a different DPI setting) misses every template.
+
+:class:`TemplateScales` keeps each template at a small set of scales and
+calibrates once per window.  :meth:`TemplateScales.calibrate` matches a
+set of templates at every scale against one capture and stores the scale
+with the strongest match.  From then on :meth:`TemplateScales.resolve`
+hands out the template at that one scale, so per-frame matching costs the
+same as before.  Only calibration does the multi-scale search, and a
+failed calibration is retried at most every ``retry_interval`` seconds.
+
+Scaled templates get their own name (``"help@0.9"``), so every per-name
+cache downstream (pre-screen, learned search windows, change detector)
+keeps one entry per scale.  Calibrations are persisted as JSON.
+
+Usage
+-----
+scales = TemplateScales("scales.json")
+if scales.needs_calibration(title):
+    scales.calibrate(title, screen, {name: templates[name] for name in names})
+name, template = scales.resolve("help", templates["help"], title)
+scales.save()
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from typing import Callable, Mapping
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCALES = (0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2)
+
+Calibration = namedtuple("Calibration", ["scale", "score", "template"])
+Calibration.__doc__ = """
+Result of calibrating one window.
+
+scale    : template scale that matched best.
+score    : its best ``TM_CCOEFF_NORMED`` score.
+template : name of the template that produced it.
+"""
+
+
+class TemplateScales:
+    """Scaled template cache and per-window (context) scale calibration."""
+
+    def __init__(
+        self,
+        path: str | None = None,
+        scales: tuple[float, ...] = DEFAULT_SCALES,
+        min_score: float = 0.8,
+        retry_interval: float = 60.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        path : str | None
+            JSON file calibrations are loaded from and saved to; None keeps
+            them in memory only.
+        scales : tuple[float, ...]
+            Candidate scales (1.0 = the template as cut).
+        min_score : float
+            Best match score a calibration needs to be accepted.
+        retry_interval : float
+            Seconds before a window whose calibration found nothing is
+            calibrated again.
+        clock : Callable
+            Time source for the retry interval.
+        """
+        if not scales or min(scales) <= 0:
+            raise ValueError("scales must be a non-empty tuple of positive factors.")
+        self.path = path
+        self.scales = tuple(sorted(set(scales) | {1.0}))
+        self.min_score = min_score
+        self.retry_interval = retry_interval
+        self._clock = clock
+        self._calibrated: dict[str, Calibration] = {}
+        self._attempted: dict[str, float] = {}
+        self._scaled: dict[tuple[str, float], np.ndarray] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as fh:
+                    self._calibrated = {k: Calibration(**v) for k, v in json.load(fh).items()}
+            except (OSError, ValueError, TypeError) as e:
+                logger.warning(f"Ignoring unreadable scale calibration {path}: {e}")
+
+    @staticmethod
+    def _key(context: str | None) -> str:
+        return "-" if context is None else context
+
+    # -- scaled templates --------------------------------------------------
+
+    def scaled(self, name: str, template: np.ndarray, scale: float) -> np.ndarray:
+        """*template* resized by *scale* (cached per name and scale)."""
+        if scale == 1.0:
+            return template
+        key = (name, scale)
+        with self._lock:
+            out = self._scaled.get(key)
+        if out is None:
+            h, w = template.shape[:2]
+            size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+            out = cv2.resize(template, size, interpolation=interpolation)
+            with self._lock:
+                self._scaled[key] = out
+        return out
+
+    def resolve(self, name: str, template: np.ndarray, context: str | None) -> tuple[str, np.ndarray]:
+        """
+        (name, template) to match in window *context*: unchanged while the
+        window is uncalibrated or calibrated at 1.0, else the scaled
+        template under the name ``"<name>@<scale>"``.
+        """
+        calibration = self._calibrated.get(self._key(context))
+        if calibration is None or calibration.scale == 1.0:
+            return name, template
+        scale = calibration.scale
+        return f"{name}@{scale:g}", self.scaled(name, template, scale)
+
+    # -- calibration -------------------------------------------------------
+
+    def scale(self, context: str | None) -> float | None:
+        """Calibrated scale of window *context*, or None."""
+        calibration = self._calibrated.get(self._key(context))
+        return None if calibration is None else calibration.scale
+
+    def needs_calibration(self, context: str | None) -> bool:
+        """True if *context* is uncalibrated and not attempted within ``retry_interval``."""
+        key = self._key(context)
+        if key in self._calibrated:
+            return False
+        last = self._attempted.get(key)
+        return last is None or self._clock() - last >= self.retry_interval
+
+    def calibrate(
+        self,
+        context: str | None,
+        screen: np.ndarray,
+        templates: Mapping[str, np.ndarray],
+    ) -> Calibration | None:
+        """
+        Match every template at every scale against *screen* and store the
+        scale of the single best match for window *context*.
+
+        Ties go to the scale closest to 1.0.  Returns the calibration, or
+        None (and nothing is stored) if no match reached ``min_score``.
+        """
+        key = self._key(context)
+        self._attempted[key] = self._clock()
+        best: Calibration | None = None
+        for scale in sorted(self.scales, key=lambda s: abs(s - 1.0)):
+            for name, template in templates.items():
+                scaled = self.scaled(name, template, scale)
+                if scaled.shape[0] > screen.shape[0] or scaled.shape[1] > screen.shape[1]:
+                    continue
+                score = cv2.minMaxLoc(cv2.matchTemplate(screen, scaled, cv2.TM_CCOEFF_NORMED))[1]
+                if best is None or score > best.score:
+                    best = Calibration(scale, float(score), name)
+        if best is None or best.score < self.min_score:
+            logger.info(
+                f"Scale calibration of {key!r} found no match "
+                f"(best {best.score if best else 0.0:.2f} < {self.min_score}); retrying later"
+            )
+            return None
+        with self._lock:
+            self._calibrated[key] = best
+            self._dirty = True
+        logger.info(f"Calibrated {key!r} at scale {best.scale:g} ({best.template}, score {best.score:.2f})")
+        return best
+
+    def reset(self, context: str | None = None) -> None:
+        """Forget the calibration of *context* (None: of every window)."""
+        with self._lock:
+            if context is None:
+                self._calibrated.clear()
+                self._attempted.clear()
+            else:
+                self._calibrated.pop(self._key(context), None)
+                self._attempted.pop(self._key(context), None)
+            self._dirty = True
+
+    # -- persistence and reporting -----------------------------------------
+
+    def save(self) -> bool:
+        """Write the calibrations to ``path``; False when nothing changed."""
+        if self.path is None or not self._dirty:
+            return False
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({k: c._asdict() for k, c in self._calibrated.items()}, fh, indent=1, sort_keys=True)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        return True
+
+    def calibrations(self) -> dict[str, Calibration]:
+        """Calibration per window key."""
+        with self._lock:
+            return dict(self._calibrated)
+
+    def summary(self) -> str:
+        """One-line report, e.g. for the log."""
+        cal = self.calibrations()
+        if not cal:
+            return "template scales: no window calibrated"
+        return "template scales: " + ", ".join(
+            f"{key} {c.scale:g} ({c.template} {c.score:.2f})" for key, c in sorted(cal.items())
+        )
@@ -0,0 +1,418 @@
+"""
+Multi-Window Scheduler
+======================
+``monitor_marchqueue`` served exactly two emulator windows by flipping a
+global ``window_index`` and sleeping 10 s between them, with all capture,
+matching and input on one thread.
+
+:class:`WindowScheduler` drives any number of windows instead.  Each window
+has a :class:`WindowState` with its own deadline-ordered task queue; tasks
+of different windows run in parallel on a thread pool (capture and template
+matching need no focus as long as the windows do not overlap), while a task
+of one window never overlaps another task of the same window, so
+per-window state needs no locking.
+
+Input injection is the one step that needs the window in front.  It goes
+through :class:`FocusArbiter`, a lock that hands focus out earliest
+deadline first and only re-activates a window when focus actually has to
+move.  A task that is already late therefore also wins the race for the
+keyboard and mouse.
+
+``minfar`` schedules every routine task (rally, march queue, town chores)
+of a window separately, each with its own interval and priority, so the
+deadline order applies to those game events rather than to whole passes.
+
+Usage
+-----
+scheduler = WindowScheduler()
+for win in windows:
+    state = scheduler.add_window(WindowState(win.title, activate=win.activate))
+    scheduler.schedule(state, "cycle", run_cycle)   # returns seconds until next run
+scheduler.start()
+...
+with scheduler.input():                             # inside a task
+    pyautogui.press("s")
+"""
+
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Hashable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+WindowStats = namedtuple(
+    "WindowStats", ["runs", "errors", "mean_late_ms", "max_late_ms"]
+)
+WindowStats.__doc__ = """
+Task counters for one window.
+
+runs         : tasks run.
+errors       : tasks that raised.
+mean_late_ms : mean delay between a task's deadline and its start.
+max_late_ms  : largest such delay.
+"""
+
+FocusStats = namedtuple("FocusStats", ["holds", "switches", "mean_wait_ms", "max_wait_ms"])
+FocusStats.__doc__ = """
+Input-serialization counters.
+
+holds        : times the input lock was taken (outermost holds only).
+switches     : holds that had to activate a different window.
+mean_wait_ms : mean time spent waiting for the input lock.
+max_wait_ms  : longest such wait.
+"""
+
+
+class FocusArbiter:
+    """
+    Re-entrant lock around input injection.  Waiting threads are served in
+    deadline order; the window is activated only when focus has to move to
+    it (or ``is_active`` reports that something else took focus).
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._owner: int | None = None
+        self._depth = 0
+        self._focused: Hashable | None = None
+        self._waiting: list[tuple[float, int]] = []
+        self._seq = itertools.count()
+        self._counts = [0, 0]
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @contextmanager
+    def hold(
+        self,
+        key: Hashable,
+        activate: Callable[[], object] | None = None,
+        is_active: Callable[[], bool] | None = None,
+        deadline: float | None = None,
+    ) -> Iterator[None]:
+        """
+        Hold the input lock with window *key* in front.
+
+        Parameters
+        ----------
+        key : Hashable
+            Window the input is meant for.
+        activate : Callable | None
+            Brings the window to the front; called when focus moves to *key*.
+            If it raises, the lock is released and the error propagates.
+        is_active : Callable | None
+            Optional check whether the window still has focus (the user may
+            have clicked elsewhere); re-activates when it returns False.
+        deadline : float | None
+            Deadline of the waiting task; earlier deadlines are served first.
+        """
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                outer = False
+                self._depth += 1
+            else:
+                outer = True
+                start = self._clock()
+                ticket = (self._clock() if deadline is None else deadline, next(self._seq))
+                heapq.heappush(self._waiting, ticket)
+                while self._owner is not None or self._waiting[0] != ticket:
+                    self._cond.wait()
+                heapq.heappop(self._waiting)
+                self._owner, self._depth = me, 1
+                waited = self._clock() - start
+                self._counts[0] += 1
+                self._wait_total += waited
+                self._wait_max = max(self._wait_max, waited)
+        try:
+            if self._focused != key or (is_active is not None and not is_active()):
+                self._focused = None
+                if activate is not None:
+                    activate()
+                self._focused = key
+                if outer:
+                    self._counts[1] += 1
+            yield
+        finally:
+            with self._cond:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._owner = None
+                    self._cond.notify_all()
+
+    def stats(self) -> FocusStats:
+        """Counters since the arbiter was created."""
+        with self._cond:
+            holds = self._counts[0]
+            mean = self._wait_total / holds if holds else 0.0
+            return FocusStats(holds, self._counts[1], mean * 1e3, self._wait_max * 1e3)
+
+
+class WindowState:
+    """
+    One automated window: identity, how to bring it to the front, and its
+    task queue.  Subclass it to keep per-window data (capture pipeline,
+    feature toggles, ...).
+    """
+
+    def __init__(
+        self,
+        key: Hashable,
+        title: str | None = None,
+        activate: Callable[[], object] | None = None,
+        is_active: Callable[[], bool] | None = None,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        key : Hashable
+            Unique window key.
+        title : str | None
+            Window title (defaults to ``str(key)``), e.g. for logging.
+        activate, is_active : Callable | None
+            See :meth:`FocusArbiter.hold`.
+        """
+        self.key = key
+        self.title = str(key) if title is None else title
+        self._activate = activate
+        self._is_active = is_active
+        self._tasks: list[tuple] = []
+        self._busy = False
+        self._counts = [0, 0]
+        self._late_total = 0.0
+        self._late_max = 0.0
+
+    def activate(self) -> None:
+        if self._activate is not None:
+            self._activate()
+
+    def is_active(self) -> bool:
+        return True if self._is_active is None else bool(self._is_active())
+
+    def pending(self) -> list[str]:
+        """Names of queued tasks, earliest first."""
+        return [entry[3] for entry in sorted(self._tasks)]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.key!r})"
+
+
+def unique_windows(windows: Iterable) -> list:
+    """
+    Drop repeated windows, keeping the first occurrence.
+
+    ``pygetwindow.getWindowsWithTitle`` matches case-insensitively, so
+    concatenating the results of several title queries returns the same
+    window more than once.  Windows are compared by their native handle
+    (``_hWnd``), falling back to object identity.
+    """
+    unique: dict = {}
+    for win in windows:
+        unique.setdefault(getattr(win, "_hWnd", id(win)), win)
+    return list(unique.values())
+
+
+def tile_capacity(screen_width: int, stride: int, width: int) -> int:
+    """
+    Number of *width*-px tiles that fit side by side on a *screen_width*-px
+    screen when tile ``i`` starts at ``i * stride``.
+    """
+    if stride < 1 or width < 1:
+        raise ValueError("stride and width must be at least 1.")
+    return max(0, (screen_width - width) // stride + 1)
+
+
+class WindowScheduler:
+    """Deadline-ordered per-window task queues run on a shared thread pool."""
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        retry_delay: float = 5.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        max_workers : int | None
+            Thread-pool size; None = one thread per window (fixed when
+            :meth:`start`/:meth:`run` is called).
+        retry_delay : float
+            Seconds before a task that raised is run again.
+        clock : Callable
+            Time source for deadlines.
+        """
+        self.max_workers = max_workers
+        self.retry_delay = retry_delay
+        self._clock = clock
+        self.focus = FocusArbiter(clock)
+        self._windows: dict[Hashable, WindowState] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    # -- windows and tasks -------------------------------------------------
+
+    def add_window(self, state: WindowState) -> WindowState:
+        """Register *state*; returns it."""
+        with self._cond:
+            if state.key in self._windows:
+                raise ValueError(f"Window {state.key!r} is already scheduled.")
+            self._windows[state.key] = state
+            self._cond.notify_all()
+        return state
+
+    def remove_window(self, key: Hashable) -> None:
+        """Drop a window and its queued tasks (a running task finishes)."""
+        with self._cond:
+            state = self._windows.pop(key, None)
+            if state is not None:
+                state._tasks.clear()
+
+    def windows(self) -> list[WindowState]:
+        with self._cond:
+            return list(self._windows.values())
+
+    def schedule(
+        self,
+        window: WindowState | Hashable,
+        name: str,
+        fn: Callable[[WindowState], float | None],
+        delay: float = 0.0,
+        priority: int = 0,
+    ) -> None:
+        """
+        Queue ``fn(state)`` for *window*, due in *delay* seconds.
+
+        *fn* returns the seconds until it should run again, or None to drop
+        it.  Among tasks due at the same time a higher *priority* runs first.
+        """
+        with self._cond:
+            state = self._windows[getattr(window, "key", window)]
+            due = self._clock() + delay
+            heapq.heappush(state._tasks, (due, -priority, next(self._seq), name, fn))
+            self._cond.notify_all()
+
+    def current(self) -> WindowState | None:
+        """Window whose task is running on the calling thread, or None."""
+        return getattr(self._local, "state", None)
+
+    @contextmanager
+    def input(self) -> Iterator[WindowState]:
+        """
+        Serialize input injection for the current task's window: waits for
+        the input lock (earliest deadline first) and brings the window to
+        the front if needed.
+        """
+        state = self.current()
+        if state is None:
+            raise RuntimeError("scheduler.input() must be used inside a scheduled task.")
+        with self.focus.hold(
+            state.key, state.activate, state.is_active, getattr(self._local, "due", None)
+        ):
+            yield state
+
+    # -- running -----------------------------------------------------------
+
+    def start(self) -> "WindowScheduler":
+        """Run the dispatcher on a background thread."""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name="window-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop dispatching; running tasks finish first."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+            self._thread = None
+
+    def run(self) -> None:
+        """Dispatch due tasks until :meth:`stop` is called."""
+        workers = self.max_workers or max(1, len(self._windows))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="window") as pool:
+            while not self._stop.is_set():
+                with self._cond:
+                    picked = self._next_due()
+                    if picked is None or isinstance(picked, float):
+                        self._cond.wait(picked)
+                        continue
+                    state, entry = picked
+                    state._busy = True
+                pool.submit(self._run_task, state, entry)
+
+    def _next_due(self) -> tuple[WindowState, tuple] | float | None:
+        """Earliest due task of an idle window, else seconds until one is due."""
+        best = None
+        for state in self._windows.values():
+            if not state._busy and state._tasks and (best is None or state._tasks[0] < best._tasks[0]):
+                best = state
+        if best is None:
+            return None
+        wait = best._tasks[0][0] - self._clock()
+        if wait > 0:
+            return wait
+        return best, heapq.heappop(best._tasks)
+
+    def _run_task(self, state: WindowState, entry: tuple) -> None:
+        due, neg_priority, _, name, fn = entry
+        start = self._clock()
+        self._local.state, self._local.due = state, due
+        again = None
+        try:
+            again = fn(state)
+        except Exception:
+            logger.exception(f"Task {name!r} of window {state.title!r} failed")
+            state._counts[1] += 1
+            again = self.retry_delay
+        finally:
+            self._local.state = self._local.due = None
+            late = max(0.0, start - due)
+            with self._cond:
+                state._busy = False
+                state._counts[0] += 1
+                state._late_total += late
+                state._late_max = max(state._late_max, late)
+                if again is not None and state.key in self._windows:
+                    heapq.heappush(
+                        state._tasks, (self._clock() + again, neg_priority, next(self._seq), name, fn)
+                    )
+                self._cond.notify_all()
+
+    # -- reporting ---------------------------------------------------------
+
+    def stats(self) -> dict[Hashable, WindowStats]:
+        """Task counters per window key."""
+        with self._cond:
+            out = {}
+            for key, s in self._windows.items():
+                runs = s._counts[0]
+                mean = s._late_total / runs if runs else 0.0
+                out[key] = WindowStats(runs, s._counts[1], mean * 1e3, s._late_max * 1e3)
+            return out
+
+    def summary(self) -> str:
+        """One-line report, e.g. for the log."""
+        stats = self.stats()
+        parts = [
+            f"{w.title} {stats[w.key].runs} runs, "
+            f"late {stats[w.key].mean_late_ms:.0f}/{stats[w.key].max_late_ms:.0f} ms"
+            for w in self.windows() if w.key in stats
+        ]
+        f = self.focus.stats()
+        return (
+            "scheduler: " + ("; ".join(parts) if parts else "no windows")
+            + f"; input {f.holds} holds, {f.switches} focus switches, wait {f.mean_wait_ms:.0f} ms"
+        )
@@ -0,0 +1,79 @@
+"""
+Synthetic Test Images
+=====================
+Deterministic images for the stitching and matching tests and for
+``benchmark.py``: overlapping pairs, multi-frame sweeps and a textured
+stand-in for a game capture.  Everything is generated from a seeded
+``numpy`` RNG, so the same arguments always give the same pixels.
+
+Usage
+-----
+from synthetic import blob_screen, sweep_frames, synthetic_pair
+
+img_l, img_r = synthetic_pair(shift_y=5, overlap=60)
+pattern, frames, tops = sweep_frames(10, jitter=(0, 2, -1))
+screen = blob_screen((1080, 622), seed=3)
+"""
+
+import cv2
+import numpy as np
+
+
+def synthetic_pair(
+    h: int = 128,
+    w: int = 256,
+    shift_y: int = 0,
+    shift_x: int = 30,
+    overlap: int = 60,
+    noise_std: float = 0.0,
+    rng_seed: int = 42,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Build a pair of uint8 grayscale images that overlap by *overlap* pixels
+    horizontally and are offset vertically by *shift_y* rows.
+    """
+    rng = np.random.default_rng(rng_seed)
+    # Create a wide reference pattern
+    full_w = w + overlap
+    full_h = h + abs(shift_y)
+    pattern = (rng.random((full_h, full_w)) * 200 + 28).astype(np.uint8)
+
+    img_l = pattern[:h, :w].copy()
+    y0 = abs(shift_y) if shift_y < 0 else 0
+    img_r = pattern[y0: y0 + h, w - overlap: w - overlap + w].copy()
+
+    if noise_std > 0:
+        noise = rng.normal(0, noise_std, img_r.shape)
+        img_r = np.clip(img_r.astype(np.float64) + noise, 0, 255).astype(np.uint8)
+
+    return img_l, img_r
+
+
+def sweep_frames(
+    n: int,
+    h: int = 64,
+    w: int = 128,
+    step: int = 88,
+    jitter: tuple[int, ...] = (0,),
+    color: bool = False,
+    rng_seed: int = 7,
+) -> tuple[np.ndarray, list[np.ndarray], list[int]]:
+    """
+    Cut *n* frames of width *w* from a wide random pattern, advancing *step*
+    columns per frame with a cyclic vertical *jitter*.  Returns the pattern,
+    the frames and each frame's top row within the pattern.
+    """
+    rng = np.random.default_rng(rng_seed)
+    margin = max(abs(j) for j in jitter)
+    shape = (h + 2 * margin, step * (n - 1) + w) + ((3,) if color else ())
+    pattern = (rng.random(shape) * 200 + 28).astype(np.uint8)
+    tops = [margin + jitter[i % len(jitter)] for i in range(n)]
+    frames = [pattern[t: t + h, i * step: i * step + w].copy() for i, t in enumerate(tops)]
+    return pattern, frames, tops
+
+
+def blob_screen(shape: tuple[int, int] = (1080, 622), seed: int = 0) -> np.ndarray:
+    """Smoothed noise that keeps enough texture after two ``pyrDown`` levels."""
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.random(shape), (0, 0), 1.5)
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
@@ -0,0 +1,265 @@
+"""
+Hot-Path Telemetry
+==================
+Timing spans for the automation loop: how long capture, each template
+match, key sequences, input injection and waits take, per window.  Off by
+default; a disabled :meth:`Telemetry.span` returns a shared no-op context
+manager, so the instrumented code pays one attribute check per span.
+
+Every span is aggregated under (window, span name, tags): an exact count
+and total, plus a bounded reservoir of the most recent durations from which
+p50/p95/p99 are computed.  Aggregates can be
+
+  - appended to a size-rotated JSONL file (:meth:`Telemetry.export_jsonl`,
+    one line per key, cumulative counts), and/or
+  - served as Prometheus text format on a local port
+    (:meth:`Telemetry.serve`), e.g. ``curl localhost:9109/metrics``.
+
+``minfar.py`` enables telemetry from the environment: ``MINFAR_TELEMETRY``
+is the JSONL path, ``MINFAR_TELEMETRY_PORT`` the metrics port.
+
+Usage
+-----
+telemetry = Telemetry(context=current_window_title, enabled=True)
+with telemetry.span("match", template="help", region="full"):
+    cv2.matchTemplate(...)
+telemetry.export_jsonl("telemetry.jsonl")
+print(telemetry.summary())
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Iterator
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TELEMETRY_ENV = "MINFAR_TELEMETRY"
+TELEMETRY_PORT_ENV = "MINFAR_TELEMETRY_PORT"
+
+SpanStats = namedtuple("SpanStats", ["count", "total_s", "p50_ms", "p95_ms", "p99_ms"])
+SpanStats.__doc__ = """
+Aggregate of one (window, span, tags) key.
+
+count   : spans recorded.
+total_s : total seconds spent in them.
+p50_ms, p95_ms, p99_ms : latency percentiles over the most recent spans
+                         (see ``Telemetry.reservoir``).
+"""
+
+_NULL_SPAN = nullcontext()
+
+
+class Telemetry:
+    """Thread-safe span aggregator with JSONL and Prometheus-text export."""
+
+    def __init__(
+        self,
+        context: Callable[[], str | None] | None = None,
+        enabled: bool = False,
+        reservoir: int = 1024,
+        jsonl_path: str | None = None,
+        clock: Callable[[], float] = time.perf_counter,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        context : Callable | None
+            Returns the window a span belongs to (called when the span ends);
+            spans outside any window are recorded under ``"-"``.
+        enabled : bool
+            Record spans; when False :meth:`span` is a no-op.
+        reservoir : int
+            Recent durations kept per key for the percentiles.
+        jsonl_path : str | None
+            Default file for :meth:`export_jsonl`.
+        clock : Callable
+            Time source for span durations.
+        """
+        self.enabled = enabled
+        self.reservoir = reservoir
+        self.jsonl_path = jsonl_path
+        self._context = context
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._spans: dict[tuple, list] = {}
+        self._jsonl: logging.Logger | None = None
+        self._server: ThreadingHTTPServer | None = None
+
+    @classmethod
+    def from_env(cls, context: Callable[[], str | None] | None = None) -> "Telemetry":
+        """
+        Telemetry configured from ``MINFAR_TELEMETRY`` (JSONL path) and
+        ``MINFAR_TELEMETRY_PORT`` (metrics port); disabled if neither is set.
+        """
+        path = os.environ.get(TELEMETRY_ENV) or None
+        port = os.environ.get(TELEMETRY_PORT_ENV) or None
+        telemetry = cls(context=context, enabled=bool(path or port), jsonl_path=path)
+        if port is not None:
+            telemetry.serve(int(port))
+        return telemetry
+
+    # -- recording ---------------------------------------------------------
+
+    def span(self, name: str, **tags):
+        """
+        Context manager timing the enclosed block as span *name*.
+
+        Tag values are converted with ``str``; keep them low-cardinality
+        (template names, regions), never coordinates or timestamps.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return self._span(name, tags)
+
+    @contextmanager
+    def _span(self, name: str, tags: dict) -> Iterator[None]:
+        t0 = self._clock()
+        try:
+            yield
+        finally:
+            self.record(name, self._clock() - t0, **tags)
+
+    def record(self, name: str, seconds: float, **tags) -> None:
+        """Record a duration measured elsewhere (no-op when disabled)."""
+        if not self.enabled:
+            return
+        window = self._context() if self._context is not None else None
+        key = (window or "-", name, tuple(sorted((k, str(v)) for k, v in tags.items())))
+        with self._lock:
+            entry = self._spans.get(key)
+            if entry is None:
+                entry = self._spans[key] = [0, 0.0, deque(maxlen=self.reservoir)]
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2].append(seconds)
+
+    def reset(self) -> None:
+        """Drop all aggregates."""
+        with self._lock:
+            self._spans.clear()
+
+    # -- aggregates --------------------------------------------------------
+
+    def stats(self) -> dict[tuple, SpanStats]:
+        """Aggregates keyed by (window, span name, ((tag, value), ...))."""
+        with self._lock:
+            snapshot = {key: (c, t, list(r)) for key, (c, t, r) in self._spans.items()}
+        out = {}
+        for key, (count, total, recent) in snapshot.items():
+            p50, p95, p99 = np.percentile(recent, (50, 95, 99)) * 1e3
+            out[key] = SpanStats(count, total, float(p50), float(p95), float(p99))
+        return out
+
+    def summary(self, top: int = 5) -> str:
+        """One-line report of the *top* keys by total time."""
+        stats = sorted(self.stats().items(), key=lambda kv: kv[1].total_s, reverse=True)
+        if not stats:
+            return "telemetry: " + ("no spans yet" if self.enabled else "disabled")
+        parts = []
+        for (window, name, tags), s in stats[:top]:
+            label = name + "".join(f" {k}={v}" for k, v in tags)
+            parts.append(f"{window} {label} {s.total_s:.1f} s/{s.count} (p95 {s.p95_ms:.0f} ms)")
+        return "telemetry: " + "; ".join(parts)
+
+    # -- export ------------------------------------------------------------
+
+    def export_jsonl(
+        self, path: str | None = None, max_bytes: int = 5_000_000, backups: int = 3
+    ) -> int:
+        """
+        Append one JSON line per key to *path* (default: ``jsonl_path``).
+        The file is opened on the first call and kept open; it is rotated at
+        *max_bytes*, keeping *backups* old files.
+        Returns the number of lines written.
+        """
+        path = path or self.jsonl_path
+        if path is None:
+            raise ValueError("No telemetry JSONL path given.")
+        if self._jsonl is None:
+            handler = logging.handlers.RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8"
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._jsonl = logging.getLogger(f"{__name__}.jsonl.{id(self)}")
+            self._jsonl.propagate = False
+            self._jsonl.setLevel(logging.INFO)
+            self._jsonl.addHandler(handler)
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        stats = self.stats()
+        for (window, name, tags), s in stats.items():
+            self._jsonl.info(json.dumps({
+                "time": timestamp, "window": window, "span": name, "tags": dict(tags),
+                **s._asdict(),
+            }))
+        return len(stats)
+
+    def prometheus_text(self) -> str:
+        """Aggregates in Prometheus text exposition format (summary metrics)."""
+        lines = [
+            "# HELP minfar_span_seconds Duration of instrumented minfar spans.",
+            "# TYPE minfar_span_seconds summary",
+        ]
+        for (window, name, tags), s in sorted(self.stats().items()):
+            labels = [("window", window), ("span", name), *tags]
+            base = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+            for q, ms in (("0.5", s.p50_ms), ("0.95", s.p95_ms), ("0.99", s.p99_ms)):
+                lines.append(f'minfar_span_seconds{{{base},quantile="{q}"}} {ms / 1e3:.6f}')
+            lines.append(f"minfar_span_seconds_sum{{{base}}} {s.total_s:.6f}")
+            lines.append(f"minfar_span_seconds_count{{{base}}} {s.count}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> int:
+        """
+        Serve :meth:`prometheus_text` at ``http://host:port/metrics`` from a
+        daemon thread; returns the bound port (pass 0 for any free port).
+        """
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = telemetry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.close()
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(
+            target=self._server.serve_forever, name="telemetry-http", daemon=True
+        ).start()
+        bound = self._server.server_address[1]
+        logger.info(f"Telemetry metrics at http://{host}:{bound}/metrics")
+        return bound
+
+    def close(self) -> None:
+        """Stop the metrics endpoint and close the JSONL file."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._jsonl is not None:
+            for handler in list(self._jsonl.handlers):
+                self._jsonl.removeHandler(handler)
+                handler.close()
+            self._jsonl = None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,364 @@
+"""
+Template Registry
+=================
+Load-once registry of the template images in ``gameplay/``.
+
+The directory is scanned once; each PNG is decoded lazily the first time it
+is used, together with the artifacts the matchers need:
+
+  - ``cv2.pyrDown`` levels, used by the pre-screen (``prescreen.PreScreen``
+    via :meth:`TemplateRegistry.pyramid`),
+  - optionally the padded FFT spectrum for a fixed screen shape, ready to be
+    put into a :class:`frequency_stitch.TemplateSpectrumCache`.
+
+Artifacts are persisted in a compressed ``.npz`` next to the templates (one
+flat buffer per pyramid level) plus, when spectra are enabled, a ``.npy``
+sidecar that is memory-mapped so only the spectra actually used are read.
+An entry is reused while the PNG's mtime and size are unchanged (or, when
+only the mtime changed, while its content hash still matches), so a warm
+start neither decodes PNGs nor recomputes anything.
+
+Usage
+-----
+registry = TemplateRegistry("gameplay", cache_path="gameplay/.template_cache.npz")
+registry.require(["world", "help"])
+result = cv2.matchTemplate(screen, registry["world"], cv2.TM_CCOEFF_NORMED)
+registry.save()
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import namedtuple
+from collections.abc import Iterable, Iterator, Mapping
+
+import cv2
+import numpy as np
+
+from frequency_stitch import FFT_MODES, TemplateSpectrumCache
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 2
+
+TemplateArtifacts = namedtuple("TemplateArtifacts", ["image", "pyramid", "spectrum"])
+TemplateArtifacts.__doc__ = """
+Precomputed matching data for one template.
+
+image    : grayscale uint8 template.
+pyramid  : tuple of ``cv2.pyrDown`` levels, finest first (level 0 excluded).
+spectrum : conjugate template FFT for the registry's ``spectrum_shape``,
+           or None when no spectrum shape is configured.
+"""
+
+_FileStat = namedtuple("_FileStat", ["path", "mtime_ns", "size"])
+
+
+def _file_hash(path: str) -> str:
+    """blake2b digest of a file's bytes."""
+    with open(path, "rb") as fh:
+        return hashlib.blake2b(fh.read(), digest_size=16).hexdigest()
+
+
+class TemplateRegistry(Mapping):
+    """
+    Read-only mapping ``name -> grayscale template`` over a directory of PNGs,
+    with lazily computed and persisted matching artifacts.
+
+    ``registry[name]`` returns the image, so the registry is a drop-in
+    replacement for the dict built by ``minfar.load_templates``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        cache_path: str | None = None,
+        pyramid_levels: int = 2,
+        spectrum_shape: tuple[int, int] | None = None,
+        fft_mode: str = "real32",
+        apply_window: bool = True,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        directory : str
+            Folder scanned (non-recursively) for ``*.png`` templates; the
+            file stem is the template name.
+        cache_path : str | None
+            ``.npz`` file used to persist artifacts; None disables the cache.
+        pyramid_levels : int
+            Number of ``cv2.pyrDown`` levels precomputed per template.
+        spectrum_shape : tuple[int, int] | None
+            Reference (screen) shape to precompute template spectra for.  A
+            622 × 1080 real32 spectrum takes ~2.7 MB (stored uncompressed in
+            the memory-mapped sidecar), so this is opt-in.
+        fft_mode : str
+            Spectrum layout, one of :data:`frequency_stitch.FFT_MODES`.
+        apply_window : bool
+            Whether the spectra include the Hann window.
+        """
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Template directory {directory!r} does not exist.")
+        if fft_mode not in FFT_MODES:
+            raise ValueError(f"Unknown fft_mode {fft_mode!r}; expected one of {FFT_MODES}.")
+        self.directory = directory
+        self.cache_path = cache_path
+        self.pyramid_levels = pyramid_levels
+        self.spectrum_shape = tuple(spectrum_shape) if spectrum_shape is not None else None
+        self.fft_mode = fft_mode
+        self.apply_window = apply_window
+        self.loads = 0          # PNG decodes (cache misses)
+        self.cache_hits = 0     # artifacts served from the .npz cache
+
+        self._files: dict[str, _FileStat] = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                stem, ext = os.path.splitext(entry.name)
+                if ext.lower() == ".png" and entry.is_file():
+                    st = entry.stat()
+                    self._files[stem] = _FileStat(entry.path, st.st_mtime_ns, st.st_size)
+
+        self._artifacts: dict[str, TemplateArtifacts] = {}
+        self._hashes: dict[str, str] = {}
+        self._cached: dict[str, dict] = {}      # valid manifest entries
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load_manifest()
+
+    # -- Mapping interface -------------------------------------------------
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.artifacts(name).image
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self._files))
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._files
+
+    # -- public API --------------------------------------------------------
+
+    def require(self, names: Iterable[str]) -> None:
+        """Raise FileNotFoundError listing every name without a PNG."""
+        missing = [n for n in names if n not in self._files]
+        if missing:
+            raise FileNotFoundError(
+                f"Missing template(s) {', '.join(missing)} in {self.directory!r}."
+            )
+
+    def artifacts(self, name: str) -> TemplateArtifacts:
+        """Return (loading on first use) the artifacts of template *name*."""
+        entry = self._artifacts.get(name)
+        if entry is not None:
+            return entry
+        if name not in self._files:
+            raise KeyError(
+                f"Unknown template {name!r}; available: {', '.join(sorted(self._files))}."
+            )
+        with self._lock:
+            entry = self._artifacts.get(name)
+            if entry is None:
+                entry = self._from_cache(name)
+                if entry is None:
+                    entry = self._compute(name)
+                    self._dirty = True
+                self._artifacts[name] = entry
+        return entry
+
+    def pyramid(self, name: str) -> tuple[np.ndarray, ...] | None:
+        """
+        ``cv2.pyrDown`` levels of template *name* (finest first), or None for
+        a name the registry does not hold (e.g. a scaled ``"help@0.9"``).
+        Suitable as ``PreScreen(pyramids=registry.pyramid)``.
+        """
+        if name not in self._files:
+            return None
+        return self.artifacts(name).pyramid
+
+    def prime_spectrum_cache(self, cache: TemplateSpectrumCache) -> int:
+        """
+        Put the spectra of all loaded templates into *cache*, keyed by
+        template name, and return how many were added.  Match with
+        ``key=name`` (or ``cache_key=name``) to hit them.
+        """
+        if self.spectrum_shape is None:
+            raise ValueError("Registry was created without a spectrum_shape.")
+        for name in self:
+            cache.put(
+                name,
+                self.spectrum_shape,
+                self.artifacts(name).spectrum,
+                apply_window=self.apply_window,
+                fft_mode=self.fft_mode,
+            )
+        return len(self)
+
+    def save(self) -> bool:
+        """
+        Write loaded artifacts (and still-valid cached ones) to the cache.
+        A no-op returning False when nothing new was computed.
+        """
+        if self.cache_path is None or not self._dirty:
+            return False
+        with self._lock:
+            entries = {}
+            for name in sorted(self._files):
+                entry = self._artifacts.get(name) or self._from_cache(name, count=False)
+                if entry is not None:
+                    entries[name] = entry
+
+            # One flat buffer per pyramid level keeps the archive to a handful
+            # of members; per-template members cost more to open than a PNG.
+            files = {}
+            buffers = [[] for _ in range(self.pyramid_levels + 1)]
+            offsets = [0] * (self.pyramid_levels + 1)
+            for index, (name, entry) in enumerate(entries.items()):
+                stat = self._files[name]
+                meta = {
+                    "mtime_ns": stat.mtime_ns,
+                    "size": stat.size,
+                    "hash": self._hash(name),
+                    "index": index,
+                    "levels": [],
+                }
+                for level, img in enumerate((entry.image,) + entry.pyramid):
+                    meta["levels"].append([offsets[level], *img.shape])
+                    buffers[level].append(img.ravel())
+                    offsets[level] += img.size
+                files[name] = meta
+            arrays = {
+                f"level{level}": np.concatenate(buf) if buf else np.empty(0, np.uint8)
+                for level, buf in enumerate(buffers)
+            }
+            manifest = {"config": self._config(), "files": files}
+            arrays["__manifest__"] = np.array(json.dumps(manifest))
+
+            spectra = None
+            if self.spectrum_shape is not None and entries:
+                spectra = np.stack([e.spectrum for e in entries.values()])
+            self._close_cache()
+            if spectra is not None:
+                tmp = self._spectra_path() + ".tmp.npy"
+                np.save(tmp, spectra)
+                os.replace(tmp, self._spectra_path())
+            tmp = self.cache_path + ".tmp.npz"
+            np.savez_compressed(tmp, **arrays)
+            os.replace(tmp, self.cache_path)
+
+            self._cached = files
+            self._npz = np.load(self.cache_path, allow_pickle=False)
+            self._dirty = False
+        return True
+
+    # -- internals ---------------------------------------------------------
+
+    def _config(self) -> dict:
+        return {
+            "version": CACHE_VERSION,
+            "pyramid_levels": self.pyramid_levels,
+            "spectrum_shape": list(self.spectrum_shape) if self.spectrum_shape else None,
+            "fft_mode": self.fft_mode,
+            "apply_window": self.apply_window,
+        }
+
+    def _spectra_path(self) -> str:
+        """Sidecar ``.npy`` holding the stacked spectra (memory-mapped on load)."""
+        return os.path.splitext(self.cache_path)[0] + ".spectra.npy"
+
+    def _hash(self, name: str) -> str:
+        digest = self._hashes.get(name)
+        if digest is None:
+            digest = self._hashes[name] = _file_hash(self._files[name].path)
+        return digest
+
+    def _load_manifest(self) -> None:
+        """Open the cache lazily and keep the entries still matching disk."""
+        self._npz = None
+        self._blobs: dict[str, np.ndarray] = {}
+        self._spectra = None
+        if self.cache_path is None or not os.path.exists(self.cache_path):
+            return
+        try:
+            npz = np.load(self.cache_path, allow_pickle=False)
+            manifest = json.loads(str(npz["__manifest__"]))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable template cache {self.cache_path}: {e}")
+            return
+        if manifest.get("config") != self._config():
+            logger.info(f"Template cache {self.cache_path} was built with other settings.")
+            npz.close()
+            self._dirty = True
+            return
+        self._npz = npz
+        for name, meta in manifest.get("files", {}).items():
+            stat = self._files.get(name)
+            if stat is None or stat.size != meta["size"]:
+                continue
+            if stat.mtime_ns != meta["mtime_ns"]:
+                # Touched but possibly unchanged: fall back to the content hash
+                if self._hash(name) != meta["hash"]:
+                    continue
+                self._dirty = True          # refresh the stored mtime
+            self._hashes.setdefault(name, meta["hash"])
+            self._cached[name] = meta
+        if len(self._cached) != len(manifest.get("files", {})):
+            self._dirty = True
+
+    def _close_cache(self) -> None:
+        if self._npz is not None:
+            self._npz.close()
+        self._npz = None
+        self._blobs = {}
+        self._spectra = None
+
+    def _blob(self, key: str) -> np.ndarray:
+        blob = self._blobs.get(key)
+        if blob is None:
+            blob = self._blobs[key] = self._npz[key]
+        return blob
+
+    def _from_cache(self, name: str, count: bool = True) -> TemplateArtifacts | None:
+        meta = self._cached.get(name)
+        if self._npz is None or meta is None:
+            return None
+        try:
+            levels = []
+            for level, (offset, h, w) in enumerate(meta["levels"]):
+                flat = self._blob(f"level{level}")
+                levels.append(flat[offset: offset + h * w].reshape(h, w))
+            spectrum = None
+            if self.spectrum_shape is not None:
+                if self._spectra is None:
+                    self._spectra = np.load(self._spectra_path(), mmap_mode="r")
+                spectrum = self._spectra[meta["index"]]
+        except (KeyError, OSError, ValueError, IndexError):
+            return None
+        if count:
+            self.cache_hits += 1
+        return TemplateArtifacts(levels[0], tuple(levels[1:]), spectrum)
+
+    def _compute(self, name: str) -> TemplateArtifacts:
+        path = self._files[name].path
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError(f"Could not decode template {path!r}.")
+        self.loads += 1
+
+        pyramid = []
+        level = image
+        for _ in range(self.pyramid_levels):
+            level = cv2.pyrDown(level)
+            pyramid.append(level)
+
+        spectrum = None
+        if self.spectrum_shape is not None:
+            spectrum = TemplateSpectrumCache(maxsize=1).get(
+                image, self.spectrum_shape, self.apply_window, fft_mode=self.fft_mode
+            ).spectrum
+
+        return TemplateArtifacts(image, tuple(pyramid), spectrum)
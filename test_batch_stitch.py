@@ -0,0 +1,163 @@
+"""
+Tests for the batch_stitch module.
+
+Run with:  python -m pytest test_batch_stitch.py -v
+"""
+
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+import batch_stitch
+from batch_stitch import find_sequences, is_up_to_date, run_batch, stitch_sequence
+from frequency_stitch import IncrementalStitcher
+from synthetic import sweep_frames
+
+SETTINGS = {
+    "format": "png",
+    "overlap_hint": 60,
+    "blend_width": 16,
+    "blend_mode": "linear",
+    "fft_mode": "real32",
+}
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _write_sweep(directory, n=5, seed=7):
+    """Write an *n*-frame sweep as frame_0.png .. frame_<n-1>.png; returns the frames."""
+    os.makedirs(directory, exist_ok=True)
+    _, frames, _ = sweep_frames(n, h=64, w=128, step=68, jitter=(0, 2, -1), rng_seed=seed)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(directory, f"frame_{i}.png"), frame)
+    return frames
+
+
+def _quiet(line):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Sequence discovery
+# ---------------------------------------------------------------------------
+
+class TestFindSequences:
+    def test_nested_directories_and_natural_order(self, tmp_path):
+        _write_sweep(tmp_path / "day1" / "a", n=12)
+        _write_sweep(tmp_path / "day2" / "b", n=2)
+        (tmp_path / "day1" / "notes.txt").write_text("x")
+        sequences = find_sequences([str(tmp_path)])
+        assert [s.name for s in sequences] == [os.path.join("day1", "a"), os.path.join("day2", "b")]
+        assert [os.path.basename(f) for f in sequences[0].frames][:3] == ["frame_0.png", "frame_1.png", "frame_2.png"]
+        assert os.path.basename(sequences[0].frames[-1]) == "frame_11.png"
+
+    def test_single_directory_is_named_after_itself(self, tmp_path):
+        _write_sweep(tmp_path / "sweep")
+        assert [s.name for s in find_sequences([str(tmp_path / "sweep")])] == ["sweep"]
+
+    def test_glob_pattern_groups_files_by_directory(self, tmp_path):
+        _write_sweep(tmp_path / "a")
+        _write_sweep(tmp_path / "b")
+        sequences = find_sequences([str(tmp_path / "*" / "frame_[0-2].png")])
+        assert [(s.name, len(s.frames)) for s in sequences] == [("a", 3), ("b", 3)]
+
+    def test_output_directory_is_excluded(self, tmp_path):
+        _write_sweep(tmp_path / "a")
+        _write_sweep(tmp_path / "out" / "old")
+        assert [s.name for s in find_sequences([str(tmp_path)], exclude=str(tmp_path / "out"))] == ["a"]
+
+    def test_missing_input(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            find_sequences([str(tmp_path / "nothing*")])
+
+
+# ---------------------------------------------------------------------------
+# Stitching
+# ---------------------------------------------------------------------------
+
+class TestStitchSequence:
+    def test_panorama_and_sidecar_match_incremental_stitcher(self, tmp_path):
+        frames = _write_sweep(tmp_path / "in" / "sweep")
+        sequence, = find_sequences([str(tmp_path / "in")])
+        result = stitch_sequence(sequence, str(tmp_path / "out"), SETTINGS)
+        assert result.status == "stitched" and result.frames == 5
+
+        with IncrementalStitcher(overlap_hint=60, blend_width=16, fft_mode="real32") as builder:
+            for frame in frames:
+                builder.push(frame)
+            expected = builder.result()
+        panorama = cv2.imread(str(tmp_path / "out" / "sweep.png"), cv2.IMREAD_UNCHANGED)
+        np.testing.assert_array_equal(panorama, expected)
+
+        sidecar = json.loads((tmp_path / "out" / "sweep.json").read_text())
+        assert sidecar["settings"] == SETTINGS
+        assert sidecar["frames"] == [f"frame_{i}.png" for i in range(5)]
+        assert sidecar["shape"] == list(expected.shape)
+        second = sidecar["alignments"][1]
+        assert second["position"] == pytest.approx([2, 68], abs=0.5)
+        assert second["psr"] > 5 and second["overlap"] == 60
+
+    def test_npy_format_and_duplicate_frames(self, tmp_path):
+        _write_sweep(tmp_path / "sweep", n=3)
+        cv2.imwrite(str(tmp_path / "sweep" / "frame_1a.png"), cv2.imread(str(tmp_path / "sweep" / "frame_1.png"), cv2.IMREAD_UNCHANGED))
+        sequence, = find_sequences([str(tmp_path / "sweep")])
+        result = stitch_sequence(sequence, str(tmp_path / "out"), dict(SETTINGS, format="npy"))
+        assert result.frames == 3
+        assert np.load(tmp_path / "out" / "sweep.npy", mmap_mode="r").shape == result.shape
+        sidecar = json.loads((tmp_path / "out" / "sweep.json").read_text())
+        assert sidecar["alignments"][2] == {"frame": "frame_1a.png", "duplicate": True}
+        assert sorted(os.listdir(tmp_path / "out")) == ["sweep.json", "sweep.npy"]
+
+    def test_unreadable_frame_fails_without_outputs(self, tmp_path):
+        _write_sweep(tmp_path / "sweep", n=3)
+        (tmp_path / "sweep" / "frame_1.png").write_bytes(b"not a png")
+        sequence, = find_sequences([str(tmp_path / "sweep")])
+        result = stitch_sequence(sequence, str(tmp_path / "out"), SETTINGS)
+        assert result.status == "failed" and "frame_1.png" in result.error
+        assert os.listdir(tmp_path / "out") == []
+
+
+# ---------------------------------------------------------------------------
+# Batch driver
+# ---------------------------------------------------------------------------
+
+class TestRunBatch:
+    def test_parallel_jobs_and_up_to_date_skipping(self, tmp_path):
+        for name in ("a", "b", "c"):
+            _write_sweep(tmp_path / "in" / name, seed=ord(name))
+        sequences = find_sequences([str(tmp_path / "in")])
+        out = str(tmp_path / "out")
+        lines = []
+        results = run_batch(sequences, out, SETTINGS, jobs=2, progress=lines.append)
+        assert sorted(r.status for r in results) == ["stitched"] * 3
+        assert lines[-1].startswith("[3/3] ")
+
+        results = run_batch(sequences, out, SETTINGS, jobs=2, progress=_quiet)
+        assert [r.status for r in results] == ["up to date"] * 3
+
+        # A newer frame or different settings restitch only what is affected
+        frame = sequences[1].frames[0]
+        later = os.stat(tmp_path / "out" / "b.json").st_mtime + 10
+        os.utime(frame, (later, later))
+        assert not is_up_to_date(sequences[1], out, SETTINGS)
+        assert not is_up_to_date(sequences[0], out, dict(SETTINGS, blend_width=32))
+        results = run_batch(sequences, out, SETTINGS, jobs=1, progress=_quiet)
+        assert {r.name: r.status for r in results} == {"a": "up to date", "b": "stitched", "c": "up to date"}
+
+    def test_main_exit_status(self, tmp_path, monkeypatch, capsys):
+        _write_sweep(tmp_path / "in" / "good")
+        _write_sweep(tmp_path / "in" / "bad", n=2)
+        (tmp_path / "in" / "bad" / "frame_1.png").write_bytes(b"")
+        monkeypatch.setattr(sys, "argv", [
+            "batch_stitch.py", str(tmp_path / "in"), "--out", str(tmp_path / "out"), "--jobs", "1",
+        ])
+        with pytest.raises(SystemExit) as exc:
+            batch_stitch.main()
+        assert exc.value.code == 1
+        assert "1 stitched, 0 up to date, 1 failed" in capsys.readouterr().out
@@ -0,0 +1,159 @@
+"""
+Tests for the capture module.
+
+Run with:  python -m pytest test_capture.py -v
+"""
+
+import sys
+import types
+
+import cv2
+import numpy as np
+import pytest
+
+import capture
+from capture import (
+    CaptureBackend,
+    MSSCaptureBackend,
+    PyAutoGUICaptureBackend,
+    ReplayCaptureBackend,
+    get_capture_backend,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _frames(n=3, shape=(40, 30), seed=0):
+    rng = np.random.default_rng(seed)
+    return [(rng.random(shape + (3,)) * 255).astype(np.uint8) for _ in range(n)]
+
+
+class _FakeShot:
+    def __init__(self, bgra):
+        self.height, self.width = bgra.shape[:2]
+        self.raw = bgra.tobytes()
+
+
+def _fake_mss(desktop_bgra, grabs):
+    """Minimal stand-in for the ``mss`` package grabbing from *desktop_bgra*."""
+
+    class _Sct:
+        def grab(self, mon):
+            grabs.append(mon)
+            t, l = mon["top"], mon["left"]
+            return _FakeShot(desktop_bgra[t:t + mon["height"], l:l + mon["width"]])
+
+        def close(self):
+            pass
+
+    return types.SimpleNamespace(mss=_Sct)
+
+
+def _hide_module(monkeypatch, name):
+    monkeypatch.setitem(sys.modules, name, None)     # makes ``import name`` raise ImportError
+
+
+# ---------------------------------------------------------------------------
+# Backend tests
+# ---------------------------------------------------------------------------
+
+class TestReplayBackend:
+    def test_grayscale_matches_cvtcolor(self):
+        frames = _frames()
+        backend = ReplayCaptureBackend(frames)
+        assert backend.shape == (40, 30)
+        for frame in frames:
+            np.testing.assert_array_equal(
+                backend.grab(), cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            )
+
+    def test_grab_into_preallocated_buffer(self):
+        frames = _frames()
+        backend = ReplayCaptureBackend(frames)
+        out = np.empty((40, 30), dtype=np.uint8)
+        assert backend.grab(out=out) is out
+        np.testing.assert_array_equal(out, cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY))
+
+    def test_default_grab_returns_new_arrays(self):
+        backend = ReplayCaptureBackend(_frames(n=1))
+        assert backend.grab() is not backend.grab()
+
+    def test_rejects_wrong_buffer(self):
+        backend = ReplayCaptureBackend(_frames(n=1))
+        with pytest.raises(ValueError, match="out must be"):
+            backend.grab(out=np.empty((30, 40), dtype=np.uint8))
+
+    def test_loop_and_exhaustion(self):
+        gray = [np.full((4, 4), v, dtype=np.uint8) for v in (1, 2)]
+        looping = ReplayCaptureBackend(gray)
+        assert [int(looping.grab()[0, 0]) for _ in range(3)] == [1, 2, 1]
+        once = ReplayCaptureBackend(gray, loop=False)
+        once.grab(), once.grab()
+        with pytest.raises(EOFError):
+            once.grab()
+
+    def test_replays_image_files(self, tmp_path):
+        frames = _frames(n=2)
+        paths = []
+        for i, frame in enumerate(frames):
+            path = tmp_path / f"frame{i}.png"
+            cv2.imwrite(str(path), frame)
+            paths.append(str(path))
+        backend = ReplayCaptureBackend(paths)
+        np.testing.assert_array_equal(backend.grab(), cv2.cvtColor(frames[0], cv2.COLOR_BGR2GRAY))
+
+    def test_stats(self):
+        backend = ReplayCaptureBackend(_frames())
+        assert backend.stats().frames == 0
+        for _ in range(4):
+            backend.grab()
+        s = backend.stats()
+        assert s.frames == 4
+        assert 0 <= s.last_ms <= s.max_ms and s.mean_ms <= s.max_ms
+        assert "4 frames" in backend.summary()
+
+    def test_empty_region_raises(self):
+        with pytest.raises(ValueError, match="Empty capture region"):
+            CaptureBackend((10, 0, 10, 20))
+
+
+class TestMSSBackend:
+    def test_grabs_region_only(self, monkeypatch):
+        rng = np.random.default_rng(2)
+        desktop = (rng.random((200, 300, 4)) * 255).astype(np.uint8)
+        grabs = []
+        monkeypatch.setitem(sys.modules, "mss", _fake_mss(desktop, grabs))
+        backend = MSSCaptureBackend((20, 10, 120, 90))
+        gray = backend.grab()
+        assert grabs == [{"left": 20, "top": 10, "width": 100, "height": 80}]
+        np.testing.assert_array_equal(
+            gray, cv2.cvtColor(desktop[10:90, 20:120], cv2.COLOR_BGRA2GRAY)
+        )
+
+
+class TestGetCaptureBackend:
+    def test_explicit_and_env_selection(self, monkeypatch):
+        monkeypatch.setitem(sys.modules, "mss", _fake_mss(np.zeros((10, 10, 4), np.uint8), []))
+        monkeypatch.setitem(sys.modules, "pyautogui", types.SimpleNamespace())
+        assert isinstance(get_capture_backend("mss"), MSSCaptureBackend)
+        monkeypatch.setenv(capture.CAPTURE_BACKEND_ENV, "pyautogui")
+        assert isinstance(get_capture_backend(), PyAutoGUICaptureBackend)
+
+    def test_falls_back_when_missing(self, monkeypatch, caplog):
+        _hide_module(monkeypatch, "mss")
+        monkeypatch.setitem(sys.modules, "pyautogui", types.SimpleNamespace())
+        backend = get_capture_backend("mss", region=(0, 0, 8, 8))
+        assert isinstance(backend, PyAutoGUICaptureBackend)
+        assert "using 'pyautogui'" in caplog.text
+
+    def test_none_available_raises(self, monkeypatch):
+        _hide_module(monkeypatch, "mss")
+        _hide_module(monkeypatch, "pyautogui")
+        with pytest.raises(ImportError, match="No capture backend"):
+            get_capture_backend()
+
+    def test_unknown_name_raises(self):
+        with pytest.raises(ValueError, match="Unknown capture backend"):
+            get_capture_backend("dxcam")
@@ -0,0 +1,126 @@
+"""
+Tests for the capture_pipeline module.
+
+Run with:  python -m pytest test_capture_pipeline.py -v
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+from capture import CaptureBackend, ReplayCaptureBackend
+from capture_pipeline import CapturePipeline
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class _ScriptedBackend(CaptureBackend):
+    """Frames whose content is ``content(seconds since creation)``."""
+
+    name = "scripted"
+
+    def __init__(self, content, shape=(32, 32)):
+        super().__init__((0, 0, shape[1], shape[0]))
+        self.content = content
+        self.t0 = time.monotonic()
+
+    def _grab_into(self, out):
+        out[:] = self.content(time.monotonic() - self.t0)
+
+
+class _FailingBackend(CaptureBackend):
+    def _grab_into(self, out):
+        raise OSError("display gone")
+
+
+def _pipeline(backend, **kwargs):
+    kwargs.setdefault("interval", 0.005)
+    return CapturePipeline(backend, **kwargs).start()
+
+
+# ---------------------------------------------------------------------------
+# Pipeline tests
+# ---------------------------------------------------------------------------
+
+class TestCapturePipeline:
+    def test_next_frame_is_captured_after_t(self):
+        with _pipeline(_ScriptedBackend(lambda t: 0)) as pipeline:
+            first = pipeline.next_frame()
+            t = time.monotonic()
+            frame = pipeline.next_frame(after=t)
+            assert frame.timestamp >= t
+            assert frame.seq > first.seq
+            assert frame.image.shape == (32, 32)
+
+    def test_ring_buffer_is_bounded_and_frames_are_not_reused(self):
+        with _pipeline(ReplayCaptureBackend([np.zeros((8, 8), np.uint8)]), size=3) as pipeline:
+            frames = [pipeline.next_frame(after=time.monotonic()) for _ in range(5)]
+            assert len(pipeline._frames) <= 3
+            assert len({id(f.image) for f in frames}) == 5
+            assert pipeline.latest().seq >= frames[-1].seq
+
+    def test_settled_frame_waits_for_screen_to_stop_changing(self):
+        # Content changes every 10 ms for the first 150 ms, then stays put
+        backend = _ScriptedBackend(lambda t: int(t * 100) * 40 % 256 if t < 0.15 else 7)
+        with _pipeline(backend) as pipeline:
+            frame = pipeline.settled_frame(after=backend.t0, stable_for=0.05, timeout=2.0)
+        assert int(frame.image[0, 0]) == 7
+        assert frame.timestamp - frame.stable_since >= 0.05
+        assert frame.timestamp - backend.t0 < 1.0
+
+    def test_settled_frame_needs_a_change_after_t(self):
+        # The screen stays put for 0.3 s after the action, then switches page
+        backend = _ScriptedBackend(lambda t: 0)
+        with _pipeline(backend) as pipeline:
+            pipeline.next_frame()
+            t = time.monotonic()
+            backend.content = lambda s: 0 if time.monotonic() - t < 0.3 else 9
+            frame = pipeline.settled_frame(after=t, stable_for=0.05, timeout=2.0)
+        assert int(frame.image[0, 0]) == 9
+        assert frame.timestamp - t >= 0.35
+
+    def test_unchanged_screen_waits_the_full_timeout(self):
+        with _pipeline(_ScriptedBackend(lambda t: 0)) as pipeline:
+            pipeline.next_frame()
+            t = time.monotonic()
+            frame = pipeline.settled_frame(after=t, stable_for=0.05, timeout=0.2)
+            assert time.monotonic() - t >= 0.2
+        assert frame.timestamp >= t
+
+    def test_settled_frame_times_out_with_newest_frame(self):
+        backend = _ScriptedBackend(lambda t: int(t * 1000) * 40 % 256)
+        with _pipeline(backend) as pipeline:
+            t = time.monotonic()
+            frame = pipeline.settled_frame(after=t, stable_for=0.5, timeout=0.1)
+            waited = time.monotonic() - t
+            assert 0.1 <= waited < 0.5
+            assert frame.timestamp >= t
+            assert frame.seq >= pipeline.latest().seq - 1
+
+    def test_not_running_raises(self):
+        pipeline = CapturePipeline(_ScriptedBackend(lambda t: 0))
+        assert pipeline.latest() is None
+        with pytest.raises(TimeoutError, match="not running"):
+            pipeline.next_frame(timeout=0.05)
+
+    def test_capture_errors_are_reported_on_timeout(self):
+        with _pipeline(_FailingBackend((0, 0, 4, 4))) as pipeline:
+            with pytest.raises(TimeoutError, match="display gone"):
+                pipeline.next_frame(timeout=0.2)
+
+    def test_stats(self):
+        with _pipeline(_ScriptedBackend(lambda t: 0)) as pipeline:
+            pipeline.next_frame()
+            pipeline.next_frame(after=time.monotonic())
+        s = pipeline.stats()
+        assert s.served == 2 and s.captured >= 2
+        assert 0 <= s.mean_wait_ms <= s.max_wait_ms
+        assert "2 served" in pipeline.summary()
+        assert not pipeline.running
+
+    def test_invalid_size_raises(self):
+        with pytest.raises(ValueError, match="size"):
+            CapturePipeline(_ScriptedBackend(lambda t: 0), size=0)
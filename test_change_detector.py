@@ -0,0 +1,157 @@
+"""
+Tests for the change_detector module.
+
+Run with:  python -m pytest test_change_detector.py -v
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from change_detector import ChangeStats, FrameChangeDetector
+
+
+def _frame(seed=0, shape=(200, 150)):
+    rng = np.random.default_rng(seed)
+    return (rng.random(shape) * 255).astype(np.uint8)
+
+
+class _Counter:
+    def __init__(self, value="result"):
+        self.value = value
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+class TestFrameChangeDetector:
+    def test_changed_tile_mask(self):
+        detector = FrameChangeDetector(tile=64)
+        first = _frame()
+        assert detector.observe("town", first).all()
+        second = first.copy()
+        second[130, 140] ^= 1                     # bottom-right partial tile
+        changed = detector.observe("town", second)
+        assert changed.shape == (4, 3)
+        assert changed.sum() == 1 and changed[2, 2]
+
+    def test_tolerance(self):
+        detector = FrameChangeDetector(tile=50, tolerance=3)
+        first = _frame()
+        detector.observe("k", first)
+        noisy = np.clip(first.astype(int) + 2, 0, 255).astype(np.uint8)
+        assert not detector.observe("k", noisy).any()
+        moved = noisy.copy()
+        moved[10, 10] = (int(moved[10, 10]) + 100) % 256
+        assert detector.observe("k", moved).sum() == 1
+
+    def test_unchanged_region_reuses_result(self):
+        detector = FrameChangeDetector(tile=64)
+        frame = _frame()
+        detector.observe(("wosmin", "town"), frame)
+        compute = _Counter((10, 20))
+        assert detector.reuse(("wosmin", "town"), frame, ("help", 0.8), (0, 0, 64, 64), compute) == (10, 20)
+
+        same = frame.copy()
+        same[150:, 100:] = 0                      # outside the query region
+        detector.observe(("wosmin", "town"), same)
+        assert detector.reuse(("wosmin", "town"), same, ("help", 0.8), (0, 0, 64, 64), compute) == (10, 20)
+        assert compute.calls == 1
+        assert detector.stats() == ChangeStats(2, 24, 12 + 4, 1, 1)
+
+    def test_changed_region_recomputes(self):
+        detector = FrameChangeDetector(tile=64)
+        frame = _frame()
+        detector.observe("town", frame)
+        compute = _Counter(None)
+        detector.reuse("town", frame, "online", None, compute)
+
+        changed = frame.copy()
+        changed[199, 149] ^= 0xFF
+        detector.observe("town", changed)
+        detector.reuse("town", changed, "online", None, compute)
+        assert compute.calls == 2
+
+    def test_change_in_older_frame_is_not_missed(self):
+        """A change in a frame nobody queried still invalidates older results."""
+        detector = FrameChangeDetector(tile=64)
+        a = _frame(0)
+        detector.observe("k", a)
+        compute = _Counter()
+        detector.reuse("k", a, "q", (0, 0, 10, 10), compute)
+        b = a.copy()
+        b[0, 0] ^= 1
+        detector.observe("k", b)                  # changed, but not queried
+        c = b.copy()
+        assert not detector.observe("k", c).any()
+        detector.reuse("k", c, "q", (0, 0, 10, 10), compute)
+        assert compute.calls == 2
+
+    def test_scenes_are_independent(self):
+        detector = FrameChangeDetector()
+        world, town = _frame(1), _frame(2)
+        detector.observe(("w1", "world"), world)
+        detector.observe(("w1", "town"), town)
+        compute = _Counter()
+        detector.reuse(("w1", "world"), world, "help", None, compute)
+        detector.reuse(("w1", "town"), town, "help", None, compute)
+        assert compute.calls == 2
+
+    def test_unobserved_frame_always_computes(self):
+        detector = FrameChangeDetector()
+        frame = _frame()
+        compute = _Counter()
+        detector.reuse(None, frame, "q", None, compute)
+        detector.reuse("k", frame, "q", None, compute)
+        detector.observe("k", _frame(1))
+        detector.reuse("k", frame, "q", None, compute)     # not the scene's latest frame
+        detector.reuse("k", frame, "q", None, compute)
+        assert compute.calls == 4
+
+    def test_windows_observe_and_reuse_in_parallel(self):
+        detector = FrameChangeDetector(tile=32)
+        start = threading.Barrier(4)
+        errors = []
+
+        def window(i):
+            start.wait()
+            try:
+                for n in range(100):
+                    key = (f"w{i}", f"scene{n % 10}")    # new keys appear while others reuse
+                    frame = _frame(n, shape=(64, 64))
+                    detector.observe(key, frame)
+                    assert detector.reuse(key, frame, "q", None, lambda: n) == n
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=window, args=(i,)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10.0)
+        assert errors == []
+
+    def test_shape_change_resets_scene(self):
+        detector = FrameChangeDetector(tile=64)
+        detector.observe("k", _frame(shape=(64, 64)))
+        assert detector.observe("k", _frame(shape=(128, 64))).shape == (2, 1)
+
+    def test_color_frames(self):
+        detector = FrameChangeDetector(tile=32)
+        frame = np.zeros((64, 64, 3), np.uint8)
+        detector.observe("k", frame)
+        other = frame.copy()
+        other[40, 5, 2] = 9
+        changed = detector.observe("k", other)
+        assert changed.tolist() == [[False, False], [True, False]]
+
+    def test_summary(self):
+        detector = FrameChangeDetector()
+        assert "0 frames" in detector.summary()
+
+    def test_invalid_tile_raises(self):
+        with pytest.raises(ValueError, match="tile"):
+            FrameChangeDetector(tile=0)
@@ -4,65 +4,52 @@ Tests for the frequency_stitch module.
 Run with:  python -m pytest test_frequency_stitch.py -v
 """
 
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
 import numpy as np
 import pytest
 
+import frequency_stitch
 from frequency_stitch import (
+    FFT_MODES,
+    FFTBackend,
+    FourierMellinAligner,
     FrequencyDomainStitcher,
+    IncrementalStitcher,
+    TemplateSpectrumCache,
+    get_fft_backend,
+    match_templates_batch,
+    open_panorama,
     phase_correlate_match,
+    read_panorama_region,
     stitch_images_frequency,
+    stitch_with_rotation,
 )
+from synthetic import blob_screen, sweep_frames, synthetic_pair
 
 
 # ---------------------------------------------------------------------------
-# Helpers
+# phase_correlate_match tests
 # ---------------------------------------------------------------------------
 
-def _synthetic_pair(
-    h: int = 128,
-    w: int = 256,
-    shift_y: int = 0,
-    shift_x: int = 30,
-    overlap: int = 60,
-    noise_std: float = 0.0,
-    rng_seed: int = 42,
-) -> tuple[np.ndarray, np.ndarray]:
-    """
-    Build a pair of uint8 grayscale images that overlap by *overlap* pixels
-    horizontally and are offset vertically by *shift_y* rows.
-    """
-    rng = np.random.default_rng(rng_seed)
-    # Create a wide reference pattern
-    full_w = w + overlap
-    full_h = h + abs(shift_y)
-    pattern = (rng.random((full_h, full_w)) * 200 + 28).astype(np.uint8)
-
-    img_l = pattern[:h, :w].copy()
-    y0 = abs(shift_y) if shift_y < 0 else 0
-    img_r = pattern[y0: y0 + h, w - overlap: w - overlap + w].copy()
-
-    if noise_std > 0:
-        noise = rng.normal(0, noise_std, img_r.shape)
-        img_r = np.clip(img_r.astype(np.float64) + noise, 0, 255).astype(np.uint8)
-
-    return img_l, img_r
+# The shift tests also run coarse-to-fine (pyramid_levels=2)
+_LEVELS = pytest.mark.parametrize("levels", [0, 2])
 
 
-# ---------------------------------------------------------------------------
-# phase_correlate_match tests
-# ---------------------------------------------------------------------------
-
 class TestPhaseCorrelateMatch:
-    def test_zero_shift(self):
-        """Identical images → offset ≈ (0, 0) with high PSR."""
+    @_LEVELS
+    def test_zero_shift(self, levels):
+        """Identical images → offset ≈ (0, 0) with high, but finite, PSR."""
         rng = np.random.default_rng(0)
         img = (rng.random((128, 128)) * 255).astype(np.uint8)
-        (dy, dx), psr = phase_correlate_match(img, img)
+        (dy, dx), psr = phase_correlate_match(img, img, pyramid_levels=levels)
         assert abs(dy) < 0.6, f"dy={dy}"
         assert abs(dx) < 0.6, f"dx={dx}"
-        assert psr > 20.0, f"PSR={psr}"
+        assert 20.0 < psr < 1e6, f"PSR={psr}"
 
-    def test_known_horizontal_shift(self):
+    @_LEVELS
+    def test_known_horizontal_shift(self, levels):
         """Template shifted right by a known amount should be recovered."""
         rng = np.random.default_rng(1)
         ref = (rng.random((128, 256)) * 255).astype(np.uint8)
@@ -70,7 +57,7 @@ class TestPhaseCorrelateMatch:
         # Build a template that is the left region of ref shifted right
         tmpl = ref[:, shift: shift + 128].copy()
         # pad tmpl to ref size for the match
-        (dy, dx), psr = phase_correlate_match(ref, tmpl)
+        (dy, dx), psr = phase_correlate_match(ref, tmpl, pyramid_levels=levels)
         # The template appears at column `shift`, so dx ≈ shift
         assert abs(dx - shift) < 2.0, f"dx={dx} expected≈{shift}"
         assert psr > 10.0, f"PSR={psr}"
@@ -89,13 +76,14 @@ class TestPhaseCorrelateMatch:
         assert isinstance(dx, float)
         assert isinstance(psr, float)
 
-    def test_noisy_image_still_detects(self):
+    @_LEVELS
+    def test_noisy_image_still_detects(self, levels):
         """Phase correlation should handle moderate Gaussian noise."""
         rng = np.random.default_rng(3)
         ref = (rng.random((128, 128)) * 200 + 28).astype(np.uint8)
         noise = rng.normal(0, 15, ref.shape)
         noisy = np.clip(ref.astype(np.float64) + noise, 0, 255).astype(np.uint8)
-        (dy, dx), psr = phase_correlate_match(ref, noisy)
+        (dy, dx), psr = phase_correlate_match(ref, noisy, pyramid_levels=levels)
         assert abs(dy) <= 2.0
         assert abs(dx) <= 2.0
         assert psr > 5.0, f"PSR={psr}"
@@ -110,6 +98,299 @@ class TestPhaseCorrelateMatch:
         assert abs(dx_w - dx_n) < 1.0
 
 
+class TestPyramidPhaseCorrelate:
+    @pytest.mark.parametrize("pos", [(400, 200), (10, 500), (1000, 30), (700, 300)])
+    @pytest.mark.parametrize("fft_mode", ["complex128", "real32"])
+    def test_recovers_position_sub_pixel(self, pos, fft_mode):
+        screen = blob_screen()
+        y, x = pos
+        tmpl = screen[y: y + 60, x: x + 80].copy()
+        (dy, dx), psr = phase_correlate_match(
+            screen, tmpl, pyramid_levels=2, fft_mode=fft_mode
+        )
+        assert abs(dy % 1080 - y) < 0.1 and abs(dx % 622 - x) < 0.1
+        assert psr > 5.0
+
+    @pytest.mark.parametrize("fft_mode", ["complex128", "real32"])
+    def test_coarse_miss_is_recovered_in_the_refine_window(self, fft_mode, monkeypatch):
+        """A coarse estimate 26 px too high puts the fine peak past half the (padded) crop."""
+        screen = blob_screen()
+        tmpl = screen[400:440, 200:256].copy()      # 104-row crop, padded to 108 in real32
+        coarse = frequency_stitch.phase_correlate_match
+
+        def missed(*args, **kwargs):
+            (cy, cx), psr = coarse(*args, **kwargs)
+            return (cy - 26 / 4, cx), psr
+
+        monkeypatch.setattr(frequency_stitch, "phase_correlate_match", missed)
+        (dy, dx), _ = phase_correlate_match(
+            screen, tmpl, apply_window=False, pyramid_levels=2, refine_window=32, fft_mode=fft_mode
+        )
+        assert abs(dy - 400) < 0.1 and abs(dx - 200) < 0.1
+
+    def test_levels_capped_for_small_templates(self):
+        screen = blob_screen((256, 256))
+        tmpl = screen[100:115, 40:60].copy()   # 15 px: no level keeps 8 px
+        plain = phase_correlate_match(screen, tmpl)
+        assert phase_correlate_match(screen, tmpl, pyramid_levels=3) == plain
+
+    def test_negative_levels_raise(self):
+        screen = blob_screen((128, 128))
+        with pytest.raises(ValueError, match="pyramid_levels"):
+            phase_correlate_match(screen, screen[:32, :32], pyramid_levels=-1)
+
+    def test_stitcher_match_template(self):
+        screen = blob_screen()
+        tmpl = screen[300:364, 100:196].copy()
+        stitcher = FrequencyDomainStitcher(pyramid_levels=2, refine_window=8)
+        pos, psr = stitcher.match_template(screen, tmpl, key="icon")
+        assert pos is not None
+        assert abs(pos[0] - 300) < 0.1 and abs(pos[1] - 100) < 0.1
+
+
+# ---------------------------------------------------------------------------
+# FFT mode tests
+# ---------------------------------------------------------------------------
+
+class TestFFTModes:
+    @pytest.mark.parametrize("mode", ["real64", "real32"])
+    @pytest.mark.parametrize("shift_y", [0, -7])
+    @pytest.mark.parametrize("noise_std", [0.0, 15.0])
+    def test_parity_with_complex128(self, mode, shift_y, noise_std):
+        """rfft2/float32 modes must agree with the float64 path on overlap strips."""
+        img_l, img_r = synthetic_pair(
+            h=128, w=256, shift_y=shift_y, overlap=60, noise_std=noise_std
+        )
+        ref_crop, tmpl_crop = img_l[:, 256 - 60:], img_r[:, :60]
+        (dy0, dx0), psr0 = phase_correlate_match(ref_crop, tmpl_crop)
+        (dy, dx), psr = phase_correlate_match(ref_crop, tmpl_crop, fft_mode=mode)
+        assert abs(dy - dy0) < 1e-3
+        assert abs(dx - dx0) < 1e-3
+        assert psr > 20.0
+
+    @pytest.mark.parametrize("mode", FFT_MODES)
+    def test_known_shift_on_non_optimal_size(self, mode):
+        """Padding to an optimal DFT size must not change the recovered offset."""
+        rng = np.random.default_rng(12)
+        ref = (rng.random((101, 233)) * 255).astype(np.uint8)
+        tmpl = ref[17:67, 45:125].copy()
+        (dy, dx), _ = phase_correlate_match(ref, tmpl, fft_mode=mode)
+        assert abs(dy - 17) < 0.5
+        assert abs(dx - 45) < 0.5
+
+    def test_real32_uses_single_precision_half_spectrum(self):
+        tmpl = np.ones((8, 8), dtype=np.uint8)
+        spec = TemplateSpectrumCache().get(tmpl, (60, 97), fft_mode="real32")
+        assert spec.spectrum.dtype == np.complex64
+        assert spec.fft_shape == (60, 100)
+        assert spec.spectrum.shape == (60, 100 // 2 + 1)
+
+    def test_unknown_mode_raises(self):
+        img = np.zeros((32, 32), dtype=np.uint8)
+        with pytest.raises(ValueError, match="fft_mode"):
+            phase_correlate_match(img, img, fft_mode="complex64")
+
+
+# ---------------------------------------------------------------------------
+# FFT backend tests
+# ---------------------------------------------------------------------------
+
+_OPTIONAL_BACKEND_MODULES = {"scipy": "scipy.fft", "pyfftw": "pyfftw"}
+
+
+@pytest.fixture
+def fresh_backends(monkeypatch):
+    """Isolate the memoised backend instances from other tests."""
+    monkeypatch.setattr(frequency_stitch, "_backend_instances", {})
+    monkeypatch.setenv(frequency_stitch.FFTW_WISDOM_ENV, "")
+
+
+class TestFFTBackends:
+    @pytest.mark.parametrize("name", ["numpy", "scipy", "opencv", "pyfftw"])
+    @pytest.mark.parametrize("mode", FFT_MODES)
+    def test_backends_agree_with_numpy(self, name, mode, tmp_path, fresh_backends):
+        if name in _OPTIONAL_BACKEND_MODULES:
+            pytest.importorskip(_OPTIONAL_BACKEND_MODULES[name])
+        if name == "pyfftw":
+            backend = frequency_stitch.PyFFTWBackend(
+                wisdom_path=str(tmp_path / "wisdom.pkl"), planner_effort="FFTW_ESTIMATE"
+            )
+        else:
+            backend = get_fft_backend(name)
+        rng = np.random.default_rng(40)
+        ref = (rng.random((97, 131)) * 255).astype(np.uint8)
+        tmpl = ref[20:50, 33:83].copy()
+        (dy0, dx0), psr0 = phase_correlate_match(ref, tmpl, fft_mode=mode)
+        (dy, dx), psr = phase_correlate_match(ref, tmpl, fft_mode=mode, backend=backend)
+        assert dy == pytest.approx(dy0, abs=1e-3)
+        assert dx == pytest.approx(dx0, abs=1e-3)
+        assert psr == pytest.approx(psr0, rel=1e-3)
+
+    def test_opencv_backend_batched_inverse(self, fresh_backends):
+        rng = np.random.default_rng(41)
+        screen = (rng.random((64, 96)) * 255).astype(np.uint8)
+        templates = [screen[:16, :16].copy(), screen[30:50, 40:70].copy()]
+        expected = match_templates_batch(screen, templates, fft_mode="real64")
+        got = match_templates_batch(screen, templates, fft_mode="real64", backend="opencv")
+        for e, g in zip(expected, got):
+            assert g.offset == pytest.approx(e.offset, abs=1e-6)
+
+    def test_missing_optional_backend_falls_back_to_numpy(self, monkeypatch, fresh_backends):
+        monkeypatch.setitem(__import__("sys").modules, "pyfftw", None)
+        backend = get_fft_backend("pyfftw")
+        assert type(backend) is FFTBackend
+        assert backend.name == "numpy"
+
+    def test_environment_variable_selects_backend(self, monkeypatch, fresh_backends):
+        monkeypatch.setenv(frequency_stitch.FFT_BACKEND_ENV, "opencv")
+        assert get_fft_backend().name == "opencv"
+        assert FrequencyDomainStitcher().backend.name == "opencv"
+
+    def test_unknown_backend_raises(self):
+        with pytest.raises(ValueError, match="Unknown FFT backend"):
+            get_fft_backend("cufft")
+
+    def test_pyfftw_wisdom_persisted(self, tmp_path, fresh_backends):
+        pytest.importorskip("pyfftw")
+        path = tmp_path / "wisdom" / "fftw.pkl"
+        backend = frequency_stitch.PyFFTWBackend(
+            wisdom_path=str(path), planner_effort="FFTW_ESTIMATE"
+        )
+        img = np.ones((32, 32), dtype=np.uint8)
+        phase_correlate_match(img, img, backend=backend)
+        assert not path.exists()                  # planning no longer writes to disk
+        assert backend.save_wisdom()
+        assert path.exists()
+        assert not backend.save_wisdom()          # nothing new to save
+
+
+# ---------------------------------------------------------------------------
+# TemplateSpectrumCache tests
+# ---------------------------------------------------------------------------
+
+class TestTemplateSpectrumCache:
+    def test_cached_result_matches_uncached(self):
+        rng = np.random.default_rng(20)
+        ref = (rng.random((128, 256)) * 255).astype(np.uint8)
+        tmpl = ref[10:74, 40:104].copy()
+        cache = TemplateSpectrumCache()
+        expected = phase_correlate_match(ref, tmpl)
+        first = phase_correlate_match(ref, tmpl, spectrum_cache=cache)
+        second = phase_correlate_match(ref, tmpl, spectrum_cache=cache)
+        assert first == expected
+        assert second == expected
+
+    def test_hit_and_miss_counters(self):
+        rng = np.random.default_rng(21)
+        screen = (rng.random((96, 160)) * 255).astype(np.uint8)
+        tmpl = screen[:32, :32].copy()
+        cache = TemplateSpectrumCache()
+        for _ in range(3):
+            phase_correlate_match(screen, tmpl, spectrum_cache=cache)
+        info = cache.cache_info()
+        assert info.misses == 1
+        assert info.hits == 2
+        assert info.currsize == 1
+
+    @pytest.mark.parametrize("fft_mode", FFT_MODES)
+    def test_put_matches_computed_entry(self, fft_mode):
+        rng = np.random.default_rng(23)
+        screen = (rng.random((96, 160)) * 255).astype(np.uint8)
+        tmpl = screen[20:52, 40:72].copy()
+        computed = TemplateSpectrumCache().get(tmpl, screen.shape, fft_mode=fft_mode)
+        cache = TemplateSpectrumCache()
+        cache.put("icon", screen.shape, computed.spectrum, fft_mode=fft_mode)
+        result = phase_correlate_match(
+            screen, tmpl, spectrum_cache=cache, cache_key="icon", fft_mode=fft_mode
+        )
+        assert cache.cache_info().hits == 1
+        assert result == phase_correlate_match(screen, tmpl, fft_mode=fft_mode)
+
+    def test_put_rejects_mismatched_spectrum(self):
+        cache = TemplateSpectrumCache()
+        with pytest.raises(ValueError, match="does not match"):
+            cache.put("icon", (64, 64), np.zeros((64, 33), np.complex64))
+
+    def test_key_includes_reference_shape(self):
+        rng = np.random.default_rng(22)
+        tmpl = rng.integers(0, 255, (16, 16), dtype=np.uint8)
+        cache = TemplateSpectrumCache()
+        cache.get(tmpl, (64, 64))
+        cache.get(tmpl, (64, 128))
+        assert cache.cache_info().misses == 2
+
+    def test_lru_eviction(self):
+        rng = np.random.default_rng(23)
+        a, b, c = (rng.integers(0, 255, (8, 8), dtype=np.uint8) for _ in range(3))
+        cache = TemplateSpectrumCache(maxsize=2)
+        cache.get(a, (32, 32))
+        cache.get(b, (32, 32))
+        cache.get(a, (32, 32))      # a becomes most recently used
+        cache.get(c, (32, 32))      # evicts b
+        assert cache.cache_info().evictions == 1
+        cache.get(a, (32, 32))
+        assert cache.cache_info().hits == 2
+        cache.get(b, (32, 32))
+        assert cache.cache_info().misses == 4
+
+    def test_max_bytes_bounds_memory(self):
+        rng = np.random.default_rng(24)
+        cache = TemplateSpectrumCache(maxsize=100, max_bytes=3 * 32 * 32 * 16)
+        for _ in range(10):
+            cache.get(rng.integers(0, 255, (8, 8), dtype=np.uint8), (32, 32))
+        info = cache.cache_info()
+        assert info.currsize == 3
+        assert info.nbytes <= 3 * 32 * 32 * 16
+
+    def test_invalid_maxsize_raises(self):
+        with pytest.raises(ValueError, match="maxsize"):
+            TemplateSpectrumCache(maxsize=0)
+
+
+# ---------------------------------------------------------------------------
+# match_templates_batch tests
+# ---------------------------------------------------------------------------
+
+class TestMatchTemplatesBatch:
+    def test_matches_single_template_results(self):
+        """Batched results must equal independent phase_correlate_match calls."""
+        rng = np.random.default_rng(30)
+        screen = (rng.random((128, 256)) * 255).astype(np.uint8)
+        templates = [
+            screen[10:42, 20:52].copy(),
+            screen[60:100, 150:200].copy(),
+            rng.integers(0, 255, (24, 24), dtype=np.uint8),
+        ]
+        batch = match_templates_batch(screen, templates, max_batch=2)
+        assert len(batch) == 3
+        for tmpl, res in zip(templates, batch):
+            (dy, dx), psr = phase_correlate_match(screen, tmpl)
+            assert res.offset[0] == pytest.approx(dy)
+            assert res.offset[1] == pytest.approx(dx)
+            assert res.psr == pytest.approx(psr)
+            assert isinstance(res.peak, float)
+
+    def test_uses_spectrum_cache(self):
+        rng = np.random.default_rng(31)
+        screen = (rng.random((64, 96)) * 255).astype(np.uint8)
+        templates = [screen[:16, :16].copy(), screen[20:40, 30:60].copy()]
+        cache = TemplateSpectrumCache()
+        match_templates_batch(screen, templates, spectrum_cache=cache, keys=["a", "b"])
+        match_templates_batch(screen, templates, spectrum_cache=cache, keys=["a", "b"])
+        info = cache.cache_info()
+        assert info.misses == 2
+        assert info.hits == 2
+
+    def test_empty_template_list(self):
+        screen = np.zeros((32, 32), dtype=np.uint8)
+        assert match_templates_batch(screen, []) == []
+
+    def test_mismatched_keys_raise(self):
+        screen = np.zeros((32, 32), dtype=np.uint8)
+        with pytest.raises(ValueError, match="keys"):
+            match_templates_batch(screen, [screen], keys=["a", "b"])
+
+
 # ---------------------------------------------------------------------------
 # stitch_images_frequency tests
 # ---------------------------------------------------------------------------
@@ -132,14 +413,22 @@ class TestStitchImagesFrequency:
         np.testing.assert_array_equal(panorama, img)
         assert dy == 0.0 and dx == 0.0
 
+    def test_identical_images_honour_out_path(self, tmp_path):
+        rng = np.random.default_rng(101)
+        img = rng.integers(0, 255, (64, 128, 3), dtype=np.uint8)
+        path = str(tmp_path / "same.npy")
+        panorama, _, _ = stitch_images_frequency(img, img, out_path=path)
+        assert isinstance(panorama, np.memmap)
+        np.testing.assert_array_equal(open_panorama(path), img)
+
     def test_output_wider_than_input(self):
         """Stitched panorama must be wider than a single input image."""
-        img_l, img_r = _synthetic_pair(h=64, w=128, overlap=40)
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=40)
         panorama, _, _ = stitch_images_frequency(img_l, img_r, overlap_hint=40)
         assert panorama.shape[1] > img_l.shape[1]
 
     def test_returns_tuple_with_psr(self):
-        img_l, img_r = _synthetic_pair(h=64, w=128, overlap=40)
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=40)
         result = stitch_images_frequency(img_l, img_r, overlap_hint=40)
         assert len(result) == 3
         panorama, (dy, dx), psr = result
@@ -159,23 +448,152 @@ class TestStitchImagesFrequency:
 
     def test_grayscale_image_stitching(self):
         """Stitching should work for single-channel grayscale images."""
-        img_l, img_r = _synthetic_pair(h=64, w=128, overlap=40)
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=40)
         panorama, _, _ = stitch_images_frequency(img_l, img_r, overlap_hint=40)
         assert panorama.ndim == 2
 
     def test_output_dtype_uint8(self):
         """Canvas should remain uint8."""
-        img_l, img_r = _synthetic_pair(h=64, w=128, overlap=40)
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=40)
         panorama, _, _ = stitch_images_frequency(img_l, img_r, overlap_hint=40)
         assert panorama.dtype == np.uint8
 
+    def test_reconstructs_overlapping_pair(self):
+        """The right image must land at (w - overlap) so the pattern is rebuilt."""
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=40)
+        panorama, (dy, dx), _ = stitch_images_frequency(img_l, img_r, overlap_hint=40)
+        assert panorama.shape == (64, 128 - 40 + img_r.shape[1])
+        np.testing.assert_array_equal(panorama[:, :128], img_l)
+        np.testing.assert_array_equal(panorama[:, 88:], img_r)
+
+    def test_overlap_hint_smaller_than_true_overlap(self):
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=60)
+        panorama, _, _ = stitch_images_frequency(img_l, img_r, overlap_hint=40)
+        assert panorama.shape[1] == 128 - 60 + img_r.shape[1]
+        np.testing.assert_array_equal(panorama[:, 68:], img_r)
+
     def test_no_overlap_hint(self):
         """None overlap_hint should fall back to half-width without crashing."""
-        img_l, img_r = _synthetic_pair(h=64, w=128, overlap=64)
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=64)
         panorama, _, _ = stitch_images_frequency(img_l, img_r, overlap_hint=None)
         assert panorama.shape[1] >= img_l.shape[1]
 
 
+# ---------------------------------------------------------------------------
+# Rotation & scale (Fourier–Mellin) tests
+# ---------------------------------------------------------------------------
+
+def _similar_pair(angle, scale, size=256, seed=1):
+    """Centre crops of a texture and of the same texture rotated and scaled."""
+    base = blob_screen((2 * size, 2 * size), seed=seed)
+    c = size - 0.5
+    moved = cv2.warpAffine(base, cv2.getRotationMatrix2D((c, c), angle, scale), base.shape[::-1])
+    lo = size // 2
+    return base[lo: lo + size, lo: lo + size], moved[lo: lo + size, lo: lo + size]
+
+
+class TestFourierMellin:
+    @pytest.mark.parametrize("angle, scale", [(0, 1.0), (5, 1.0), (-12, 1.0), (0, 1.1), (3, 0.9), (20, 1.05)])
+    def test_recovers_rotation_and_scale(self, angle, scale):
+        ref, mov = _similar_pair(angle, scale)
+        result = FourierMellinAligner().align(ref, mov)
+        assert result.angle == pytest.approx(angle, abs=0.5)
+        assert result.scale == pytest.approx(scale, abs=0.02)
+        assert np.allclose(result.offset, (0, 0), atol=1.0)
+
+    def test_reference_log_polar_is_cached_by_key(self):
+        ref, mov = _similar_pair(5, 1.0)
+        aligner = FourierMellinAligner(cache_size=1)
+        first = aligner.log_polar(ref, 256, key="ref")
+        assert aligner.log_polar(ref, 256, key="ref") is first
+        aligner.log_polar(mov, 256, key="mov")
+        assert aligner.log_polar(ref, 256, key="ref") is not first
+
+    def test_stitch_with_rotation_corrects_rotated_frame(self):
+        scene = blob_screen((300, 700), seed=2)
+        left, right = scene[:, :400], scene[:, 250:650]
+        rotated = cv2.warpAffine(right, cv2.getRotationMatrix2D((75, 150), 4, 1.0), (400, 300))
+        panorama, alignment = stitch_with_rotation(left, rotated, overlap_hint=150)
+        assert alignment.angle == pytest.approx(4, abs=0.5)
+        assert alignment.scale == pytest.approx(1.0, abs=0.02)
+        assert np.allclose(alignment.offset, (0, 0), atol=1.0)
+        assert panorama.shape == (300, 650)
+
+    def test_unrotated_pair_matches_translation_path(self):
+        img_l, img_r = synthetic_pair(h=128, w=256, overlap=96)
+        _, offset, _ = stitch_images_frequency(img_l, img_r, overlap_hint=96)
+        _, alignment = stitch_with_rotation(img_l, img_r, overlap_hint=96)
+        assert alignment.angle == pytest.approx(0, abs=0.5)
+        assert np.allclose(alignment.offset, offset, atol=1.0)
+
+
+# ---------------------------------------------------------------------------
+# Blending engine tests
+# ---------------------------------------------------------------------------
+
+class TestBlending:
+    def _reference_linear(self, canvas, img, y, x, bw):
+        """Column-by-column float blend (the original implementation)."""
+        out = canvas.astype(np.float64)
+        for c in range(img.shape[1]):
+            alpha = 1.0 if bw <= 0 else min(max(c / bw, 0.0), 1.0)
+            out[y: y + img.shape[0], x + c] = (
+                out[y: y + img.shape[0], x + c] * (1 - alpha) + img[:, c] * alpha
+            )
+        return out
+
+    @pytest.mark.parametrize("bw", [0, 1, 16, 64])
+    @pytest.mark.parametrize("channels", [None, 3])
+    def test_linear_matches_float_reference(self, bw, channels):
+        rng = np.random.default_rng(50)
+        extra = () if channels is None else (channels,)
+        canvas = rng.integers(0, 256, (40, 120) + extra, dtype=np.uint8)
+        img = rng.integers(0, 256, (32, 70) + extra, dtype=np.uint8)
+        expected = self._reference_linear(canvas, img, 4, 30, bw)
+        frequency_stitch._paste_blend(canvas, img, 4, 30, bw)
+        assert np.abs(canvas.astype(np.float64) - expected).max() <= 1.0
+
+    def test_non_blend_region_is_exact_copy(self):
+        canvas = np.zeros((20, 50), dtype=np.uint8)
+        img = np.full((20, 30), 200, dtype=np.uint8)
+        frequency_stitch._paste_blend(canvas, img, 0, 10, 8)
+        np.testing.assert_array_equal(canvas[:, 18:40], img[:, 8:])
+        assert (canvas[:, :10] == 0).all()
+
+    def test_clips_to_canvas(self):
+        canvas = np.zeros((10, 10), dtype=np.uint8)
+        img = np.full((10, 10), 255, dtype=np.uint8)
+        frequency_stitch._paste_blend(canvas, img, 3, -4, 0)
+        assert (canvas[3:, :6] == 255).all()
+        assert (canvas[:3] == 0).all()
+
+    def test_multiband_transition_is_smooth_and_exact_at_borders(self):
+        canvas = np.full((64, 96), 50, dtype=np.uint8)
+        img = np.full((64, 64), 200, dtype=np.uint8)
+        frequency_stitch._paste_blend(
+            canvas, img, 0, 32, 64, blend_mode="multiband", blend_levels=4
+        )
+        row = canvas[32].astype(int)
+        assert row[32] == 50
+        assert row[95] == 200
+        assert (np.diff(row[32:]) >= 0).all()
+
+    def test_multiband_stitch_color(self):
+        rng = np.random.default_rng(51)
+        img_l = rng.integers(0, 255, (64, 128, 3), dtype=np.uint8)
+        img_r = rng.integers(0, 255, (64, 128, 3), dtype=np.uint8)
+        panorama, _, _ = stitch_images_frequency(
+            img_l, img_r, overlap_hint=40, blend_mode="multiband"
+        )
+        assert panorama.dtype == np.uint8
+        assert panorama.shape[2] == 3
+
+    def test_unknown_blend_mode_raises(self):
+        img_l, img_r = synthetic_pair(h=64, w=128, overlap=40)
+        with pytest.raises(ValueError, match="blend_mode"):
+            stitch_images_frequency(img_l, img_r, blend_mode="feather")
+
+
 # ---------------------------------------------------------------------------
 # FrequencyDomainStitcher tests
 # ---------------------------------------------------------------------------
@@ -195,11 +613,92 @@ class TestFrequencyDomainStitcher:
 
     def test_multi_image_stitch(self):
         """Three-image stitch should produce a wider panorama."""
-        imgs = [_synthetic_pair(h=64, w=128, overlap=40)[0]] * 3
+        imgs = [synthetic_pair(h=64, w=128, overlap=40)[0]] * 3
         stitcher = FrequencyDomainStitcher(overlap_hint=40)
         panorama = stitcher.stitch(imgs)
         assert panorama.shape[1] >= 128
 
+    @pytest.mark.parametrize("color", [False, True])
+    def test_sweep_reconstructs_pattern(self, color):
+        """Two-phase stitch of a jittered sweep reproduces the source pattern."""
+        pattern, frames, tops = sweep_frames(6, jitter=(0, 3, -2, 1), color=color)
+        stitcher = FrequencyDomainStitcher(overlap_hint=40)
+        panorama = stitcher.stitch(frames)
+        top = min(tops)
+        assert panorama.shape[:2] == (64 + max(tops) - top, 88 * 5 + 128)
+        for i, (frame, t) in enumerate(zip(frames, tops)):
+            np.testing.assert_array_equal(
+                panorama[t - top: t - top + 64, i * 88 + 40: i * 88 + 128],
+                frame[:, 40:],
+            )
+
+    def test_stitch_to_memmap(self, tmp_path):
+        _, frames, _ = sweep_frames(5, jitter=(0, 2), color=True)
+        stitcher = FrequencyDomainStitcher(overlap_hint=40)
+        expected = stitcher.stitch(frames)
+        path = str(tmp_path / "pano.npy")
+        result = stitcher.stitch(frames, out_path=path)
+        assert isinstance(result, np.memmap)
+        np.testing.assert_array_equal(result, expected)
+        lazy = open_panorama(path)
+        assert isinstance(lazy, np.memmap) and not lazy.flags.writeable
+        np.testing.assert_array_equal(
+            read_panorama_region(path, 10, 100, 20, 50), expected[10:30, 100:150]
+        )
+
+    def test_estimate_offsets_uses_overlap_strips(self):
+        _, frames, _ = sweep_frames(4, jitter=(0, 2))
+        alignments = FrequencyDomainStitcher(overlap_hint=40).estimate_offsets(frames)
+        assert len(alignments) == 3
+        for i, align in enumerate(alignments):
+            dy, dx = align.offset
+            assert abs(dy - (2 if i % 2 == 0 else -2)) < 0.5
+            assert abs(dx) < 0.5
+            assert align.overlap == 40
+
+    @pytest.mark.parametrize("parallel", ["thread", "process"])
+    def test_parallel_offsets_match_sequential(self, parallel):
+        _, frames, _ = sweep_frames(5, jitter=(0, 2, -1), color=True)
+        expected = FrequencyDomainStitcher(overlap_hint=40).estimate_offsets(frames)
+        stitcher = FrequencyDomainStitcher(overlap_hint=40, workers=2, parallel=parallel)
+        assert stitcher.estimate_offsets(frames) == expected
+
+    def test_process_pool_is_reused_until_close(self):
+        _, frames, _ = sweep_frames(4, jitter=(0, 2))
+        expected = FrequencyDomainStitcher(overlap_hint=40).estimate_offsets(frames)
+        with FrequencyDomainStitcher(overlap_hint=40, workers=2, parallel="process") as stitcher:
+            assert stitcher.estimate_offsets(frames) == expected
+            pool = stitcher._own_pool
+            assert stitcher.estimate_offsets(frames) == expected
+            assert stitcher._own_pool is pool
+        assert stitcher._own_pool is None
+
+    def test_process_offsets_keep_strip_dtype(self):
+        _, frames, _ = sweep_frames(4, jitter=(0, 2))
+        frames16 = [f.astype(np.uint16) * 200 for f in frames]
+        expected = FrequencyDomainStitcher(overlap_hint=40).estimate_offsets(frames16)
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            stitcher = FrequencyDomainStitcher(overlap_hint=40, workers=2, parallel="process", pool=pool)
+            assert stitcher.estimate_offsets(frames16) == expected
+            stitcher.close()
+            assert stitcher.estimate_offsets(frames16) == expected      # caller's pool stays open
+
+    def test_parallel_stitch_all_cores(self):
+        _, frames, _ = sweep_frames(4)
+        expected = FrequencyDomainStitcher(overlap_hint=40).stitch(frames)
+        stitcher = FrequencyDomainStitcher(overlap_hint=40, workers=0)
+        np.testing.assert_array_equal(stitcher.stitch(frames), expected)
+
+    def test_unknown_parallel_mode_raises(self):
+        with pytest.raises(ValueError, match="parallel"):
+            FrequencyDomainStitcher(parallel="gpu")
+
+    def test_duplicate_frames_are_dropped(self):
+        _, frames, _ = sweep_frames(3)
+        stitcher = FrequencyDomainStitcher(overlap_hint=40)
+        with_dupes = stitcher.stitch([frames[0], frames[1], frames[1], frames[2]])
+        np.testing.assert_array_equal(with_dupes, stitcher.stitch(frames))
+
     def test_match_template_below_threshold_returns_none(self):
         """A random template against a random screen should give low PSR → None."""
         rng = np.random.default_rng(7)
@@ -226,3 +725,105 @@ class TestFrequencyDomainStitcher:
         # With a very low per-call threshold, identical images should match
         pos, psr = stitcher.match_template(screen, screen, psr_threshold=1.0)
         assert pos is not None
+
+    def test_match_template_reuses_spectrum(self):
+        """Repeated matches against same-sized screens hit the cache."""
+        rng = np.random.default_rng(10)
+        tmpl = rng.integers(0, 255, (24, 24), dtype=np.uint8)
+        stitcher = FrequencyDomainStitcher(psr_threshold=0.0)
+        for seed in range(4):
+            screen = np.random.default_rng(seed).integers(
+                0, 255, (128, 160), dtype=np.uint8
+            )
+            stitcher.match_template(screen, tmpl, key="icon")
+        info = stitcher.cache_info()
+        assert info.misses == 1
+        assert info.hits == 3
+
+    def test_match_templates_applies_threshold(self):
+        rng = np.random.default_rng(11)
+        screen = (rng.random((128, 160)) * 255).astype(np.uint8)
+        noise = rng.integers(0, 255, (32, 32), dtype=np.uint8)
+        stitcher = FrequencyDomainStitcher(psr_threshold=20.0)
+        hit, miss = stitcher.match_templates(screen, [screen, noise])
+        assert hit.offset is not None
+        assert miss.offset is None
+        assert miss.psr < 20.0
+
+    def test_real32_mode_match_template(self):
+        rng = np.random.default_rng(13)
+        screen = (rng.random((128, 160)) * 255).astype(np.uint8)
+        tmpl = screen[30:62, 70:110].copy()
+        stitcher = FrequencyDomainStitcher(psr_threshold=5.0, fft_mode="real32")
+        pos, psr = stitcher.match_template(screen, tmpl)
+        assert pos is not None
+        assert abs(pos[0] - 30) < 0.5 and abs(pos[1] - 70) < 0.5
+
+
+# ---------------------------------------------------------------------------
+# IncrementalStitcher tests
+# ---------------------------------------------------------------------------
+
+class TestIncrementalStitcher:
+    @pytest.mark.parametrize("background", [True, False])
+    @pytest.mark.parametrize("color", [False, True])
+    def test_matches_batch_stitch(self, background, color):
+        _, frames, _ = sweep_frames(7, jitter=(0, 3, -2, 1), color=color)
+        expected = FrequencyDomainStitcher(overlap_hint=40).stitch(frames)
+        with IncrementalStitcher(overlap_hint=40, background=background) as builder:
+            for frame in frames:
+                builder.push(frame)
+            panorama = builder.result()
+        np.testing.assert_array_equal(panorama, expected)
+        assert len(builder.alignments) == 6
+
+    def test_spill_dir_bounds_resident_memory(self, tmp_path):
+        pattern, frames, _ = sweep_frames(10)
+        with IncrementalStitcher(overlap_hint=40, spill_dir=str(tmp_path)) as builder:
+            for frame in frames:
+                builder.push(frame)
+                builder._wait()
+                assert builder._pending.shape[1] <= 2 * 128
+            panorama = builder.result()
+        assert len(list(tmp_path.glob("chunk_*.npy"))) == 9
+        np.testing.assert_array_equal(panorama, pattern)
+
+    def test_result_to_memmap_from_paths(self, tmp_path):
+        pattern, frames, _ = sweep_frames(5)
+        paths = []
+        for i, frame in enumerate(frames):
+            paths.append(str(tmp_path / f"frame_{i}.png"))
+            cv2.imwrite(paths[-1], frame)
+        out = str(tmp_path / "pano.npy")
+        with IncrementalStitcher(overlap_hint=40, spill_dir=str(tmp_path)) as builder:
+            for path in paths:
+                builder.push(path)
+            builder.result(out_path=out)
+        np.testing.assert_array_equal(open_panorama(out), pattern)
+
+    def test_push_missing_path_raises(self, tmp_path):
+        builder = IncrementalStitcher(background=False)
+        with pytest.raises(FileNotFoundError):
+            builder.push(str(tmp_path / "missing.png"))
+
+    def test_result_mid_stream(self):
+        _, frames, _ = sweep_frames(4)
+        builder = IncrementalStitcher(overlap_hint=40, background=False)
+        builder.push(frames[0])
+        builder.push(frames[1])
+        assert builder.result().shape[1] == 88 + 128
+        builder.push(frames[2])
+        builder.push(frames[3])
+        assert builder.result().shape[1] == 3 * 88 + 128
+
+    def test_duplicate_frames_are_skipped(self):
+        _, frames, _ = sweep_frames(2)
+        builder = IncrementalStitcher(overlap_hint=40, background=False)
+        for frame in (frames[0], frames[0], frames[1], frames[1]):
+            builder.push(frame)
+        assert builder.frame_count == 2
+        assert builder.result().shape[1] == 88 + 128
+
+    def test_result_without_frames_raises(self):
+        with pytest.raises(ValueError, match="No frames"):
+            IncrementalStitcher(background=False).result()
@@ -0,0 +1,90 @@
+"""
+Tests for the matching module.
+
+Run with:  python -m pytest test_matching.py -v
+"""
+
+from change_detector import FrameChangeDetector
+from matching import TemplateMatcher
+from roi_index import ROIIndex
+from synthetic import blob_screen
+
+
+def _scene(positions=((300, 200),), seed=3):
+    """A blob screen with one icon (cut from another blob screen) pasted at each (y, x)."""
+    icon = blob_screen((40, 56), seed=11)
+    screen = blob_screen(seed=seed)
+    for y, x in positions:
+        screen[y: y + 40, x: x + 56] = icon
+    return screen, icon
+
+
+class _Recorder:
+    def __init__(self):
+        self.points = []
+
+    def __call__(self, x, y):
+        self.points.append((x, y))
+
+
+# ---------------------------------------------------------------------------
+# TemplateMatcher tests
+# ---------------------------------------------------------------------------
+
+class TestTemplateMatcher:
+    def test_reports_match_centre(self):
+        screen, icon = _scene()
+        found = _Recorder()
+        assert TemplateMatcher().match_and_handle(screen, icon, 0.9, found, name="icon") == 1
+        assert found.points == [(200 + 28, 300 + 20)]
+
+    def test_region_limits_the_search(self):
+        screen, icon = _scene()
+        matcher = TemplateMatcher()
+        assert matcher.find_template(screen, icon, 0.9, region=(0, 0, 100, 100)) is None
+        assert matcher.find_template(screen, icon, 0.9, region=(-5, 250, 9999, 400)) == (200, 300)
+
+    def test_max_hits_returns_every_instance_best_first(self):
+        screen, icon = _scene(((100, 50), (600, 400), (900, 300)))
+        found = _Recorder()
+        assert TemplateMatcher().match_and_handle(screen, icon, 0.9, found, name="icon", max_hits=None) == 3
+        assert sorted(found.points) == [(78, 120), (328, 920), (428, 620)]
+
+    def test_learned_window_is_keyed_by_context(self):
+        screen, icon = _scene()
+        roi_index = ROIIndex(min_hits=1)
+        matcher = TemplateMatcher(roi_index=roi_index, context=lambda: "a")
+        matcher.match_and_handle(screen, icon, 0.9, _Recorder(), name="icon")
+        assert list(roi_index.stats()) == ["a/icon"]
+
+        # The icon moved: the learned window misses and the full-screen fallback finds it
+        moved, _ = _scene(((700, 450),))
+        found = _Recorder()
+        assert matcher.match_and_handle(moved, icon, 0.9, found, name="icon") == 1
+        assert found.points == [(450 + 28, 700 + 20)]
+
+    def test_unchanged_scene_reuses_the_result(self):
+        screen, icon = _scene()
+        detector = FrameChangeDetector(tile=64)
+        matcher = TemplateMatcher(change_detector=detector)
+        calls = []
+        real = matcher.find_template
+
+        def counting(*args, **kwargs):
+            calls.append(1)
+            return real(*args, **kwargs)
+
+        matcher.find_template = counting
+        for _ in range(2):
+            frame = screen.copy()
+            detector.observe("scene", frame)
+            matcher.match_and_handle(
+                frame, icon, 0.9, _Recorder(), region=(150, 250, 300, 400), name="icon", scene="scene"
+            )
+        assert len(calls) == 1
+
+    def test_fresh_matchers_share_nothing(self):
+        a, b = TemplateMatcher(), TemplateMatcher()
+        assert a.prescreen is not b.prescreen and a.roi_index is not b.roi_index
+        assert a.change_detector is not b.change_detector and a.scales is not b.scales
+        assert not a.telemetry.enabled
@@ -0,0 +1,89 @@
+"""
+Tests for the peaks module.
+
+Run with:  python -m pytest test_peaks.py -v
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from peaks import Hit, best_peak, find_peaks
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _scene(positions, shape=(300, 400), seed=0):
+    """Noise background with a textured 20x30 template pasted at each (x, y)."""
+    rng = np.random.default_rng(seed)
+    screen = (rng.random(shape) * 60).astype(np.uint8)
+    template = (np.random.default_rng(99).random((20, 30)) * 255).astype(np.uint8)
+    for x, y in positions:
+        screen[y: y + 20, x: x + 30] = template
+    return screen, template
+
+
+def _scores(screen, template):
+    return cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+
+
+# ---------------------------------------------------------------------------
+# best_peak
+# ---------------------------------------------------------------------------
+
+class TestBestPeak:
+    def test_returns_best_not_first_in_scan_order(self):
+        result = np.zeros((50, 50), np.float32)
+        result[5, 40] = 0.85                       # first above threshold in scan order
+        result[30, 10] = 0.97
+        assert best_peak(result, 0.8) == Hit(10, 30, pytest.approx(0.97))
+
+    def test_below_threshold(self):
+        result = np.full((10, 10), 0.5, np.float32)
+        assert best_peak(result, 0.8) is None
+
+
+# ---------------------------------------------------------------------------
+# find_peaks
+# ---------------------------------------------------------------------------
+
+class TestFindPeaks:
+    def test_finds_every_instance_once(self):
+        positions = [(20, 30), (200, 40), (90, 200), (330, 250)]
+        screen, template = _scene(positions)
+        hits = find_peaks(_scores(screen, template), 0.8, template.shape)
+        assert sorted((h.x, h.y) for h in hits) == sorted(positions)
+        assert all(h.score > 0.99 for h in hits)
+
+    def test_best_first_and_max_hits(self):
+        screen, template = _scene([(20, 30), (200, 40)])
+        screen[40:50, 200:230] //= 2               # degrade the second instance
+        hits = find_peaks(_scores(screen, template), 0.5, template.shape)
+        assert [(h.x, h.y) for h in hits] == [(20, 30), (200, 40)]
+        assert hits[0].score > hits[1].score
+        assert find_peaks(_scores(screen, template), 0.5, template.shape, max_hits=1) == hits[:1]
+
+    def test_overlapping_detections_are_suppressed(self):
+        result = np.zeros((100, 100), np.float32)
+        result[10, 10] = 0.95
+        result[10, 25] = 0.90                      # 15 px away: same 30 px wide instance
+        result[10, 60] = 0.85
+        hits = find_peaks(result, 0.8, (20, 30))
+        assert [(h.x, h.y) for h in hits] == [(10, 10), (60, 10)]
+        hits = find_peaks(result, 0.8, (20, 30), overlap=0.9)
+        assert len(hits) == 3
+
+    def test_plateau_yields_one_hit(self):
+        result = np.zeros((60, 60), np.float32)
+        result[20:23, 20:23] = 0.9
+        assert len(find_peaks(result, 0.8, (20, 20))) == 1
+
+    def test_nothing_above_threshold(self):
+        screen, template = _scene([])
+        assert find_peaks(_scores(screen, template), 0.8, template.shape) == []
+
+    def test_invalid_max_hits(self):
+        with pytest.raises(ValueError):
+            find_peaks(np.zeros((5, 5), np.float32), 0.5, (2, 2), max_hits=0)
@@ -0,0 +1,130 @@
+"""
+Tests for the prescreen module.
+
+Run with:  python -m pytest test_prescreen.py -v
+"""
+
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+import prescreen as prescreen_module
+from prescreen import PreScreen, PreScreenStats
+
+
+def _screen(seed=0, shape=(400, 300), sigma=3.0):
+    rng = np.random.default_rng(seed)
+    noise = (rng.random(shape) * 255).astype(np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), sigma)
+
+
+def _icon(seed=1, shape=(44, 64)):
+    """Icon-like template: a few flat shapes with sharp edges."""
+    rng = np.random.default_rng(seed)
+    icon = np.full(shape, 40, np.uint8)
+    for _ in range(6):
+        y, x = rng.integers(0, shape[0] - 10), rng.integers(0, shape[1] - 10)
+        h, w = rng.integers(6, 20), rng.integers(6, 30)
+        icon[y: y + h, x: x + w] = rng.integers(80, 255)
+    return icon
+
+
+class TestPreScreen:
+    @pytest.mark.parametrize("sigma", [1.0, 3.0, 6.0])
+    def test_never_rejects_present_template(self, sigma):
+        icon = _icon()
+        prescreen = PreScreen(audit_interval=0)
+        rng = np.random.default_rng(5)
+        for i in range(16):
+            screen = _screen(seed=i, sigma=sigma)
+            y, x = 100 + i // 4, 80 + i % 4          # every sub-sampling phase
+            screen[y: y + 44, x: x + 64] = icon
+            noisy = np.clip(screen + rng.normal(0, 6, screen.shape), 0, 255).astype(np.uint8)
+            full = cv2.matchTemplate(noisy, icon, cv2.TM_CCOEFF_NORMED).max()
+            assert full >= 0.8
+            assert prescreen.may_contain(noisy, icon, 0.8, name="icon")
+
+    def test_rejects_absent_template_and_counts(self):
+        icon = _icon()
+        prescreen = PreScreen(audit_interval=0)
+        flat = np.full((400, 300), 90, np.uint8)
+        flat[200:260, 100:200] = 200              # unrelated UI panel
+        assert not prescreen.may_contain(flat, icon, 0.9, name="icon")
+        assert prescreen.stats()["icon"] == PreScreenStats(1, 1, 0, 0)
+        assert "icon 100% (1/1)" in prescreen.summary()
+
+    def test_region_is_respected(self):
+        icon = _icon()
+        screen = np.full((400, 300), 90, np.uint8)
+        screen[300:344, 200:264] = icon
+        prescreen = PreScreen(audit_interval=0)
+        assert prescreen.may_contain(screen, icon, 0.9, (180, 280, 300, 380), "icon")
+        assert not prescreen.may_contain(screen, icon, 0.9, (0, 0, 150, 200), "icon")
+
+    def test_small_templates_always_pass(self):
+        prescreen = PreScreen()
+        tiny = np.zeros((12, 11), np.uint8)
+        assert prescreen.may_contain(_screen(), tiny, 0.99, name="conquest")
+        assert prescreen.stats()["conquest"].rejects == 0
+
+    def test_region_smaller_than_template_passes(self):
+        icon = _icon()
+        assert PreScreen().may_contain(_screen(), icon, 0.9, (0, 0, 40, 40), "icon")
+
+    def test_audit_counts_false_rejects(self):
+        icon = _icon()
+        screen = np.full((200, 200), 90, np.uint8)
+        screen[50:94, 60:124] = icon
+        prescreen = PreScreen(slack=-2.0, audit_interval=1)   # rejects everything
+        assert prescreen.may_contain(screen, icon, 0.9, name="icon")
+        assert prescreen.stats()["icon"] == PreScreenStats(1, 1, 1, 1)
+
+    def test_screen_pyramid_is_shared(self, monkeypatch):
+        calls = []
+        real = cv2.pyrDown
+
+        def counting(img, *args, **kwargs):
+            calls.append(img.shape)
+            return real(img, *args, **kwargs)
+
+        icon_a, icon_b = _icon(1), _icon(2)
+        screen = _screen()
+        prescreen = PreScreen(audit_interval=0)
+        prescreen.may_contain(screen, icon_a, 0.8, name="a")
+        prescreen.may_contain(screen, icon_b, 0.8, name="b")
+        monkeypatch.setattr(prescreen_module.cv2, "pyrDown", counting)
+        prescreen.may_contain(screen, icon_a, 0.8, name="a")
+        prescreen.may_contain(screen, icon_b, 0.8, name="b")
+        assert calls == []
+
+    def test_precomputed_template_pyramid_is_used(self):
+        icon = _icon()
+        levels = (cv2.pyrDown(icon), cv2.pyrDown(cv2.pyrDown(icon)))
+        prescreen = PreScreen(audit_interval=0, pyramids={"icon": levels}.get)
+        screen = _screen()
+        screen[100:144, 80:144] = icon
+        assert prescreen.may_contain(screen, icon, 0.8, name="icon")
+        assert np.shares_memory(prescreen._coarse["icon"].interior, levels[1])
+        assert prescreen.may_contain(screen, icon, 0.8, name="icon@0.9")      # not in the source
+        assert not np.shares_memory(prescreen._coarse["icon@0.9"].interior, levels[1])
+
+    def test_counters_are_exact_under_concurrency(self):
+        icon = _icon()
+        flat = np.full((400, 300), 90, np.uint8)
+        prescreen = PreScreen(audit_interval=7)
+        start = threading.Barrier(4)
+
+        def worker():
+            start.wait()
+            for _ in range(50):
+                prescreen.may_contain(flat, icon, 0.9, name="icon")
+                prescreen.stats()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10.0)
+        assert prescreen.stats()["icon"] == PreScreenStats(200, 200, 200 // 7, 0)
@@ -0,0 +1,118 @@
+"""
+Tests for the roi_index module.
+
+Run with:  python -m pytest test_roi_index.py -v
+"""
+
+import json
+
+import pytest
+
+from roi_index import ROIIndex, ROIStats
+
+
+class _Finder:
+    """find(region) stub: the template sits at *point* (or nowhere)."""
+
+    def __init__(self, point=None):
+        self.point = point
+        self.calls = []
+
+    def __call__(self, region):
+        self.calls.append(region)
+        if self.point is None:
+            return None
+        if region is None:
+            return self.point
+        x1, y1, x2, y2 = region
+        x, y = self.point
+        return self.point if x1 <= x and y1 <= y and x + 20 <= x2 and y + 10 <= y2 else None
+
+
+class TestROIIndex:
+    def test_learns_window_after_min_hits(self):
+        index = ROIIndex(margin=4, min_hits=2)
+        find = _Finder((431, 854))
+        for _ in range(2):
+            assert index.locate("world", (10, 20), find) == (431, 854)
+        assert find.calls == [None, None]
+        assert index.region("world") == (427, 850, 455, 868)
+
+        assert index.locate("world", (10, 20), find) == (431, 854)
+        assert find.calls[-1] == (427, 850, 455, 868)
+        assert index.stats()["world"] == ROIStats(1, 0, 2, 2)
+
+    def test_window_grows_to_cover_all_matches(self):
+        index = ROIIndex(margin=0, min_hits=1)
+        for pt in ((100, 50), (102, 48), (101, 53)):
+            index.record("online", pt, (10, 20))
+        assert index.region("online") == (100, 48, 122, 63)
+
+    def test_miss_falls_back_every_interval(self):
+        index = ROIIndex(min_hits=1, fallback_interval=3)
+        index.record("help", (200, 300), (10, 20))
+        find = _Finder(None)
+        for _ in range(6):
+            assert index.locate("help", (10, 20), find) is None
+        full = [r for r in find.calls if r is None]
+        assert len(find.calls) == 8 and len(full) == 2
+        assert index.stats()["help"] == ROIStats(0, 6, 2, 0)
+
+    def test_every_miss_falls_back_by_default(self):
+        index = ROIIndex(min_hits=1)
+        index.record("help", (200, 300), (10, 20))
+        find = _Finder(None)
+        for _ in range(3):
+            assert index.locate("help", (10, 20), find) is None
+        assert [r is None for r in find.calls] == [False, True] * 3
+
+    def test_moved_element_is_found_by_fallback(self):
+        index = ROIIndex(margin=2, min_hits=1)
+        index.record("fountain", (10, 10), (10, 20))
+        find = _Finder((300, 400))
+        assert index.locate("fountain", (10, 20), find) == (300, 400)
+        x1, y1, x2, y2 = index.region("fountain")
+        assert (x1, y1) == (8, 8) and (x2, y2) == (322, 412)
+
+    def test_context_separates_windows(self):
+        index = ROIIndex(min_hits=1, margin=0)
+        index.record("idle", (10, 10), (10, 20), context="wosmin")
+        index.record("idle", (50, 60), (10, 20), context="WOSMIN")
+        assert index.region("idle", "wosmin") == (10, 10, 30, 20)
+        assert index.region("idle", "WOSMIN") == (50, 60, 70, 70)
+        assert index.region("idle") is None
+
+    def test_template_size_change_resets_window(self):
+        index = ROIIndex(min_hits=1, margin=0)
+        index.record("good", (10, 10), (10, 20))
+        index.record("good", (90, 90), (12, 24))
+        assert index.region("good") == (90, 90, 114, 102)
+
+    def test_persists_across_runs(self, tmp_path):
+        path = str(tmp_path / "roi.json")
+        index = ROIIndex(path, min_hits=1, margin=0)
+        index.record("world", (441, 859), (10, 20))
+        assert index.save() is True
+        assert index.save() is False
+        index.record("world", (441, 859), (10, 20))   # same box: nothing to write
+        assert index.save() is False
+
+        reloaded = ROIIndex(path, min_hits=1, margin=0)
+        assert reloaded.region("world") == (441, 859, 461, 869)
+        with open(path, encoding="utf-8") as fh:
+            assert json.load(fh)["world"]["count"] == 1
+
+    def test_forget(self):
+        index = ROIIndex(min_hits=1)
+        index.record("free", (5, 5), (10, 20))
+        index.forget("free")
+        assert index.region("free") is None
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / "roi.json"
+        path.write_text("{not json")
+        assert ROIIndex(str(path)).region("world") is None
+
+    def test_invalid_settings_raise(self):
+        with pytest.raises(ValueError, match="min_hits"):
+            ROIIndex(min_hits=0)
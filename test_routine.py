@@ -0,0 +1,315 @@
+"""
+Tests for the routine module.
+
+Run with:  python -m pytest test_routine.py -v
+"""
+
+import os
+import re
+
+import pytest
+
+from routine import (
+    DONE, RESTART, STOP, RoutineDriver, RoutineError, Task, compile_routine, load_routine,
+)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class _FakeDriver(RoutineDriver):
+    """Records every call; ``visible`` is the set of templates currently on screen."""
+
+    def __init__(self, visible=(), title=None, flags=None, stop_after=None):
+        self.visible = set(visible)
+        self.title = title
+        self.flags = flags or {}
+        self.stop_after = stop_after
+        self.calls = []
+        self.found = []
+
+    def stopped(self):
+        return self.stop_after is not None and len(self.calls) >= self.stop_after
+
+    def flag(self, name):
+        return self.flags.get(name, False)
+
+    def capture(self, scene, settle):
+        self.calls.append(("capture", scene, settle))
+        return "frame"
+
+    def find(self, screen, check):
+        self.found.append((check.name, check.region))
+        return (10, 20) if check.template in self.visible else None
+
+    def find_all(self, screen, check):
+        self.found.append((check.name, check.region))
+        hits = [(10, 20), (30, 40), (50, 60)] if check.template in self.visible else []
+        return hits if check.max_hits is None else hits[:check.max_hits]
+
+    def wait_for(self, checks, timeout):
+        self.calls.append(("wait_for", tuple(c.name for c in checks), timeout))
+        for i, check in enumerate(checks):
+            if check.template in self.visible:
+                return i, (1, 2)
+        return None
+
+    def wait_gone(self, check, timeout):
+        self.calls.append(("wait_gone", check.name, timeout))
+        self.visible.discard(check.template)
+        return True
+
+    def click(self, x, y, count=1):
+        self.calls.append(("click", x, y, count))
+
+    def move(self, x, y):
+        self.calls.append(("move", x, y))
+
+    def drag(self, start, end, duration):
+        self.calls.append(("drag", start, end, duration))
+
+    def keys(self, keys, delays, settle):
+        self.calls.append(("keys", tuple(keys), tuple(delays), settle))
+
+    def sleep(self, seconds):
+        self.calls.append(("sleep", seconds))
+
+    def log(self, message):
+        self.calls.append(("log", message))
+
+
+def _routine(screens, cycle=None, variables=None, templates=None, toggles=None):
+    config = {"cycle": cycle or [next(iter(screens))], "screens": screens}
+    if variables is not None:
+        config["variables"] = variables
+    return compile_routine(config, templates, toggles)
+
+
+# ---------------------------------------------------------------------------
+# Compilation
+# ---------------------------------------------------------------------------
+
+class TestCompile:
+    @pytest.mark.parametrize("screens, message", [
+        ({"a": {"checks": [{"template": "t", "actions": [{"jump": True}]}]}}, "unknown action 'jump'"),
+        ({"a": {"checks": [{"template": "t", "then": "b"}]}}, "unknown screen 'b'"),
+        ({"a": {"checks": [{"template": "t", "threshold": 1.5}]}}, "threshold: must be in (0, 1]"),
+        ({"a": {"checks": [{"template": "t", "region": "$nowhere"}]}}, "variable $nowhere has no default"),
+        ({"a": {"enter": [{"click": True}]}}, "only allowed in checks"),
+        ({"a": {"settle": 1, "wait": 2}}, "use either settle or wait"),
+        ({"a": {"checks": [], "colour": "red"}}, "unknown keys: colour"),
+        ({"a": {"enter": [{"keys": {"keys": ["a", "b"], "delays": [1]}}]}}, "must match keys in length"),
+        ({"a": {"checks": [{"template": "t", "max_hits": 0}]}}, 'max_hits: must be a count >= 1 or "all"'),
+        ({"a": {"scene": ["world"]}}, "screens.a.scene: must be a non-empty string"),
+        ({"a": {"checks": [{"template": "t", "enabled_by": True}]}}, "checks[0].enabled_by: must be a toggle name"),
+        ({"a": {"checks": [{"template": "t", "enabled_by": "frm"}]}}, "enabled_by: unknown toggle 'frm' (known: farm, rally)"),
+    ])
+    def test_invalid_config_names_the_entry(self, screens, message):
+        with pytest.raises(RoutineError, match=re.escape(message)):
+            _routine(screens, toggles={"farm", "rally"})
+
+    def test_toggles_are_not_checked_without_a_toggle_set(self):
+        routine = _routine({"a": {"checks": [{"template": "t", "enabled_by": "anything"}]}})
+        assert routine.screens["a"].checks[0].enabled_by == "anything"
+
+    def test_unknown_cycle_screen(self):
+        with pytest.raises(RoutineError, match=r"cycle\[1\]: unknown screen 'b'"):
+            _routine({"a": {}}, cycle=["a", "b"])
+
+    def test_unknown_template(self):
+        with pytest.raises(RoutineError, match="unknown templates: missing"):
+            _routine({"a": {"checks": [{"template": "missing"}, {"template": "ok"}]}}, templates={"ok"})
+
+    def test_invalid_json(self, tmp_path):
+        path = tmp_path / "routine.json"
+        path.write_text("{not json")
+        with pytest.raises(RoutineError, match="invalid JSON"):
+            load_routine(str(path))
+
+    def test_shipped_routine_compiles_against_gameplay_templates(self):
+        here = os.path.dirname(os.path.abspath(__file__))
+        names = {os.path.splitext(f)[0] for f in os.listdir(os.path.join(here, "gameplay"))}
+        # The toggles minfar.Account has (minfar.ACCOUNT_TOGGLES)
+        routine = load_routine(os.path.join(here, "routine.json"), names, toggles={"rally", "rally2", "farm"})
+        assert routine.templates <= names
+        tasks = routine.tasks
+        assert set(tasks) == {"rally", "march", "town"}
+        # A rally is picked up sooner than the march queue or town chores, and wins ties
+        assert tasks["rally"].interval < tasks["march"].interval
+        assert tasks["rally"].priority > tasks["march"].priority > tasks["town"].priority
+        assert tasks["rally"].enabled_by == ("rally", "rally2")
+
+    @pytest.mark.parametrize("tasks, message", [
+        ({"t": {"cycle": ["a", "b"]}}, "tasks.t.cycle[1]: unknown screen 'b'"),
+        ({"t": {"cycle": []}}, "tasks.t.cycle: must be a non-empty list of screens"),
+        ({"t": {"cycle": ["a"], "interval": 0}}, "tasks.t.interval: must be a number >= 1"),
+        ({"t": {"cycle": ["a"], "priority": 1.5}}, "tasks.t.priority: must be an integer"),
+        ({"t": {"cycle": ["a"], "enabled_by": ["farm", "frm"]}}, "tasks.t.enabled_by[1]: unknown toggle 'frm'"),
+        ({"t": {"cycle": ["a"], "every": 5}}, "tasks.t: unknown keys: every"),
+        ({}, "tasks: must be a non-empty object"),
+    ])
+    def test_invalid_task_names_the_entry(self, tasks, message):
+        with pytest.raises(RoutineError, match=re.escape(message)):
+            compile_routine({"tasks": tasks, "screens": {"a": {}}}, toggles={"farm"})
+
+    def test_cycle_and_tasks_are_exclusive(self):
+        with pytest.raises(RoutineError, match="use either cycle or tasks"):
+            compile_routine({"cycle": ["a"], "tasks": {"t": {"cycle": ["a"]}}, "screens": {"a": {}}})
+
+    def test_cycle_is_a_single_default_task(self):
+        routine = _routine({"a": {}, "b": {}}, cycle=["a", "b"])
+        assert routine.tasks == {"cycle": Task("cycle", ("a", "b"), None, None, 0, ())}
+
+
+# ---------------------------------------------------------------------------
+# Engine
+# ---------------------------------------------------------------------------
+
+class TestRun:
+    def test_first_match_fires_and_restarts(self):
+        routine = _routine({"a": {
+            "settle": 2,
+            "checks": [
+                {"template": "x", "actions": [{"click": 2}], "then": "restart"},
+                {"template": "y", "actions": [{"click": True}]},
+            ],
+        }})
+        driver = _FakeDriver(visible={"x", "y"})
+        assert routine.run(driver) == RESTART
+        assert driver.calls == [("capture", "a", 2.0), ("click", 10, 20, 2)]
+
+    def test_next_continues_with_remaining_checks_on_same_frame(self):
+        routine = _routine({"a": {"checks": [
+            {"template": "x", "actions": [{"click": True}]},
+            {"template": "y"},
+            {"template": "z", "actions": [{"hover": True}]},
+        ], "otherwise": [{"sleep": 1}]}})
+        driver = _FakeDriver(visible={"x", "z"})
+        assert routine.run(driver) == DONE
+        assert driver.calls == [("capture", "a", None), ("click", 10, 20, 1), ("move", 10, 20)]
+        assert [name for name, _ in driver.found] == ["x", "y", "z"]
+
+    def test_otherwise_runs_only_when_nothing_matched(self):
+        routine = _routine({"a": {
+            "checks": [{"template": "x"}],
+            "otherwise": [{"keys": {"keys": ["esc"], "delays": [0.5]}}],
+            "otherwise_then": "restart",
+        }})
+        driver = _FakeDriver()
+        assert routine.run(driver) == RESTART
+        assert driver.calls[-1] == ("keys", ("esc",), (0.5,), False)
+
+    def test_sub_screen_returns_to_caller(self):
+        routine = _routine({
+            "a": {"checks": [
+                {"template": "x", "then": "dialog"},
+                {"template": "y", "actions": [{"log": "{name} at {x},{y}"}]},
+            ]},
+            "dialog": {"wait": 3, "checks": [
+                {"template": "ok", "actions": [{"click": True}, {"wait_gone": 2}]},
+            ]},
+        })
+        driver = _FakeDriver(visible={"x", "y", "ok"})
+        assert routine.run(driver) == DONE
+        assert driver.calls == [
+            ("capture", "a", None),
+            ("wait_for", ("ok",), 3.0),
+            ("click", 1, 2, 1),
+            ("wait_gone", "ok", 2.0),
+            ("log", "y at 10,20"),
+        ]
+
+    def test_restart_in_sub_screen_ends_the_pass(self):
+        routine = _routine({
+            "a": {"checks": [{"template": "x", "then": "dialog"}, {"template": "y", "actions": [{"click": True}]}]},
+            "dialog": {"wait": 3, "checks": [{"template": "ok"}], "otherwise_then": "restart"},
+            "b": {"enter": [{"sleep": 1}]},
+        }, cycle=["a", "b"])
+        driver = _FakeDriver(visible={"x", "y"})
+        assert routine.run(driver) == RESTART
+        assert ("sleep", 1.0) not in driver.calls
+        assert not any(call[0] == "click" for call in driver.calls)
+
+    def test_max_hits_runs_actions_per_instance_on_one_capture(self):
+        routine = _routine({"a": {"checks": [
+            {"template": "x", "max_hits": 2, "actions": [{"click": True}], "then": "restart"},
+            {"template": "y", "max_hits": "all", "actions": [{"hover": True}]},
+        ]}})
+        driver = _FakeDriver(visible={"x"})
+        assert routine.run(driver) == RESTART
+        assert driver.calls == [("capture", "a", None), ("click", 10, 20, 1), ("click", 30, 40, 1)]
+        driver = _FakeDriver(visible={"y"})
+        routine.run(driver)
+        assert [c for c in driver.calls if c[0] == "move"] == [("move", 10, 20), ("move", 30, 40), ("move", 50, 60)]
+
+    def test_enabled_by_skips_disabled_checks(self):
+        routine = _routine({"a": {"checks": [
+            {"template": "x", "enabled_by": "farm", "actions": [{"click": True}]},
+        ]}})
+        driver = _FakeDriver(visible={"x"})
+        routine.run(driver)
+        assert driver.calls == []                   # nothing to check: no capture either
+        driver = _FakeDriver(visible={"x"}, flags={"farm": True})
+        routine.run(driver)
+        assert ("click", 10, 20, 1) in driver.calls
+
+    def test_tasks_run_their_own_screens(self):
+        routine = compile_routine({
+            "tasks": {
+                "rally": {"cycle": ["world", "rally"], "interval": 5, "enabled_by": ["rally", "rally2"]},
+                "town": {"cycle": ["town"]},
+            },
+            "screens": {
+                "world": {"enter": [{"keys": {"keys": ["S", "1"], "delays": [1, 1]}}]},
+                "rally": {"scene": "world", "checks": [{"template": "r", "actions": [{"click": True}]}]},
+                "town": {"checks": [{"template": "c"}]},
+            },
+        })
+        driver = _FakeDriver(visible={"r"})
+        assert routine.run(driver, "rally") == DONE
+        assert driver.calls == []                   # both toggles off: the task visits nothing
+        driver = _FakeDriver(visible={"r"}, flags={"rally2": True})
+        routine.run(driver, "rally")
+        assert driver.calls == [("keys", ("S", "1"), (1.0, 1.0), False), ("capture", "world", None), ("click", 10, 20, 1)]
+        driver = _FakeDriver(flags={"rally": True})
+        routine.run(driver)                         # every enabled task in order
+        assert [c[1] for c in driver.calls if c[0] == "capture"] == ["world", "town"]
+
+    def test_variables_resolve_per_window_title(self):
+        routine = _routine(
+            {"a": {
+                "enter": [{"keys": {"keys": ["$troop", "s"], "delays": [1, 1]}}],
+                "checks": [{"template": "x", "region": "$idle"}],
+            }},
+            variables={"*": {"troop": "a", "idle": [0, 0, 5, 5]}, "alt": {"troop": "p"}},
+        )
+        driver = _FakeDriver()
+        routine.run(driver)
+        assert driver.calls[0] == ("keys", ("a", "s"), (1.0, 1.0), False)
+        assert driver.found == [("x", (0, 0, 5, 5))]
+        driver = _FakeDriver(title="alt")
+        routine.run(driver)
+        assert driver.calls[0] == ("keys", ("p", "s"), (1.0, 1.0), False)
+
+    def test_stop_abandons_the_pass(self):
+        routine = _routine({"a": {"checks": [
+            {"template": "x", "actions": [{"click": True}, {"click": True}]},
+        ]}, "b": {}}, cycle=["a", "b"])
+        driver = _FakeDriver(visible={"x"}, stop_after=2)
+        assert routine.run(driver) == STOP
+        assert driver.calls == [("capture", "a", None), ("click", 10, 20, 1)]
+
+    def test_transition_loop_is_bounded(self):
+        routine = _routine({"a": {"otherwise_then": "a"}})
+        with pytest.raises(RuntimeError, match="nested deeper"):
+            routine.run(_FakeDriver())
+
+    def test_stats_and_summary(self):
+        routine = _routine({"a": {"checks": [{"template": "x"}, {"template": "y"}]}})
+        routine.run(_FakeDriver(visible={"y"}))
+        routine.run(_FakeDriver())
+        s = routine.stats()["a"]
+        assert (s.visits, s.checks, s.matches) == (2, 4, 1)
+        assert routine.summary() == "routine: a 2.0 checks/visit, 1 matches"
+
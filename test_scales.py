@@ -0,0 +1,98 @@
+"""
+Tests for the scales module.
+
+Run with:  python -m pytest test_scales.py -v
+"""
+
+import cv2
+import numpy as np
+import pytest
+
+from scales import TemplateScales
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _texture(shape, seed):
+    rng = np.random.default_rng(seed)
+    img = cv2.GaussianBlur(rng.random(shape), (0, 0), 1.5)
+    return cv2.normalize(img, None, 0, 255, cv2.NORM_MINMAX).astype(np.uint8)
+
+
+def _window(scale, seed=0):
+    """A 400x300 'window' whose content is rendered at *scale*, and two templates cut at 1.0."""
+    base = _texture((400, 300), seed)
+    templates = {"button": base[100:140, 50:110].copy(), "icon": base[250:280, 180:220].copy()}
+    screen = cv2.resize(base, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+    return screen, templates
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# ---------------------------------------------------------------------------
+# TemplateScales tests
+# ---------------------------------------------------------------------------
+
+class TestCalibrate:
+    @pytest.mark.parametrize("scale", [0.9, 1.0, 1.1])
+    def test_picks_render_scale(self, scale):
+        screen, templates = _window(scale)
+        scales = TemplateScales(scales=(0.9, 1.0, 1.1))
+        cal = scales.calibrate("w", screen, templates)
+        assert cal is not None and cal.scale == scale
+        assert scales.scale("w") == scale
+        assert not scales.needs_calibration("w")
+
+    def test_resolve_scaled_template_matches_after_calibration(self):
+        screen, templates = _window(1.1)
+        scales = TemplateScales(scales=(0.9, 1.0, 1.1))
+        name, tmpl = scales.resolve("button", templates["button"], "w")
+        assert name == "button" and tmpl is templates["button"]
+        scales.calibrate("w", screen, templates)
+        name, tmpl = scales.resolve("button", templates["button"], "w")
+        assert name == "button@1.1" and tmpl.shape == (44, 66)
+        assert scales.resolve("button", templates["button"], "w")[1] is tmpl   # cached
+        _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(screen, tmpl, cv2.TM_CCOEFF_NORMED))
+        assert score > 0.9 and abs(x - 55) <= 1 and abs(y - 110) <= 1
+        assert scales.resolve("button", templates["button"], "other")[0] == "button"
+
+    def test_failed_calibration_is_retried_after_interval(self):
+        clock = _FakeClock()
+        _, templates = _window(1.0)
+        blank = _texture((400, 300), seed=5)            # none of the templates on screen
+        scales = TemplateScales(scales=(1.0,), retry_interval=60, clock=clock)
+        assert scales.calibrate("w", blank, templates) is None
+        assert scales.scale("w") is None
+        assert not scales.needs_calibration("w")
+        clock.now = 61
+        assert scales.needs_calibration("w")
+
+    def test_oversized_scaled_templates_are_skipped(self):
+        screen, templates = _window(1.0)
+        scales = TemplateScales(scales=(1.0, 20.0))
+        assert scales.calibrate("w", screen, templates).scale == 1.0
+
+    def test_persistence_and_reset(self, tmp_path):
+        path = str(tmp_path / "scales.json")
+        screen, templates = _window(0.9)
+        scales = TemplateScales(path, scales=(0.9, 1.0))
+        assert not scales.save()
+        scales.calibrate("w", screen, templates)
+        assert scales.save()
+        reloaded = TemplateScales(path)
+        assert reloaded.scale("w") == 0.9
+        assert "w 0.9" in reloaded.summary()
+        reloaded.reset("w")
+        assert reloaded.scale("w") is None and reloaded.needs_calibration("w")
+
+    def test_invalid_scales(self):
+        with pytest.raises(ValueError):
+            TemplateScales(scales=(0.0, 1.0))
@@ -0,0 +1,238 @@
+"""
+Tests for the scheduler module.
+
+Run with:  python -m pytest test_scheduler.py -v
+"""
+
+import threading
+import time
+
+import pytest
+
+from scheduler import FocusArbiter, WindowScheduler, WindowState, tile_capacity, unique_windows
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _run_until(scheduler, condition, timeout=2.0):
+    scheduler.start()
+    try:
+        deadline = time.monotonic() + timeout
+        while not condition():
+            assert time.monotonic() < deadline, "scheduler did not reach the expected state"
+            time.sleep(0.005)
+    finally:
+        scheduler.stop(timeout=2.0)
+
+
+# ---------------------------------------------------------------------------
+# Focus arbiter tests
+# ---------------------------------------------------------------------------
+
+class TestFocusArbiter:
+    def test_activates_only_on_focus_change(self):
+        arbiter = FocusArbiter()
+        activated = []
+        for key in ("a", "a", "b", "b", "a"):
+            with arbiter.hold(key, lambda k=key: activated.append(k)):
+                pass
+        assert activated == ["a", "b", "a"]
+        assert arbiter.stats().holds == 5 and arbiter.stats().switches == 3
+
+    def test_reactivates_when_focus_was_lost(self):
+        arbiter = FocusArbiter()
+        activated = []
+        with arbiter.hold("a", lambda: activated.append("a")):
+            pass
+        with arbiter.hold("a", lambda: activated.append("a"), is_active=lambda: False):
+            pass
+        assert activated == ["a", "a"]
+
+    def test_reentrant(self):
+        arbiter = FocusArbiter()
+        with arbiter.hold("a"):
+            with arbiter.hold("a"):
+                pass
+        assert arbiter.stats().holds == 1
+
+    def test_failed_activation_releases_lock(self):
+        arbiter = FocusArbiter()
+
+        def fail():
+            raise OSError("window closed")
+
+        with pytest.raises(OSError):
+            with arbiter.hold("a", fail):
+                pass
+        activated = []
+        with arbiter.hold("a", lambda: activated.append("a")):
+            pass
+        assert activated == ["a"]
+
+    def test_waiters_served_earliest_deadline_first(self):
+        arbiter = FocusArbiter()
+        order = []
+        release = threading.Event()
+
+        def holder():
+            with arbiter.hold("x"):
+                release.wait(2.0)
+
+        def waiter(key, deadline):
+            with arbiter.hold(key, deadline=deadline):
+                order.append(key)
+
+        first = threading.Thread(target=holder)
+        first.start()
+        time.sleep(0.02)
+        threads = [threading.Thread(target=waiter, args=(k, d)) for k, d in (("late", 9.0), ("early", 1.0), ("mid", 5.0))]
+        for t in threads:
+            t.start()
+            time.sleep(0.02)
+        release.set()
+        for t in [first] + threads:
+            t.join(2.0)
+        assert order == ["early", "mid", "late"]
+
+
+# ---------------------------------------------------------------------------
+# Window enumeration
+# ---------------------------------------------------------------------------
+
+class _FakeWin:
+    def __init__(self, hwnd, title):
+        self._hWnd = hwnd
+        self.title = title
+
+
+def test_unique_windows_drops_case_insensitive_duplicates():
+    a, b = _FakeWin(1, "wosmin"), _FakeWin(2, "WOSMIN 2")
+    # getWindowsWithTitle('wosmin') and ('WOSMIN') both return both windows, as new objects
+    found = [a, b] + [_FakeWin(1, "wosmin"), _FakeWin(2, "WOSMIN 2")]
+    assert unique_windows(found) == [a, b]
+    scheduler = WindowScheduler()
+    for i, win in enumerate(unique_windows(found)):
+        scheduler.add_window(WindowState(i, title=win.title))
+    assert [w.title for w in scheduler.windows()] == ["wosmin", "WOSMIN 2"]
+
+
+@pytest.mark.parametrize("screen_width, expected", [(1920, 3), (1901, 2), (2560, 4), (622, 1), (600, 0)])
+def test_tile_capacity_keeps_every_capture_region_on_screen(screen_width, expected):
+    # minfar: 622-px capture regions every 640 px; the third ends at 1902 px
+    assert tile_capacity(screen_width, 640, 622) == expected
+
+
+# ---------------------------------------------------------------------------
+# Scheduler tests
+# ---------------------------------------------------------------------------
+
+class TestWindowScheduler:
+    def test_windows_run_in_parallel(self):
+        scheduler = WindowScheduler()
+        barrier = threading.Barrier(3, timeout=2.0)
+        done = []
+
+        def task(state):
+            barrier.wait()                   # only passes if all three run at once
+            done.append(state.key)
+
+        for key in ("a", "b", "c"):
+            scheduler.schedule(scheduler.add_window(WindowState(key)), "cycle", task)
+        _run_until(scheduler, lambda: len(done) == 3)
+        assert sorted(done) == ["a", "b", "c"]
+
+    def test_tasks_of_one_window_never_overlap(self):
+        scheduler = WindowScheduler(max_workers=4)
+        state = scheduler.add_window(WindowState("a"))
+        active, overlaps, runs = [0], [], []
+
+        def task(state):
+            active[0] += 1
+            overlaps.append(active[0] > 1)
+            time.sleep(0.005)
+            active[0] -= 1
+            runs.append(1)
+            return 0.0 if len(runs) < 6 else None
+
+        scheduler.schedule(state, "one", task)
+        scheduler.schedule(state, "two", task)
+        _run_until(scheduler, lambda: len(runs) >= 7)
+        assert not any(overlaps)
+
+    def test_deadline_then_priority_order(self):
+        now = [0.0]
+        scheduler = WindowScheduler(max_workers=1, clock=lambda: now[0])
+        state = scheduler.add_window(WindowState("a"))
+        order = []
+        scheduler.schedule(state, "later", lambda s: order.append("later"), delay=0.05)
+        scheduler.schedule(state, "normal", lambda s: order.append("normal"))
+        scheduler.schedule(state, "urgent", lambda s: order.append("urgent"), priority=1)
+        now[0] = 1.0                         # all three are due, "normal" and "urgent" tied
+        _run_until(scheduler, lambda: len(order) == 3)
+        assert order == ["urgent", "normal", "later"]
+
+    def test_return_value_reschedules(self):
+        scheduler = WindowScheduler()
+        state = scheduler.add_window(WindowState("a"))
+        times = []
+
+        def task(state):
+            times.append(time.monotonic())
+            return 0.03 if len(times) < 3 else None
+
+        scheduler.schedule(state, "cycle", task)
+        _run_until(scheduler, lambda: len(times) == 3)
+        assert times[2] - times[1] >= 0.03
+        assert state.pending() == []
+
+    def test_failing_task_is_retried(self, caplog):
+        scheduler = WindowScheduler(retry_delay=0.0)
+        state = scheduler.add_window(WindowState("a", title="wosmin"))
+        calls = []
+
+        def task(state):
+            calls.append(1)
+            if len(calls) == 1:
+                raise RuntimeError("boom")
+
+        scheduler.schedule(state, "cycle", task)
+        _run_until(scheduler, lambda: len(calls) == 2)
+        assert "Task 'cycle' of window 'wosmin' failed" in caplog.text
+        assert scheduler.stats()["a"].errors == 1
+
+    def test_input_activates_current_window(self):
+        scheduler = WindowScheduler()
+        activated, seen = [], []
+        for key in ("a", "b"):
+            state = scheduler.add_window(WindowState(key, activate=lambda k=key: activated.append(k)))
+
+            def task(state):
+                assert scheduler.current() is state
+                with scheduler.input() as current:
+                    seen.append(current.key)
+
+            scheduler.schedule(state, "press", task)
+        _run_until(scheduler, lambda: len(seen) == 2)
+        assert sorted(activated) == ["a", "b"]
+        assert scheduler.current() is None
+
+    def test_input_outside_task_raises(self):
+        with pytest.raises(RuntimeError, match="inside a scheduled task"):
+            with WindowScheduler().input():
+                pass
+
+    def test_duplicate_window_raises(self):
+        scheduler = WindowScheduler()
+        scheduler.add_window(WindowState("a"))
+        with pytest.raises(ValueError, match="already scheduled"):
+            scheduler.add_window(WindowState("a"))
+
+    def test_summary(self):
+        scheduler = WindowScheduler()
+        state = scheduler.add_window(WindowState("a", title="wosmin"))
+        done = []
+        scheduler.schedule(state, "cycle", lambda s: done.append(1))
+        _run_until(scheduler, lambda: done)
+        assert scheduler.summary().startswith("scheduler: wosmin 1 runs")
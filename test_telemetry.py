@@ -0,0 +1,151 @@
+"""
+Tests for the telemetry module.
+
+Run with:  python -m pytest test_telemetry.py -v
+"""
+
+import json
+import urllib.request
+
+import pytest
+
+from telemetry import TELEMETRY_ENV, TELEMETRY_PORT_ENV, Telemetry
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _telemetry(window="w1", **kwargs):
+    clock = _FakeClock()
+    current = {"window": window}
+    t = Telemetry(context=lambda: current["window"], enabled=True, clock=clock, **kwargs)
+    return t, clock, current
+
+
+# ---------------------------------------------------------------------------
+# Recording
+# ---------------------------------------------------------------------------
+
+class TestRecording:
+    def test_disabled_span_is_shared_noop(self):
+        t = Telemetry()
+        assert t.span("a", x=1) is t.span("b")
+        with t.span("a"):
+            pass
+        t.record("a", 1.0)
+        assert t.stats() == {}
+        assert t.summary() == "telemetry: disabled"
+
+    def test_span_records_duration_per_window_and_tags(self):
+        t, clock, current = _telemetry()
+        for seconds in (0.010, 0.020, 0.030):
+            with t.span("match", template="help", region=None):
+                clock.now += seconds
+        current["window"] = "w2"
+        with t.span("match", template="help", region=None):
+            clock.now += 0.5
+        stats = t.stats()
+        s = stats[("w1", "match", (("region", "None"), ("template", "help")))]
+        assert s.count == 3
+        assert s.total_s == pytest.approx(0.06)
+        assert s.p50_ms == pytest.approx(20.0)
+        assert stats[("w2", "match", (("region", "None"), ("template", "help")))].count == 1
+
+    def test_span_records_when_block_raises(self):
+        t, clock, _ = _telemetry()
+        with pytest.raises(KeyError):
+            with t.span("capture"):
+                clock.now += 0.1
+                raise KeyError("x")
+        assert t.stats()[("w1", "capture", ())].count == 1
+
+    def test_no_window_is_recorded_as_dash(self):
+        t, _, _ = _telemetry(window=None)
+        t.record("sleep", 1.0, reason="focus")
+        assert ("-", "sleep", (("reason", "focus"),)) in t.stats()
+
+    def test_percentiles_use_recent_reservoir_but_totals_are_exact(self):
+        t, _, _ = _telemetry(reservoir=10)
+        for _ in range(100):
+            t.record("capture", 1.0)
+        for _ in range(10):
+            t.record("capture", 0.001)
+        s = t.stats()[("w1", "capture", ())]
+        assert s.count == 110
+        assert s.total_s == pytest.approx(100.01)
+        assert s.p99_ms == pytest.approx(1.0)
+
+    def test_summary_lists_largest_totals_first(self):
+        t, _, _ = _telemetry()
+        t.record("capture", 0.5)
+        t.record("sleep", 2.0, reason="keypress")
+        assert t.summary().startswith("telemetry: w1 sleep reason=keypress 2.0 s/1")
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+class TestExport:
+    def test_jsonl_lines_per_key(self, tmp_path):
+        path = tmp_path / "telemetry.jsonl"
+        t, _, _ = _telemetry(jsonl_path=str(path))
+        t.record("capture", 0.1, scene="world")
+        t.record("match", 0.2, template="help")
+        assert t.export_jsonl() == 2
+        t.close()
+        lines = [json.loads(line) for line in path.read_text().splitlines()]
+        assert {(r["window"], r["span"]) for r in lines} == {("w1", "capture"), ("w1", "match")}
+        assert lines[0]["count"] == 1 and "p95_ms" in lines[0]
+        assert {r["span"]: r["tags"] for r in lines}["capture"] == {"scene": "world"}
+
+    def test_jsonl_rotates(self, tmp_path):
+        path = tmp_path / "telemetry.jsonl"
+        t, _, _ = _telemetry()
+        t.record("capture", 0.1)
+        for _ in range(20):
+            t.export_jsonl(str(path), max_bytes=300, backups=2)
+        t.close()
+        assert (tmp_path / "telemetry.jsonl.1").exists()
+        assert not (tmp_path / "telemetry.jsonl.3").exists()
+
+    def test_jsonl_needs_a_path(self):
+        t, _, _ = _telemetry()
+        with pytest.raises(ValueError):
+            t.export_jsonl()
+
+    def test_prometheus_text(self):
+        t, _, _ = _telemetry()
+        t.record("match", 0.25, template='a"b')
+        text = t.prometheus_text()
+        assert "# TYPE minfar_span_seconds summary" in text
+        assert 'minfar_span_seconds_count{window="w1",span="match",template="a\\"b"} 1' in text
+        assert 'quantile="0.95"} 0.250000' in text
+
+    def test_serve_metrics_endpoint(self):
+        t, _, _ = _telemetry()
+        t.record("capture", 0.1)
+        port = t.serve(0)
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+                body = resp.read().decode()
+        finally:
+            t.close()
+        assert 'minfar_span_seconds_sum{window="w1",span="capture"} 0.100000' in body
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        monkeypatch.delenv(TELEMETRY_ENV, raising=False)
+        monkeypatch.delenv(TELEMETRY_PORT_ENV, raising=False)
+        assert not Telemetry.from_env().enabled
+        monkeypatch.setenv(TELEMETRY_ENV, str(tmp_path / "t.jsonl"))
+        t = Telemetry.from_env()
+        assert t.enabled and t.jsonl_path == str(tmp_path / "t.jsonl")
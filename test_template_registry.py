@@ -0,0 +1,186 @@
+"""
+Tests for the template_registry module.
+
+Run with:  python -m pytest test_template_registry.py -v
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import template_registry
+from frequency_stitch import TemplateSpectrumCache, phase_correlate_match
+from template_registry import TemplateRegistry
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+def _write_templates(directory, names=("world", "help", "back"), seed=0):
+    rng = np.random.default_rng(seed)
+    images = {}
+    for i, name in enumerate(names):
+        img = (rng.random((24 + 4 * i, 32)) * 255).astype(np.uint8)
+        cv2.imwrite(str(directory / f"{name}.png"), img)
+        images[name] = img
+    return images
+
+
+def _no_imread(*args, **kwargs):
+    raise AssertionError("cv2.imread called on a warm cache")
+
+
+# ---------------------------------------------------------------------------
+# Registry tests
+# ---------------------------------------------------------------------------
+
+class TestTemplateRegistry:
+    def test_scans_directory_and_loads_lazily(self, tmp_path):
+        images = _write_templates(tmp_path)
+        (tmp_path / "notes.txt").write_text("not a template")
+        registry = TemplateRegistry(str(tmp_path))
+        assert sorted(registry) == ["back", "help", "world"]
+        assert registry.loads == 0
+        np.testing.assert_array_equal(registry["help"], images["help"])
+        registry["help"]
+        assert registry.loads == 1
+
+    def test_artifacts(self, tmp_path):
+        images = _write_templates(tmp_path)
+        art = TemplateRegistry(str(tmp_path), pyramid_levels=2).artifacts("world")
+        img = images["world"]
+        assert [lvl.shape for lvl in art.pyramid] == [(12, 16), (6, 8)]
+        np.testing.assert_array_equal(art.pyramid[0], cv2.pyrDown(img))
+        assert art.spectrum is None
+
+    def test_unknown_template_raises_key_error(self, tmp_path):
+        _write_templates(tmp_path)
+        with pytest.raises(KeyError, match="available: back, help, world"):
+            TemplateRegistry(str(tmp_path))["fountain"]
+
+    def test_require_lists_missing(self, tmp_path):
+        _write_templates(tmp_path)
+        registry = TemplateRegistry(str(tmp_path))
+        registry.require(["world", "help"])
+        with pytest.raises(FileNotFoundError, match="rally, idle"):
+            registry.require(["world", "rally", "idle"])
+
+    def test_undecodable_png_raises(self, tmp_path):
+        (tmp_path / "broken.png").write_bytes(b"not a png")
+        with pytest.raises(ValueError, match="Could not decode"):
+            TemplateRegistry(str(tmp_path))["broken"]
+
+    def test_missing_directory_raises(self, tmp_path):
+        with pytest.raises(FileNotFoundError):
+            TemplateRegistry(str(tmp_path / "gameplay"))
+
+
+class TestTemplateCache:
+    def test_warm_start_skips_decoding(self, tmp_path, monkeypatch):
+        images = _write_templates(tmp_path)
+        cache = str(tmp_path / "cache.npz")
+        cold = TemplateRegistry(str(tmp_path), cache_path=cache)
+        expected = {name: cold.artifacts(name) for name in cold}
+        assert cold.save() is True
+        assert cold.save() is False          # nothing new
+
+        monkeypatch.setattr(template_registry.cv2, "imread", _no_imread)
+        warm = TemplateRegistry(str(tmp_path), cache_path=cache)
+        for name, art in expected.items():
+            got = warm.artifacts(name)
+            np.testing.assert_array_equal(got.image, images[name])
+            for a, b in zip(got.pyramid, art.pyramid):
+                np.testing.assert_array_equal(a, b)
+        assert warm.cache_hits == 3 and warm.loads == 0
+
+    def test_save_keeps_entries_not_used_this_run(self, tmp_path, monkeypatch):
+        _write_templates(tmp_path)
+        cache = str(tmp_path / "cache.npz")
+        cold = TemplateRegistry(str(tmp_path), cache_path=cache)
+        for name in cold:
+            cold[name]
+        cold.save()
+
+        _write_templates(tmp_path, names=("idle",), seed=3)
+        partial = TemplateRegistry(str(tmp_path), cache_path=cache)
+        partial["idle"]                      # new file; the rest stay untouched
+        partial.save()
+
+        monkeypatch.setattr(template_registry.cv2, "imread", _no_imread)
+        warm = TemplateRegistry(str(tmp_path), cache_path=cache)
+        for name in warm:
+            warm[name]
+        assert warm.cache_hits == 4
+
+    def test_modified_template_is_reloaded(self, tmp_path):
+        _write_templates(tmp_path)
+        cache = str(tmp_path / "cache.npz")
+        cold = TemplateRegistry(str(tmp_path), cache_path=cache)
+        for name in cold:
+            cold[name]
+        cold.save()
+
+        new = np.full((30, 30), 7, dtype=np.uint8)
+        cv2.imwrite(str(tmp_path / "help.png"), new)
+        warm = TemplateRegistry(str(tmp_path), cache_path=cache)
+        np.testing.assert_array_equal(warm["help"], new)
+        warm["world"]
+        assert (warm.loads, warm.cache_hits) == (1, 1)
+
+    def test_touched_template_is_served_from_cache(self, tmp_path):
+        _write_templates(tmp_path)
+        cache = str(tmp_path / "cache.npz")
+        cold = TemplateRegistry(str(tmp_path), cache_path=cache)
+        cold["world"]
+        cold.save()
+
+        path = tmp_path / "world.png"
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        warm = TemplateRegistry(str(tmp_path), cache_path=cache)
+        warm["world"]
+        assert (warm.loads, warm.cache_hits) == (0, 1)
+        assert warm.save() is True           # refreshed mtime is persisted
+
+    def test_settings_change_invalidates_cache(self, tmp_path):
+        _write_templates(tmp_path)
+        cache = str(tmp_path / "cache.npz")
+        cold = TemplateRegistry(str(tmp_path), cache_path=cache, pyramid_levels=1)
+        cold["world"]
+        cold.save()
+        warm = TemplateRegistry(str(tmp_path), cache_path=cache, pyramid_levels=2)
+        assert len(warm.artifacts("world").pyramid) == 2
+        assert warm.loads == 1
+
+    def test_spectra_round_trip_and_prime(self, tmp_path):
+        _write_templates(tmp_path)
+        cache = str(tmp_path / "cache.npz")
+        shape = (96, 80)
+        cold = TemplateRegistry(str(tmp_path), cache_path=cache, spectrum_shape=shape)
+        for name in cold:
+            cold[name]
+        cold.save()
+
+        warm = TemplateRegistry(str(tmp_path), cache_path=cache, spectrum_shape=shape)
+        spec_cache = TemplateSpectrumCache()
+        assert warm.prime_spectrum_cache(spec_cache) == 3
+        assert warm.loads == 0
+        assert isinstance(warm.artifacts("help").spectrum, np.memmap)
+
+        rng = np.random.default_rng(1)
+        screen = (rng.random(shape) * 255).astype(np.uint8)
+        screen[40:68, 20:52] = warm["help"]
+        primed = phase_correlate_match(
+            screen, warm["help"], spectrum_cache=spec_cache, cache_key="help",
+            fft_mode="real32",
+        )
+        assert spec_cache.cache_info().hits == 1
+        assert primed == phase_correlate_match(screen, warm["help"], fft_mode="real32")
+
+    def test_prime_without_spectrum_shape_raises(self, tmp_path):
+        _write_templates(tmp_path)
+        with pytest.raises(ValueError, match="spectrum_shape"):
+            TemplateRegistry(str(tmp_path)).prime_spectrum_cache(TemplateSpectrumCache())
@@ -0,0 +1,85 @@
+"""
+Tests for the waits module.
+
+Run with:  python -m pytest test_waits.py -v
+"""
+
+import pytest
+
+from waits import Waiter
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+
+def _waiter(clock, **kwargs):
+    return Waiter(clock=clock, sleep=clock.sleep, **kwargs)
+
+
+# ---------------------------------------------------------------------------
+# Waiter tests
+# ---------------------------------------------------------------------------
+
+class TestWaiter:
+    def test_returns_as_soon_as_condition_holds(self):
+        clock = _FakeClock()
+        waiter = _waiter(clock, poll_interval=0.1, max_interval=1.0, backoff=2.0)
+        result = waiter.until(lambda: (5, 7) if clock.now >= 0.25 else None, timeout=3.0)
+        assert result == (5, 7)
+        assert clock.sleeps == [0.1, 0.2]
+        assert clock.now == pytest.approx(0.3)
+
+    def test_backoff_is_capped_and_ends_at_deadline(self):
+        clock = _FakeClock()
+        waiter = _waiter(clock, poll_interval=0.1, max_interval=0.4, backoff=2.0)
+        assert waiter.until(lambda: False, timeout=1.5, label="gone") is None
+        assert clock.sleeps == [0.1, 0.2, 0.4, 0.4, 0.4]
+        assert clock.now == pytest.approx(1.5)
+
+    def test_immediate_success_does_not_sleep(self):
+        clock = _FakeClock()
+        assert _waiter(clock).until(lambda: True, timeout=3.0) is True
+        assert clock.sleeps == []
+
+    def test_zero_timeout_checks_once(self):
+        clock = _FakeClock()
+        calls = []
+        _waiter(clock).until(lambda: calls.append(1), timeout=0)
+        assert calls == [1] and clock.sleeps == []
+
+    def test_per_call_poll_interval(self):
+        clock = _FakeClock()
+        waiter = _waiter(clock, poll_interval=0.1, max_interval=1.0, backoff=1.0)
+        waiter.until(lambda: clock.now >= 0.5, timeout=3.0, poll_interval=0.5)
+        assert clock.sleeps == [0.5]
+
+    def test_stats_and_summary(self):
+        clock = _FakeClock()
+        waiter = _waiter(clock, poll_interval=0.5, max_interval=0.5)
+        waiter.until(lambda: clock.now >= 0.5, timeout=3.0, label="world")
+        waiter.until(lambda: False, timeout=1.0, label="world")
+        s = waiter.stats()["world"]
+        assert (s.waits, s.timeouts, s.polls) == (2, 1, 5)
+        assert s.waited_s == pytest.approx(1.5)
+        assert s.budget_s == pytest.approx(4.0)
+        assert waiter.summary() == "waits: 2 (1 timed out), 1.5 s spent of 4.0 s fixed-sleep budget"
+
+    def test_invalid_settings_raise(self):
+        with pytest.raises(ValueError):
+            Waiter(poll_interval=0.5, max_interval=0.1)
+        with pytest.raises(ValueError):
+            Waiter(backoff=0.5)
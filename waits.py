@@ -0,0 +1,138 @@
+"""
+Event-Driven Waits
+==================
+``minfar.py`` waits for the game UI with fixed sleeps (``time.sleep(3)``
+after most clicks, 1.5-3 s before every key in ``SpecialClick``), sized for
+the slowest case.  :class:`Waiter` polls a condition instead and returns as
+soon as it holds, with the old sleep as the timeout, so a wait never takes
+longer than before and usually takes only the UI's real latency.
+
+Polling uses adaptive backoff: the first checks come quickly (the UI often
+responds within ~100 ms), then the interval grows by ``backoff`` up to
+``max_interval`` so a slow transition does not burn a template match every
+few milliseconds.  The last check always happens at the deadline.
+
+Usage
+-----
+waiter = Waiter(poll_interval=0.1, max_interval=0.8)
+pt = waiter.until(lambda: find("conquest1"), timeout=3.0, label="conquest1")
+if pt is None:
+    ...                                   # timed out
+print(waiter.summary())
+"""
+
+import threading
+import time
+from collections import namedtuple
+from typing import Callable
+
+WaitStats = namedtuple("WaitStats", ["waits", "timeouts", "polls", "waited_s", "budget_s"])
+WaitStats.__doc__ = """
+Counters for one wait label.
+
+waits    : completed waits.
+timeouts : waits whose condition never held.
+polls    : condition evaluations.
+waited_s : total seconds spent waiting.
+budget_s : total of the timeouts, i.e. what fixed sleeps would have cost.
+"""
+
+
+class Waiter:
+    """Poll-with-backoff condition waits and per-label statistics."""
+
+    def __init__(
+        self,
+        poll_interval: float = 0.1,
+        max_interval: float = 1.0,
+        backoff: float = 1.5,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        """
+        Parameters
+        ----------
+        poll_interval : float
+            Seconds between the first two checks.
+        max_interval : float
+            Upper bound for the backed-off interval.
+        backoff : float
+            Factor the interval grows by after every unsuccessful check (1 =
+            fixed-interval polling).
+        clock, sleep : Callable
+            Time source and sleep function (replaceable in tests).
+        """
+        if poll_interval <= 0 or max_interval < poll_interval or backoff < 1:
+            raise ValueError("Need 0 < poll_interval <= max_interval and backoff >= 1.")
+        self.poll_interval = poll_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self._clock = clock
+        self._sleep = sleep
+        self._stats: dict[str | None, list] = {}
+        self._lock = threading.Lock()
+
+    def until(
+        self,
+        condition: Callable[[], object],
+        timeout: float,
+        label: str | None = None,
+        poll_interval: float | None = None,
+    ) -> object:
+        """
+        Evaluate *condition* until it returns a truthy value or *timeout*
+        seconds have passed.
+
+        Parameters
+        ----------
+        condition : Callable
+            Zero-argument check, e.g. "find this template on a fresh capture".
+        timeout : float
+            Maximum seconds to wait (typically the fixed sleep being replaced).
+        label : str | None
+            Name the wait is accounted under in :meth:`stats`.
+        poll_interval : float | None
+            Overrides the initial interval for this wait.
+
+        Returns
+        -------
+        The first truthy value returned by *condition*, or None on timeout.
+        """
+        start = self._clock()
+        deadline = start + timeout
+        interval = self.poll_interval if poll_interval is None else poll_interval
+        polls = 0
+        while True:
+            polls += 1
+            result = condition()
+            now = self._clock()
+            if result or now >= deadline:
+                break
+            self._sleep(min(interval, deadline - now))
+            interval = min(interval * self.backoff, self.max_interval)
+
+        with self._lock:
+            s = self._stats.setdefault(label, [0, 0, 0, 0.0, 0.0])
+            s[0] += 1
+            s[1] += 0 if result else 1
+            s[2] += polls
+            s[3] += now - start
+            s[4] += timeout
+        return result if result else None
+
+    def stats(self) -> dict[str | None, WaitStats]:
+        """Counters per wait label."""
+        with self._lock:
+            return {label: WaitStats(*s) for label, s in self._stats.items()}
+
+    def summary(self) -> str:
+        """One-line report of time spent against the fixed-sleep budget."""
+        stats = self.stats().values()
+        waited = sum(s.waited_s for s in stats)
+        budget = sum(s.budget_s for s in stats)
+        waits = sum(s.waits for s in stats)
+        timeouts = sum(s.timeouts for s in stats)
+        return (
+            f"waits: {waits} ({timeouts} timed out), {waited:.1f} s spent "
+            f"of {budget:.1f} s fixed-sleep budget"
+        )